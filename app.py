@@ -1,18 +1,9 @@
 #!/usr/bin/env python3
-import os
-
 import aws_cdk as cdk
-from aws_cdk import aws_ssm as ssm
 
-from app.InfraStack import InfraStack
-from app.ec2_stack import EC2Stack
-from app.lambda_autodeploy_s3_stack import LambdaAutoDeployStack
-from app.vpc_stack import VpcStack
-from app.rds_mysql_stack import RdsMysqlStack
-from app.rds_stack import (RdsStack, InstanceType)
-from app.customised_vpc_stack import CustomisedVpcStack
-from app.app_stack import ECSAppStack
-from app.managed_nginx import EC2WithNginxLBStack
+# Stack modules are imported lazily by the registry, only for the stacks being synthesized
+from app.synthesis import synthesize
+from app.utility.app_config import config_for
 
 
 
@@ -58,31 +49,37 @@ app = cdk.App()
 # lambda_auto_deploy = LambdaAutoDeployStack(app, "LambdaAutoDeploy")
 ###########################################################################################################
 
+# The selected environment's account and region, from app/config/account_details.env.json
+config = config_for(app)
 account_details={
-     'account': os.environ['CDK_DEFAULT_ACCOUNT'],
-     'region': os.environ['CDK_DEFAULT_REGION']
+     'account': config['account'],
+     'region': config['region']
 }
 
 
-vpc_stack = VpcStack(app, "VpcStack", env=account_details)
-postgresDBInstance = RdsStack(app, instance_type=InstanceType.POSTGRES,  construct_id="RdsPostgresStack",  vpc_stack=vpc_stack, database_name='key_generator_db', env=account_details)
-infra_stack = InfraStack(app, "InfraStack",vpc_stack=vpc_stack, app_ports = [8080], environment_name="dev", env=account_details)
-
-cluster_name = infra_stack.cluster.cluster_name
-vpc = vpc_stack.vpc
-public_subnet_id = vpc.public_subnets[0].subnet_id
-public_subnet_az = vpc.public_subnets[0].availability_zone
-security_group_id = vpc_stack.ec2_sg.security_group_id
-
-
-# app_stack = ECSAppStack(app, "AppStack", cluster_name=cluster_name, image_uri="", app_name="app-name", environment_name="dev", env=account_details)
+# Load and validate the configuration once, before any stack is built, so configuration
+# errors are reported up front. Select the environment with -c environment=<name>.
 #
-# dns_name = app_stack.namespace
-# subnet_params = {'id':public_subnet_id, 'az':public_subnet_az}
+# Build only the stacks named in the context (plus their dependencies), e.g.
+#   cdk synth -c stacks=InfraStack
+# Without the context key the default VpcStack, RdsPostgresStack and InfraStack are built.
+# Registered stacks: VpcStack, RdsPostgresStack, RdsInitStack, InfraStack, AppStack, NginxLb,
+#                    CustomisedVpcStack, LambdaAutoDeploy
 #
-# nginx_lb = EC2WithNginxLBStack(app, "NginxLb", subnet_params=subnet_params, sg_id=security_group_id, dns=dns_name, env=account_details)
-
-app.synth()
+# Profile stack construction (time and jsii round-trips per construct path) with
+#   cdk synth -c profile=true
+# The report is written to cdk.out/synth-profile.json
+#
+# Only rebuild the stacks whose code, config, assets or context changed since the last synth with
+#   cdk synth -c incremental=true
+# Unchanged stacks are copied from .cdk-incremental/<environment>
+#
+# Every synthesized template is checked against the `template_budgets` in app/config/defaults.json;
+# the report (sizes, resources by type, outputs, exports, growth hot spots) is written to
+# cdk.out/template-budget.json. Re-run it offline with `python -m app.utility.template_budget`.
+#
+# To synthesize every configured environment in parallel, see app/multi_env_synth.py
+assembly, stacks = synthesize(app, env=account_details)
 
 #This is the expected behavior >= 0.36.0. We wanted to reduce the implicit effect the user's
 # environment has on the synthesis result as this can cause production risks, so we made this
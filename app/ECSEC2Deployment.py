@@ -1,4 +1,3 @@
-import json
 from aws_cdk import (
     Stack,
     aws_ec2 as ec2,
@@ -7,12 +6,13 @@ from aws_cdk import (
     aws_ecr as ecr,
     aws_servicediscovery as sd,
     aws_autoscaling as autoscaling,
-    aws_ssm as ssm,
     aws_secretsmanager as secretsmanager
 )
 from constructs import Construct
 
 from app.vpc_stack import VpcStack
+from app.utility.parameter_resolver import resolver_for
+from app.utility.app_config import config_for
 
 
 class ECSEc2DeploymentStack(Stack):
@@ -123,15 +123,15 @@ class ECSEc2DeploymentStack(Stack):
 
     def load_configuration(self):
         """Load configuration based on environment"""
-        env = self.node.try_get_context(self.environment_name) or "dev"
-        with open(f"config/{env}.env.json") as f:
-            return json.load(f)
+        return config_for(self, self.environment_name)
 
     def prepare_environment(self, config):
         """Prepare non-sensitive environment variables"""
+        parameters = config.get("plain_parameters", {})
+        values = resolver_for(self).get_many(parameters.values())
         return {
-            key: ssm.StringParameter.value_from_lookup(self, value)
-            for key, value in config.get("environment", {}).items()
+            key: values[value]
+            for key, value in parameters.items()
         }
 
     def prepare_secrets(self, config):
@@ -140,7 +140,7 @@ class ECSEc2DeploymentStack(Stack):
             key: ecs.Secret.from_secrets_manager(
                 secretsmanager.Secret.from_secret_attributes(self, f"{key}Secret", value)
             )
-            for key, value in config.get("secrets", {}).items()
+            for key, value in config.get("secrete_parameters", {}).items()
         }
 
     ###############
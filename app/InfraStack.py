@@ -14,6 +14,7 @@ from aws_cdk import (
 )
 from constructs import Construct
 from app.vpc_stack import VpcStack
+from app.utility.app_config import config_for
 
 
 
@@ -65,6 +66,7 @@ class InfraStack(Stack):
         super().__init__(scope, stack_id, **kwargs)
 
         self.environment_name = environment_name
+        self.config = config_for(self, environment_name)
         self.vpc = vpc_stack.vpc
         self.security_group = vpc_stack.ec2_sg
 
@@ -239,17 +241,5 @@ class InfraStack(Stack):
         )
 
     def ec2_features(self):
-        if self.environment_name == "production":
-            return {
-                "type": "m5.large",
-                "min_capacity": 3,
-                "max_capacity": 10,
-                "desired_capacity": 5
-            }
-        else:
-            return {
-                "type": "t2.micro",
-                "min_capacity": 1,
-                "max_capacity": 2,
-                "desired_capacity": 1
-            }
\ No newline at end of file
+        """Instance type and capacities for the environment, from config/ec2_env.json over config/defaults.json"""
+        return dict(self.config.get("ec2", {}))
\ No newline at end of file
@@ -1,6 +1,5 @@
-import json
-import os
-from typing import Mapping, Any, Dict
+import enum
+from typing import Mapping, Any, Dict, Optional
 
 from aws_cdk import (
     Stack,
@@ -10,34 +9,59 @@ from aws_cdk import (
     aws_ecs as ecs,
     aws_ecr as ecr,
     aws_servicediscovery as sd,
-    aws_ssm as ssm,
     aws_secretsmanager as secretsmanager, SecretValue
 )
 from constructs import Construct
 
 from app.vpc_stack import VpcStack
 from .InfraStack import InfraStack
-from .utility.secret_extractor import AwsSecretsManagerService as secrets_manager
+from .utility.secret_extractor import AwsSecretsManagerService as secrets_manager, fixture_from_context
+from .utility.parameter_resolver import VPC_ID_PARAMETER, resolver_for
+from .utility.app_config import config_for
+
+
+class SecretMode(enum.Enum):
+    # one Secrets Manager secret per DB secret field (MySecretUsername, MySecretPassword, ...)
+    PER_KEY = "per_key"
+    # one JSON secret holding every field, injected field by field
+    JSON = "json"
+    # no new secret: the existing DB secret (DB_SECRET_NAME) is injected field by field; with
+    # the field names listed in `db_secret_fields` the secret is not even read at synth time
+    REFERENCE = "reference"
+
 
 class ECSAppStack(Stack):
     def __init__(self, scope: Construct, stack_id: str, cluster_name: str,
-                 image_uri, app_name: str, environment_name: str, **kwargs):
+                 image_uri, app_name: str, environment_name: str,
+                 secret_mode: Optional[SecretMode] = None, **kwargs):
         super().__init__(scope, stack_id, **kwargs)
 
         self.environment_name  = environment_name
         self.app_name = app_name
         self.image_uri = image_uri
-        vpc_id = ssm.StringParameter.value_from_lookup(self, "vpcstack_vpc_vpc_id")
+
+        self.config = self.load_config_static_folder()
+
+        # Switching a deployed stack's mode replaces its secrets: opt in with the `secret_mode`
+        # config value or `-c secret_mode=reference`
+        self.secret_mode = secret_mode or SecretMode(self.node.try_get_context("secret_mode")
+                                                     or self.config.get("secret_mode", SecretMode.PER_KEY.value))
+
+        # Every SSM parameter this stack needs is fetched in one batched pass and cached on disk
+        self.parameters = resolver_for(self)
+        self.parameters.require(VPC_ID_PARAMETER, *map(str, self.config.get("plain_parameters").values()))
+        vpc_id = self.parameters.get(VPC_ID_PARAMETER)
 
         self.vpc = ec2.Vpc.from_lookup(self, "VPC", vpc_id=vpc_id)
 
         self.cluster = self.import_ecs_cluster(cluster_name, self.vpc)
 
-        self.config = self.load_config_static_folder()
         environment = self.prepare_environment(self.config.get("plain_parameters"))
 
         account_parameters = {
             "REGION":self.node.try_get_context("region"),
+            # offline mode: cdk synth -c secrets_fixture=true (or a path to a fixture file)
+            "FIXTURE": fixture_from_context(self.node.try_get_context("secrets_fixture")),
         }
 
         print(f"DEBUG: REGION set to {account_parameters.get('REGION')}")
@@ -104,33 +128,20 @@ class ECSAppStack(Stack):
 
     def load_config_static_folder(self) -> Dict[str, Mapping[Any, Any]]:
         """
-        Load configuration from a static JSON file in the `config` folder.
-        Assumes the file is named `my_file.env.json` and lives in `config/` relative to this module.
+        Load the configuration of this stack's environment through the shared config layer
+        (`config/defaults.json` merged with `config/<env>.env.json` and context overrides).
         """
-        # Construct the path to the config file
-        config_filename = f"{self.environment_name}.env.json"
-        config_path = os.path.join(os.path.dirname(__file__), "config", config_filename)
-
-        # Read and parse the file
-        try:
-            with open(config_path, "r") as f:
-                config = json.load(f)
-        except FileNotFoundError:
-            raise FileNotFoundError(f"Configuration file not found at {config_path}")
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Invalid JSON in config file: {e}")
-
-        # Validate top-level keys (optional but recommended)
-        if "plain_parameters" not in config or "secrete_parameters" not in config:
-            raise ValueError("Configuration file must contain 'environment' and 'secrets' keys")
-
-        return config
-
-
+        return config_for(self, self.environment_name)
 
     def prepare_secrets(self):
         """Prepare sensitive environment variables"""
         # https://medium.com/@davidnsoesie1/stop-exposing-secrets-in-your-infrastructure-as-code-0b907694a8c1
+        fields = self.config.get("db_secret_fields")
+        if self.secret_mode == SecretMode.REFERENCE and fields:
+            # Only the field names are needed to reference the existing secret
+            secret = self.prepare_db_secret({})
+            return {f"db_{key}": ecs.Secret.from_secrets_manager(secret, field=key) for key in fields}
+
         db_secret_map = self.secrets_manager.get_db_secret()
 
         # secret = secretsmanager.Secret(
@@ -142,6 +153,14 @@ class ECSAppStack(Stack):
         # # Use it in ECS
         # ecs_secret = ecs.Secret.from_secrets_manager(secret)
 
+        if self.secret_mode != SecretMode.PER_KEY:
+            # One secret for all fields; ECS resolves each field with a `secret-arn:field::` reference
+            secret = self.prepare_db_secret(db_secret_map)
+            return {
+                f"db_{key}": ecs.Secret.from_secrets_manager(secret, field=key)
+                for key in db_secret_map
+            }
+
         ecs_secret_map = {}
 
         for key, value in db_secret_map.items():
@@ -160,10 +179,27 @@ class ECSAppStack(Stack):
 
         return ecs_secret_map
 
+    def prepare_db_secret(self, db_secret_map: Dict[str, str]) -> secretsmanager.ISecret:
+        """Single secret holding every DB field, either referenced or created as one JSON secret"""
+        if self.secret_mode == SecretMode.REFERENCE:
+            return secretsmanager.Secret.from_secret_name_v2(
+                self, "DbSecret", self.config.get("secrete_parameters").get("DB_SECRET_NAME")
+            )
+
+        return secretsmanager.Secret(
+            self, "MySecretDb",
+            secret_name="MyAppSecret-db",
+            secret_object_value={
+                key: SecretValue.unsafe_plain_text(value)
+                for key, value in db_secret_map.items()
+            }
+        )
+
     def prepare_environment(self, config: Mapping[Any, Any]) -> Dict[str, str]:
         """Prepare non-sensitive environment variables from a config-like object"""
+        values = self.parameters.get_many(str(value) for value in config.values())
         return {
-            str(key): ssm.StringParameter.value_from_lookup(self, str(value))
+            str(key): values[str(value)]
             for key, value in config.items()
         }
 
@@ -0,0 +1,302 @@
+"""
+Deploys the packages uploaded to the LambdaAutoDeployStack bucket: `<name>.py` or `<name>.zip`
+becomes (or updates) the function `<name>`, with handler `<name>.lambda_handler`.
+
+A package's settings come from its manifest: the sidecar `<name>.json`, or else the package's
+`manifest` object metadata (`x-amz-meta-manifest`), a JSON object with any of the MANIFEST_KEYS:
+
+    {"memory": 1769, "architecture": "arm64", "ephemeral_storage": 2048, "timeout": 60,
+     "layers": ["arn:aws:lambda:..."], "reserved_concurrency": 10, "environment": {"STAGE": "prod"}}
+
+It is applied on create and on every update; settings it leaves out keep their current value
+(the defaults on create). Uploading only the sidecar re-applies it to the deployed package.
+
+The bucket notifies the function directly, or through an SQS queue that delivers the
+notifications in batches (LambdaAutoDeployStack(buffered=True)). A batch is deployed
+concurrently (DEPLOY_CONCURRENCY functions at a time). Several uploads of the same function
+in one batch are merged into one deploy of the latest upload, and a deploy is skipped when
+the object is byte-identical to the function's code (`CodeSha256`). For SQS batches only the
+messages of the functions that failed are reported back, to be redelivered.
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+CREATED = "FunctionsCreated"
+UPDATED = "FunctionsUpdated"
+RECONFIGURED = "FunctionsReconfigured"
+UNCHANGED = "DeploysSkipped"
+
+PACKAGE_SUFFIXES = (".zip", ".py")
+MANIFEST_SUFFIX = ".json"
+MANIFEST_KEYS = {"handler", "memory", "timeout", "architecture", "ephemeral_storage", "layers",
+                 "reserved_concurrency", "environment"}
+ARCHITECTURES = ("arm64", "x86_64")
+
+
+class ManifestError(Exception):
+    """A package manifest that is not valid JSON or has unknown or invalid settings."""
+    pass
+
+
+# AWS clients by service name, created on first use (tests and the benchmark put stand-ins here)
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(service_name):
+    # Clients are thread safe, creating them is not: the deploy threads share one per service
+    with _clients_lock:
+        if service_name not in _clients:
+            import boto3
+            _clients[service_name] = boto3.client(service_name)
+        return _clients[service_name]
+
+
+def deploy_concurrency():
+    return int(os.environ.get("DEPLOY_CONCURRENCY", "8"))
+
+
+def emit_metrics(values, units):
+    """Print the values as a CloudWatch Embedded Metric Format record (Count unless listed in units)."""
+    print(json.dumps({
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": os.environ["METRICS_NAMESPACE"],
+                "Dimensions": [["service"]],
+                "Metrics": [{"Name": name, "Unit": units.get(name, "Count")} for name in values],
+            }],
+        },
+        "service": "lambda-auto-deploy",
+        **values,
+    }))
+
+
+def s3_records(event):
+    """(SQS message id, S3 record) pairs; the message id is None for direct S3 notifications."""
+    for record in event["Records"]:
+        if record.get("eventSource") == "aws:sqs":
+            # The s3:TestEvent sent when the notification is configured has no records
+            for s3_record in json.loads(record["body"]).get("Records", []):
+                yield record["messageId"], s3_record
+        else:
+            yield None, record
+
+
+def latest_uploads(records, counts):
+    """
+    Function name -> (bucket, key, message ids) for the latest upload of each function among
+    the (message id, S3 record) pairs; the message ids are those of every merged upload.
+    """
+    latest = {}
+    message_ids = {}
+    for message_id, record in records:
+        bucket_name = record["s3"]["bucket"]["name"]
+        file_key = record["s3"]["object"]["key"]
+
+        function_name, suffix = os.path.splitext(file_key)
+        if suffix not in PACKAGE_SUFFIXES + (MANIFEST_SUFFIX,):
+            print(f"Skipping unsupported file: {file_key}")
+            counts["FilesSkipped"] += 1
+            continue  # Ignore anything but packages and manifests
+
+        message_ids.setdefault(function_name, set()).add(message_id)
+        # A package upload ranks above a manifest upload (the deploy reads the manifest anyway),
+        # then event time and S3's per-key sequencer order the uploads
+        order = (suffix != MANIFEST_SUFFIX, record.get("eventTime", ""),
+                 record["s3"]["object"].get("sequencer", ""))
+        if function_name in latest:
+            counts["UploadsMerged"] += 1
+            if order < latest[function_name][0]:
+                continue
+        latest[function_name] = (order, bucket_name, file_key)
+    return {function_name: (bucket_name, file_key, message_ids[function_name])
+            for function_name, (_, bucket_name, file_key) in latest.items()}
+
+
+def head_package(bucket_name, function_name, file_key):
+    """
+    (key, head_object response) of the function's package. For a manifest upload that is the
+    `.zip` or `.py` package next to it; (None, None) when no package was uploaded yet.
+    """
+    s3_client = get_client("s3")
+    candidates = [file_key] if not file_key.endswith(MANIFEST_SUFFIX) else \
+        [function_name + suffix for suffix in PACKAGE_SUFFIXES]
+    for key in candidates:
+        try:
+            return key, s3_client.head_object(Bucket=bucket_name, Key=key, ChecksumMode="ENABLED")
+        except s3_client.exceptions.ClientError as err:
+            if err.response["Error"]["Code"] not in ("404", "NoSuchKey"):
+                raise
+    return None, None
+
+
+def read_manifest(bucket_name, function_name, head):
+    """The sidecar `<name>.json`, else the package's `manifest` metadata, else an empty manifest."""
+    s3_client = get_client("s3")
+    try:
+        body = s3_client.get_object(Bucket=bucket_name, Key=function_name + MANIFEST_SUFFIX)["Body"].read()
+    except s3_client.exceptions.NoSuchKey:
+        body = head.get("Metadata", {}).get("manifest", "{}")
+    try:
+        manifest = json.loads(body)
+    except ValueError as err:
+        raise ManifestError(f"Manifest of {function_name} is not valid JSON: {err}") from err
+    if not isinstance(manifest, dict):
+        raise ManifestError(f"Manifest of {function_name} must be a JSON object")
+    unknown = set(manifest) - MANIFEST_KEYS
+    if unknown:
+        raise ManifestError(f"Manifest of {function_name} has unknown settings: {', '.join(sorted(unknown))}")
+    if manifest.get("architecture", ARCHITECTURES[1]) not in ARCHITECTURES:
+        raise ManifestError(f"Manifest of {function_name}: architecture must be one of {', '.join(ARCHITECTURES)}")
+    return manifest
+
+
+def configuration(manifest):
+    """The update_function_configuration arguments the manifest sets."""
+    settings = {}
+    if "handler" in manifest:
+        settings["Handler"] = manifest["handler"]
+    if "memory" in manifest:
+        settings["MemorySize"] = int(manifest["memory"])
+    if "timeout" in manifest:
+        settings["Timeout"] = int(manifest["timeout"])
+    if "ephemeral_storage" in manifest:
+        settings["EphemeralStorage"] = {"Size": int(manifest["ephemeral_storage"])}
+    if "layers" in manifest:
+        settings["Layers"] = list(manifest["layers"])
+    if "environment" in manifest:
+        settings["Environment"] = {"Variables": {name: str(value) for name, value in manifest["environment"].items()}}
+    return settings
+
+
+def configuration_changes(settings, deployed):
+    """The settings that differ from the deployed configuration (get_function's Configuration)."""
+    current = {
+        "Handler": deployed.get("Handler"),
+        "MemorySize": deployed.get("MemorySize"),
+        "Timeout": deployed.get("Timeout"),
+        "EphemeralStorage": {"Size": deployed.get("EphemeralStorage", {}).get("Size", 512)},
+        "Layers": [layer["Arn"] for layer in deployed.get("Layers", [])],
+        "Environment": {"Variables": deployed.get("Environment", {}).get("Variables", {})},
+    }
+    return {name: value for name, value in settings.items() if current[name] != value}
+
+
+def object_sha256(bucket_name, file_key, head):
+    """Base64 SHA-256 of the object, as in CodeSha256: the checksum S3 stored at upload when there is one."""
+    # Multipart uploads store a checksum of the part checksums ("<base64>-<parts>")
+    if "-" not in head.get("ChecksumSHA256", "-"):
+        return head["ChecksumSHA256"]
+    digest = hashlib.sha256()
+    for chunk in get_client("s3").get_object(Bucket=bucket_name, Key=file_key)["Body"].iter_chunks(1024 * 1024):
+        digest.update(chunk)
+    return base64.b64encode(digest.digest()).decode()
+
+
+def apply_concurrency(function_name, manifest, deployed_concurrency=None):
+    """Reserve the manifest's concurrency when it differs from the deployed one; returns whether it did."""
+    if "reserved_concurrency" not in manifest:
+        return False
+    reserved = int(manifest["reserved_concurrency"])
+    if reserved == deployed_concurrency:
+        return False
+    get_client("lambda").put_function_concurrency(FunctionName=function_name, ReservedConcurrentExecutions=reserved)
+    return True
+
+
+def deploy(function_name, bucket_name, file_key):
+    """Create or update one function; returns the metric counting the outcome."""
+    lambda_client = get_client("lambda")
+    file_key, head = head_package(bucket_name, function_name, file_key)
+    if file_key is None:
+        print(f"No package uploaded for {function_name} yet, manifest applied on its upload.")
+        return UNCHANGED
+    manifest = read_manifest(bucket_name, function_name, head)
+    settings = configuration(manifest)
+    architectures = [manifest["architecture"]] if "architecture" in manifest else []
+
+    try:
+        # Check if function already exists
+        deployed = lambda_client.get_function(FunctionName=function_name)
+    except lambda_client.exceptions.ResourceNotFoundException:
+        # If it doesn't exist, create the Lambda function
+        lambda_client.create_function(**{
+            "FunctionName": function_name,
+            "Runtime": "python3.9",
+            "Role": os.environ["LAMBDA_ROLE_ARN"],
+            "Handler": f"{function_name}.lambda_handler",  # Python module must match file name
+            "Code": {"S3Bucket": bucket_name, "S3Key": file_key},
+            "Timeout": 300,
+            "MemorySize": 128,
+            **({"Architectures": architectures} if architectures else {}),
+            **settings
+        })
+        apply_concurrency(function_name, manifest)
+        print(f"Lambda {function_name} created.")
+        return CREATED
+
+    configured = deployed["Configuration"]
+    code_changed = object_sha256(bucket_name, file_key, head) != configured["CodeSha256"]
+    architecture_changed = bool(architectures) and architectures != configured.get("Architectures", ["x86_64"])
+    if code_changed or architecture_changed:
+        # If it exists, update the code (the architecture can only change with the code)
+        lambda_client.update_function_code(
+            FunctionName=function_name,
+            S3Bucket=bucket_name,
+            S3Key=file_key,
+            **({"Architectures": architectures} if architectures else {})
+        )
+        code_changed = True
+
+    changes = configuration_changes(settings, configured)
+    if changes:
+        if code_changed:
+            # A configuration update is rejected while the code update is in progress
+            lambda_client.get_waiter("function_updated_v2").wait(FunctionName=function_name)
+        lambda_client.update_function_configuration(FunctionName=function_name, **changes)
+    concurrency_changed = apply_concurrency(
+        function_name, manifest, deployed.get("Concurrency", {}).get("ReservedConcurrentExecutions"))
+
+    if code_changed:
+        print(f"Lambda {function_name} updated.")
+        return UPDATED
+    if changes or concurrency_changed:
+        print(f"Lambda {function_name} reconfigured: {', '.join(sorted(changes)) or 'concurrency'}.")
+        return RECONFIGURED
+    print(f"Lambda {function_name} already runs this code and configuration, skipped.")
+    return UNCHANGED
+
+
+def lambda_handler(event, context):
+    started = time.perf_counter()
+    counts = dict.fromkeys([CREATED, UPDATED, RECONFIGURED, UNCHANGED, "FilesSkipped", "UploadsMerged", "DeployFailures"], 0)
+    try:
+        uploads = latest_uploads(s3_records(event), counts)
+        with ThreadPoolExecutor(max_workers=deploy_concurrency()) as executor:
+            futures = {function_name: executor.submit(deploy, function_name, bucket_name, file_key)
+                       for function_name, (bucket_name, file_key, _) in uploads.items()}
+
+        failed = []
+        for function_name, future in futures.items():
+            try:
+                counts[future.result()] += 1
+            except Exception as err:
+                print(f"Deploying {function_name} failed: {err}")
+                failed.append(function_name)
+        counts["DeployFailures"] = len(failed)
+        failed_messages = sorted({message_id for function_name in failed
+                                  for message_id in uploads[function_name][2] if message_id})
+        if failed and not failed_messages:
+            # The event is retried as a whole; the deploys that succeeded are then skipped as unchanged
+            raise RuntimeError(f"Deploying {', '.join(failed)} failed")
+        # Partial batch response: only these SQS messages are redelivered
+        return {"batchItemFailures": [{"itemIdentifier": message_id} for message_id in failed_messages]}
+    finally:
+        counts["DeployDuration"] = int((time.perf_counter() - started) * 1000)
+        emit_metrics(counts, {"DeployDuration": "Milliseconds"})
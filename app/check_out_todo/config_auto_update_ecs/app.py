@@ -1,5 +1,12 @@
 #!/usr/bin/env python3
+import os
+import sys
+
 import aws_cdk as cdk
+
+# cdk_stack uses the repository's `app` package, which this file would otherwise shadow
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
 from cdk_stack import ConfigUpdateStack
 
 app = cdk.App()
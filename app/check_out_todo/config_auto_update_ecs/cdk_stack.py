@@ -1,3 +1,6 @@
+import os
+
+import aws_cdk as cdk
 from aws_cdk import (
     Stack,
     aws_s3 as s3,
@@ -7,6 +10,11 @@ from aws_cdk import (
 )
 from constructs import Construct
 
+from app.utility.lambda_alarms import CONFIG_UPDATE_ALARMS, LambdaMetricAlarms
+
+METRICS_NAMESPACE = "ConfigUpdate"
+LAMBDA_DIR = os.path.join(os.path.dirname(__file__), "lambda")
+
 class ConfigUpdateStack(Stack):
     def __init__(self, scope: Construct, id: str, **kwargs):
         super().__init__(scope, id, **kwargs)
@@ -23,8 +31,8 @@ class ConfigUpdateStack(Stack):
         config_update_lambda = _lambda.Function(
             self, "ConfigUpdateLambda",
             runtime=_lambda.Runtime.PYTHON_3_12,
-            handler="handler.lambda_handler",
-            code=_lambda.Code.from_asset("lambda"),  # path to Lambda code
+            handler="lambda.lambda_handler",
+            code=_lambda.Code.from_asset(LAMBDA_DIR, exclude=["__pycache__"]),  # path to Lambda code
             environment={
                 "CLUSTER_NAME": "your-ecs-cluster",
                 "SERVICE_NAME": "your-ecs-service",
@@ -32,6 +40,7 @@ class ConfigUpdateStack(Stack):
                 "TASK_ROLE_ARN": "your-task-role-arn",
                 "EXECUTION_ROLE_ARN": "your-execution-role-arn",
                 "TASK_FAMILY": "your-task-family",
+                "METRICS_NAMESPACE": METRICS_NAMESPACE,
             },
             timeout=cdk.Duration.seconds(300),
         )
@@ -53,6 +62,9 @@ class ConfigUpdateStack(Stack):
             )
         )
 
+        LambdaMetricAlarms(self, "ConfigUpdateAlarms", function=config_update_lambda,
+                           namespace=METRICS_NAMESPACE, service="config-update", thresholds=CONFIG_UPDATE_ALARMS)
+
         # 4. Add S3 notification to trigger Lambda
         notification = s3n.LambdaDestination(config_update_lambda)
         config_bucket.add_event_notification(
@@ -1,45 +1,129 @@
-import boto3
 import json
 import os
+import time
 
-# Initialize AWS clients
-s3 = boto3.client('s3')
-secretsmanager = boto3.client('secretsmanager')
-ecs = boto3.client('ecs')
+# Environment variables passed to Lambda (set in CDK), read on each invocation
+SETTINGS = ['CLUSTER_NAME', 'SERVICE_NAME', 'CONTAINER_NAME', 'TASK_ROLE_ARN', 'EXECUTION_ROLE_ARN', 'TASK_FAMILY']
 
-# Environment variables passed to Lambda (set in CDK)
-CLUSTER_NAME = os.environ['CLUSTER_NAME']
-SERVICE_NAME = os.environ['SERVICE_NAME']
-CONTAINER_NAME = os.environ['CONTAINER_NAME']
-TASK_ROLE_ARN = os.environ['TASK_ROLE_ARN']
-EXECUTION_ROLE_ARN = os.environ['EXECUTION_ROLE_ARN']
-TASK_FAMILY = os.environ['TASK_FAMILY']
+
+class ContainerNotFoundError(Exception):
+    """A config names a container the service's task definition does not have."""
+    pass
+
+
+# AWS clients by service name, created on first use (tests and the benchmark put stand-ins here)
+_clients = {}
+
+
+def get_client(service_name):
+    if service_name not in _clients:
+        import boto3
+        _clients[service_name] = boto3.client(service_name)
+    return _clients[service_name]
+
+
+def load_settings():
+    """The environment variables the update needs; a missing one fails the invocation, not the import."""
+    return {name: os.environ[name] for name in SETTINGS}
 
 
 def load_config_from_s3(bucket, key):
     """Load the configuration file from S3."""
-    response = s3.get_object(Bucket=bucket, Key=key)
+    response = get_client('s3').get_object(Bucket=bucket, Key=key)
     content = response['Body'].read().decode('utf-8')
     return json.loads(content)
 
 
 def get_secret_arn(secret_name):
     """Retrieve the full ARN of a secret given its name."""
-    response = secretsmanager.describe_secret(SecretId=secret_name)
+    response = get_client('secretsmanager').describe_secret(SecretId=secret_name)
     return response['ARN']
 
 
+def emit_metrics(values, units):
+    """Print the values as a CloudWatch Embedded Metric Format record (Count unless listed in units)."""
+    print(json.dumps({
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": os.environ.get('METRICS_NAMESPACE', 'ConfigUpdate'),
+                "Dimensions": [["service"]],
+                "Metrics": [{"Name": name, "Unit": units.get(name, "Count")} for name in values],
+            }],
+        },
+        "service": "config-update",
+        **values,
+    }))
+
+
 def lambda_handler(event, context):
     """Lambda entry point."""
     print(f"Received event: {json.dumps(event)}")
-
+    started = time.perf_counter()
+    counts = {"ConfigUpdates": 0, "ConfigsSuperseded": 0, "UpdatesSkipped": 0, "SecretsResolved": 0,
+              "UpdateFailures": 0}
+    try:
+        settings = load_settings()
+        failed = []
+        for service_name, config in latest_configs(event['Records'], settings, counts).items():
+            try:
+                if update_service(service_name, config, settings, counts):
+                    counts["ConfigUpdates"] += 1
+                else:
+                    counts["UpdatesSkipped"] += 1
+            except Exception as err:
+                print(f"Updating {service_name} failed: {err}")
+                failed.append(service_name)
+        counts["UpdateFailures"] = len(failed)
+        if failed:
+            # The event is retried as a whole; the services already updated are then skipped as unchanged
+            raise RuntimeError(f"Updating {', '.join(failed)} failed")
+    except Exception:
+        counts["UpdateFailures"] = max(counts["UpdateFailures"], 1)
+        raise
+    finally:
+        counts["UpdateDuration"] = int((time.perf_counter() - started) * 1000)
+        emit_metrics(counts, {"UpdateDuration": "Milliseconds"})
+
+
+def latest_configs(records, settings, counts):
+    """
+    Service name -> {container name -> the config of its latest upload} among the S3 records.
+    A config names its service with "service" and its container with "container"
+    (SERVICE_NAME and CONTAINER_NAME when it does not). Each config replaces the whole
+    environment and secrets of its container, so applying only the latest one per container
+    ends in the same state as applying them all in turn.
+    """
     # Event structure based on S3 PUT trigger
-    bucket = event['Records'][0]['s3']['bucket']['name']
-    key = event['Records'][0]['s3']['object']['key']
-
-    # Load the config
-    config = load_config_from_s3(bucket, key)
-
+    latest = {}
+    for record in records:
+        bucket = record['s3']['bucket']['name']
+        key = record['s3']['object']['key']
+        # Event time, then S3's per-key sequencer, orders the uploads
+        order = (record.get('eventTime', ''), record['s3']['object'].get('sequencer', ''))
+        if key in latest:
+            counts["ConfigsSuperseded"] += 1
+            if order < latest[key][0]:
+                continue
+        latest[key] = (order, bucket)
+
+    configs = {}
+    for key, (order, bucket) in sorted(latest.items(), key=lambda upload: upload[1][0]):
+        config = load_config_from_s3(bucket, key)
+        containers = configs.setdefault(config.get('service', settings['SERVICE_NAME']), {})
+        container_name = config.get('container', settings['CONTAINER_NAME'])
+        if container_name in containers:
+            counts["ConfigsSuperseded"] += 1
+        containers[container_name] = config
+    return configs
+
+
+def sorted_by_name(variables):
+    return sorted(variables, key=lambda variable: variable['name'])
+
+
+def container_settings(config, counts):
+    """The container environment and secrets entries of a config."""
     # Prepare environment variables
     environment_vars = [
         {"name": k, "value": v}
@@ -53,16 +137,27 @@ def lambda_handler(event, context):
         resource_name = secret['resource']
 
         secret_arn = get_secret_arn(secret_name)
+        counts["SecretsResolved"] += 1
 
         secrets_list.append({
             "name": f"{resource_name.upper()}_SECRET",
             "valueFrom": secret_arn
         })
+    return environment_vars, secrets_list
+
+
+def update_service(service_name, configs, settings, counts):
+    """
+    Apply the configs (by container name) to the ECS service's containers and redeploy it in
+    one task definition revision; returns False, without registering a revision, when the
+    containers already have these environments and secrets.
+    """
+    ecs = get_client('ecs')
 
     # Fetch the current task definition
     service_response = ecs.describe_services(
-        cluster=CLUSTER_NAME,
-        services=[SERVICE_NAME]
+        cluster=settings['CLUSTER_NAME'],
+        services=[service_name]
     )
     task_definition_arn = service_response['services'][0]['taskDefinition']
 
@@ -71,24 +166,43 @@ def lambda_handler(event, context):
     )['taskDefinition']
 
     container_definitions = task_definition['containerDefinitions']
-
-    # Update the correct container definition
-    for container in container_definitions:
-        if container['name'] == CONTAINER_NAME:
-            container['environment'] = environment_vars
-            container['secrets'] = secrets_list
+    containers = {container['name']: container for container in container_definitions}
+    unknown = sorted(set(configs) - set(containers))
+    if unknown:
+        raise ContainerNotFoundError(f"{service_name} has no container {', '.join(unknown)}")
+
+    # Update the correct container definitions
+    changed = False
+    for container_name, config in configs.items():
+        container = containers[container_name]
+        environment_vars, secrets_list = container_settings(config, counts)
+        changed = changed or (sorted_by_name(container.get('environment', [])) != sorted_by_name(environment_vars)
+                              or sorted_by_name(container.get('secrets', [])) != sorted_by_name(secrets_list))
+        container['environment'] = environment_vars
+        container['secrets'] = secrets_list
+    if not changed:
+        print(f"{service_name} already runs this config, no new deployment.")
+        return False
+
+    # The Lambda's own service takes its family and roles from the environment, services
+    # named by their configs keep their own
+    if service_name == settings['SERVICE_NAME']:
+        family = settings['TASK_FAMILY']
+        roles = {'executionRoleArn': settings['EXECUTION_ROLE_ARN'], 'taskRoleArn': settings['TASK_ROLE_ARN']}
+    else:
+        family = task_definition['family']
+        roles = {name: task_definition[name] for name in ('executionRoleArn', 'taskRoleArn') if name in task_definition}
 
     # Register new task definition revision
     register_response = ecs.register_task_definition(
-        family=TASK_FAMILY,
+        family=family,
         networkMode=task_definition['networkMode'],
         containerDefinitions=container_definitions,
         requiresCompatibilities=task_definition['requiresCompatibilities'],
         cpu=task_definition.get('cpu'),
         memory=task_definition.get('memory'),
-        executionRoleArn=EXECUTION_ROLE_ARN,
-        taskRoleArn=TASK_ROLE_ARN,
         volumes=task_definition.get('volumes', []),  # Carry forward volumes if any
+        **roles,
     )
 
     new_task_definition_arn = register_response['taskDefinition']['taskDefinitionArn']
@@ -97,10 +211,11 @@ def lambda_handler(event, context):
 
     # Update ECS service to use the new task definition
     ecs.update_service(
-        cluster=CLUSTER_NAME,
-        service=SERVICE_NAME,
+        cluster=settings['CLUSTER_NAME'],
+        service=service_name,
         taskDefinition=new_task_definition_arn,
         forceNewDeployment=True  # Forces tasks to restart
     )
 
-    print("Service updated successfully and new deployment started.")
+    print(f"Service {service_name} updated successfully and new deployment started.")
+    return True
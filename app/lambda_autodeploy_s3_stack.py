@@ -4,9 +4,27 @@ import aws_cdk.aws_s3 as s3
 import aws_cdk.aws_lambda as _lambda
 import aws_cdk.aws_iam as iam
 import aws_cdk.aws_s3_notifications as s3_notifications
+import aws_cdk.aws_sqs as sqs
+import aws_cdk.aws_lambda_event_sources as lambda_event_sources
+import os
+from typing import Optional
+
+from app.utility.lambda_alarms import AUTO_DEPLOY_ALARMS, LambdaMetricAlarms
+
+METRICS_NAMESPACE = "LambdaAutoDeploy"
+DEPLOYER_DIR = os.path.join(os.path.dirname(__file__), "auto_deploy_lambda")
 
 class LambdaAutoDeployStack(Stack):
-    def __init__(self, scope: Construct, stack_id: str, **kwargs):
+    def __init__(self, scope: Construct, stack_id: str, deploy_concurrency: int = 8, buffered: bool = False,
+                 batch_size: int = 100, batching_window: Optional[Duration] = None,
+                 max_deployers: int = 2, **kwargs):
+        """
+        deploy_concurrency: functions deployed at the same time from one batch of uploads.
+        buffered: route the bucket events through an SQS queue; the deploy Lambda receives up to
+            `batch_size` of them at once, gathered for up to `batching_window` (default 20 seconds), with at most
+            `max_deployers` batches (2-1000) deployed at the same time. Failed deploys are
+            retried from the queue, then kept in a dead-letter queue.
+        """
         super().__init__(scope, stack_id, **kwargs)
 
         #  Create an S3 Bucket to store Lambda ZIP files
@@ -23,69 +41,48 @@ class LambdaAutoDeployStack(Stack):
             ]
         )
 
-        #  Auto-Deploy Lambda Function
-        deploy_lambda_code = """
-            import boto3
-            import os
-
-            s3_client = boto3.client("s3")
-            lambda_client = boto3.client("lambda")
-
-            def lambda_handler(event, context):
-                for record in event["Records"]:
-                    bucket_name = record["s3"]["bucket"]["name"]
-                    file_key = record["s3"]["object"]["key"]
-
-                    if not file_key.endswith(".py"):
-                        print(f"Skipping non-Python file: {file_key}")
-                        continue  # Ignore non-Python files
-
-                    function_name = file_key.replace(".py", "")
-
-                    try:
-                        # Check if function already exists
-                        response = lambda_client.get_function(FunctionName=function_name)
-
-                        # If it exists, update the code
-                        lambda_client.update_function_code(
-                            FunctionName=function_name,
-                            S3Bucket=bucket_name,
-                            S3Key=file_key
-                        )
-                        print(f"Lambda {function_name} updated.")
-
-                    except lambda_client.exceptions.ResourceNotFoundException:
-                        # If it doesn't exist, create the Lambda function
-                        lambda_client.create_function(
-                            FunctionName=function_name,
-                            Runtime="python3.9",
-                            Role=os.environ["LAMBDA_ROLE_ARN"],
-                            Handler=f"{function_name}.lambda_handler",  # Python module must match file name
-                            Code={"S3Bucket": bucket_name, "S3Key": file_key},
-                            Timeout=300,
-                            MemorySize=128
-                        )
-                        print(f"Lambda {function_name} created.")
-        """
-
-        # Auto deploy the inline lambda function
+        #  Auto-Deploy Lambda Function (app/auto_deploy_lambda; too large for inline code)
         deploy_lambda = _lambda.Function(
             self, "AutoDeployLambda",
             runtime=_lambda.Runtime.PYTHON_3_9,
-            handler="index.lambda_handler",
-            code=_lambda.Code.from_inline(deploy_lambda_code),
+            handler="deployer.lambda_handler",
+            code=_lambda.Code.from_asset(DEPLOYER_DIR, exclude=["__pycache__"]),
             timeout=Duration.minutes(5),
             role=lambda_role,
             environment={
-                "LAMBDA_ROLE_ARN": lambda_role.role_arn  # Allow Lambda to create functions
+                "LAMBDA_ROLE_ARN": lambda_role.role_arn,  # Allow Lambda to create functions
+                "METRICS_NAMESPACE": METRICS_NAMESPACE,
+                "DEPLOY_CONCURRENCY": str(deploy_concurrency)
             }
         )
 
-        # 🔥 S3 Bucket triggers the Deploy Lambda when a ZIP file is uploaded
-        bucket.add_event_notification(
-            s3.EventType.OBJECT_CREATED,
-            s3_notifications.LambdaDestination(deploy_lambda)
-        )
+        LambdaMetricAlarms(self, "AutoDeployAlarms", function=deploy_lambda, namespace=METRICS_NAMESPACE,
+                           service="lambda-auto-deploy", thresholds=AUTO_DEPLOY_ALARMS)
+
+        if buffered:
+            dead_letter_queue = sqs.Queue(self, "DeployDeadLetterQueue", retention_period=Duration.days(14))
+            queue = sqs.Queue(
+                self, "DeployQueue",
+                # At least 6x the Lambda timeout, so batches still in flight are not redelivered
+                visibility_timeout=Duration.minutes(30),
+                dead_letter_queue=sqs.DeadLetterQueue(max_receive_count=5, queue=dead_letter_queue)
+            )
+            bucket.add_event_notification(s3.EventType.OBJECT_CREATED, s3_notifications.SqsDestination(queue))
+            deploy_lambda.add_event_source(lambda_event_sources.SqsEventSource(
+                queue,
+                batch_size=batch_size,
+                max_batching_window=batching_window or Duration.seconds(20),
+                max_concurrency=max_deployers,
+                report_batch_item_failures=True
+            ))
+            CfnOutput(self, "DeployQueueUrl", value=queue.queue_url)
+            CfnOutput(self, "DeployDeadLetterQueueUrl", value=dead_letter_queue.queue_url)
+        else:
+            # 🔥 S3 Bucket triggers the Deploy Lambda when a ZIP file is uploaded
+            bucket.add_event_notification(
+                s3.EventType.OBJECT_CREATED,
+                s3_notifications.LambdaDestination(deploy_lambda)
+            )
 
         # Outputs
         CfnOutput(self, "S3BucketName", value=bucket.bucket_name)
@@ -8,6 +8,8 @@ from aws_cdk import (
 )
 from constructs import Construct
 
+from app.utility.parameter_resolver import VPC_ID_PARAMETER, resolver_for
+
 
 def get_user_data(dns: str) -> ec2.UserData:
     user_data = ec2.UserData.custom(
@@ -47,7 +49,7 @@ class EC2WithNginxLBStack(Stack):
         self.security_group = ec2.SecurityGroup.from_security_group_id(
                 self, "ImportedSG", sg_id, mutable=False
         )
-        vpc_id = ssm.StringParameter.value_from_lookup(self, "vpcstack_vpc_vpc_id")
+        vpc_id = resolver_for(self).get(VPC_ID_PARAMETER)
         self.vpc = ec2.Vpc.from_lookup(self, "VPCImported", vpc_id=vpc_id)
 
         self.nginx_instance = ec2.Instance(
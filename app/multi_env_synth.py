@@ -0,0 +1,159 @@
+"""
+Synthesize every configured environment in parallel.
+
+Each environment listed in config/account_details.env.json is synthesized in its own
+worker process (each with its own jsii runtime) into cdk.out/<environment>, and a merged
+summary is written to cdk.out/synth-summary.json.
+
+    python -m app.multi_env_synth                      # all environments
+    python -m app.multi_env_synth --env dev --env prod
+    python -m app.multi_env_synth -c stacks=InfraStack --workers 2
+
+Deploy one of the assemblies with `cdk deploy --app cdk.out/<environment>`.
+
+The workers synthesize outside the cdk CLI, so they cannot perform context lookups
+(Vpc.from_lookup, value_from_lookup): they use the values cached in cdk.context.json and an
+environment fails while any lookup is missing. Run `cdk synth -c environment=<environment>`
+once to fill the cache.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from app.utility.app_config import (ENVIRONMENT_CONTEXT_KEY, OVERRIDES_CONTEXT_KEY, environment_names,
+                                    load_config, parse_overrides)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTDIR = os.path.join(PROJECT_ROOT, "cdk.out")
+SUMMARY_FILENAME = "synth-summary.json"
+
+
+class MissingContextError(Exception):
+    """Raised when an assembly was synthesized with dummy values for lookups missing from cdk.context.json"""
+    pass
+
+
+def missing_context(outdir: str) -> List[str]:
+    """The context lookups the assembly in `outdir` recorded as missing (its manifest's `missing` entries)."""
+    with open(os.path.join(outdir, "manifest.json"), "r") as f:
+        manifest = json.load(f)
+    return [f"{entry['key']} ({entry.get('provider', 'unknown provider')})" for entry in manifest.get("missing", [])]
+
+
+def project_context() -> Dict[str, Any]:
+    """
+    The context the cdk CLI would pass to app.py: feature flags from cdk.json plus
+    cached lookups from cdk.context.json.
+    """
+    context: Dict[str, Any] = {}
+    for filename, key in (("cdk.json", "context"), ("cdk.context.json", None)):
+        path = os.path.join(PROJECT_ROOT, filename)
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                content = json.load(f)
+            context.update(content.get(key, {}) if key else content)
+    return context
+
+
+def synth_environment(environment_name: str, outdir: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    """Worker: synthesize one environment into `outdir` and describe the result."""
+    import aws_cdk as cdk
+    from app.synthesis import synthesize
+
+    started = time.perf_counter()
+    config = load_config(environment_name, parse_overrides(context.get(OVERRIDES_CONTEXT_KEY)))
+    app = cdk.App(outdir=outdir, context={**context, ENVIRONMENT_CONTEXT_KEY: environment_name,
+                                          "region": config["region"]})
+    assembly, _ = synthesize(app, env={"account": config["account"], "region": config["region"]})
+    missing = missing_context(outdir)
+    if missing:
+        raise MissingContextError(f"{len(missing)} context lookups are not in cdk.context.json, run "
+                                  f"`cdk synth -c {ENVIRONMENT_CONTEXT_KEY}={environment_name}` first: "
+                                  f"{', '.join(missing)}")
+
+    return {
+        "environment": environment_name,
+        "account": config["account"],
+        "region": config["region"],
+        "outdir": outdir,
+        "seconds": time.perf_counter() - started,
+        "stacks": [
+            {"name": stack.stack_name, "template": os.path.relpath(stack.template_full_path, outdir)}
+            for stack in assembly.stacks
+        ],
+    }
+
+
+def synth_all(environments: List[str], outdir: str = DEFAULT_OUTDIR, context: Optional[Dict[str, Any]] = None,
+              workers: Optional[int] = None) -> Dict[str, Any]:
+    context = dict(project_context(), **(context or {}))
+
+    # Validate every environment up front, before any worker starts
+    for environment_name in environments:
+        load_config(environment_name, parse_overrides(context.get(OVERRIDES_CONTEXT_KEY)))
+
+    started = time.perf_counter()
+    results: List[Dict[str, Any]] = []
+    failures: Dict[str, str] = {}
+    # spawn: every worker starts its own jsii runtime instead of inheriting the parent's
+    with ProcessPoolExecutor(max_workers=workers or len(environments),
+                             mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {
+            executor.submit(synth_environment, name, os.path.join(outdir, name), context): name
+            for name in environments
+        }
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                failures[futures[future]] = str(e)
+
+    results.sort(key=lambda result: environments.index(result["environment"]))
+    summary = {
+        "total_seconds": time.perf_counter() - started,
+        "slowest_seconds": max((result["seconds"] for result in results), default=0.0),
+        "environments": results,
+        "failures": failures,
+    }
+    os.makedirs(outdir, exist_ok=True)
+    with open(os.path.join(outdir, SUMMARY_FILENAME), "w") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def parse_context(pairs: List[str]) -> Dict[str, Any]:
+    context = {}
+    for pair in pairs:
+        key, _, value = pair.partition("=")
+        context[key] = value
+    return context
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Synthesize every configured environment in parallel")
+    parser.add_argument("--env", action="append", dest="environments",
+                        help="environment to synthesize (repeatable, default: all configured)")
+    parser.add_argument("--outdir", default=DEFAULT_OUTDIR)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("-c", "--context", action="append", default=[], help="context key=value")
+    args = parser.parse_args(argv)
+
+    environments = args.environments or environment_names()
+    summary = synth_all(environments, args.outdir, parse_context(args.context), args.workers)
+
+    for result in summary["environments"]:
+        print(f"{result['environment']:12} {result['seconds']:7.2f}s  {len(result['stacks'])} stacks  "
+              f"-> {result['outdir']}")
+    for environment_name, error in summary["failures"].items():
+        print(f"{environment_name:12} FAILED: {error}")
+    print(f"total {summary['total_seconds']:.2f}s (slowest environment {summary['slowest_seconds']:.2f}s)")
+    return 1 if summary["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,256 @@
+"""
+Database drivers for the init handler, chosen from DB_ENGINE (the `InstanceType` value
+RdsWithInitializationStack was built with). A driver connects, classifies connection errors,
+tells the SQL tokenizer how to read its dialect and provides the bulk seed-loading path:
+
+  - MySQL: mysql-connector, `LOAD DATA LOCAL INFILE` for CSV seed files
+  - Postgres: psycopg2, `COPY ... FROM STDIN` streaming CSV and NDJSON seed files
+
+Both can be run against local containers, e.g.
+    docker run -d -p 3306:3306 -e MYSQL_ROOT_PASSWORD=secret -e MYSQL_DATABASE=app mysql:8.0
+    docker run -d -p 5432:5432 -e POSTGRES_PASSWORD=secret -e POSTGRES_DB=app postgres:16
+"""
+import io
+import json
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+
+class UnsupportedEngineError(Exception):
+    """Raised for a DB_ENGINE without a driver"""
+    pass
+
+
+class Driver:
+    name = ""
+    default_port = 0
+    # Subdirectory of migrations/ holding this dialect's migrations
+    migrations_dir = ""
+    placeholder = "%s"
+    # SqlStatementReader options for the dialect
+    reader_options: Dict[str, bool] = {}
+    # (table, referenced table) for every foreign key in the current database / schema
+    foreign_keys_query = ""
+
+    @property
+    def Error(self) -> Any:
+        raise NotImplementedError
+
+    def connect(self, host: str, port: Optional[int], user: str, password: str, database: str,
+                allow_local_infile: bool = False) -> Any:
+        raise NotImplementedError
+
+    def is_host_error(self, err: Exception) -> bool:
+        """The server could not be reached (yet): worth retrying with backoff"""
+        raise NotImplementedError
+
+    def is_access_denied(self, err: Exception) -> bool:
+        raise NotImplementedError
+
+    def is_connected(self, conn: Any) -> bool:
+        raise NotImplementedError
+
+    def quote_identifier(self, name: str) -> str:
+        raise NotImplementedError
+
+    def bulk_load(self, conn: Any, source: Any, columns: Sequence[str],
+                  rows: Iterator[Tuple[Any, ...]], commit: bool = True) -> Optional[int]:
+        """
+        Load `source` with the engine's bulk path, committing unless `commit` is False;
+        None when it has none for the source's format.
+        """
+        return None
+
+    def load_rows(self, conn: Any, table: str, columns: Sequence[str],
+                  rows: Iterator[Tuple[Any, ...]]) -> Optional[int]:
+        """Bulk load `rows` without committing; None when the engine can only bulk load whole files."""
+        return None
+
+
+class MySqlDriver(Driver):
+    name = "MySQL"
+    default_port = 3306
+    migrations_dir = "mysql"
+    reader_options = {"backslash_escapes": True, "hash_comments": True}
+    foreign_keys_query = ("SELECT TABLE_NAME, REFERENCED_TABLE_NAME FROM information_schema.KEY_COLUMN_USAGE "
+                          "WHERE TABLE_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME IS NOT NULL")
+
+    def __init__(self) -> None:
+        import mysql.connector
+        from mysql.connector import errorcode
+        self.connector = mysql.connector
+        self.errorcode = errorcode
+
+    @property
+    def Error(self) -> Any:
+        return self.connector.Error
+
+    def connect(self, host: str, port: Optional[int], user: str, password: str, database: str,
+                allow_local_infile: bool = False) -> Any:
+        return self.connector.connect(
+            host=host,
+            port=port or self.default_port,
+            user=user,
+            password=password,
+            database=database,
+            connection_timeout=10,
+            connect_timeout=10,
+            autocommit=False,
+            allow_local_infile=allow_local_infile
+        )
+
+    def is_host_error(self, err: Exception) -> bool:
+        return getattr(err, "errno", None) == self.errorcode.CR_CONN_HOST_ERROR
+
+    def is_access_denied(self, err: Exception) -> bool:
+        return getattr(err, "errno", None) == self.errorcode.ER_ACCESS_DENIED_ERROR
+
+    def is_connected(self, conn: Any) -> bool:
+        return conn.is_connected()
+
+    def quote_identifier(self, name: str) -> str:
+        return "`" + name.replace("`", "``") + "`"
+
+    def bulk_load(self, conn: Any, source: Any, columns: Sequence[str],
+                  rows: Iterator[Tuple[Any, ...]], commit: bool = True) -> Optional[int]:
+        """CSV only; the connection must be opened with allow_local_infile=True."""
+        if source.format != "csv":
+            return None
+        variables = [f"@c{index}" for index in range(len(columns))]
+        assignments = ", ".join(f"{self.quote_identifier(column)} = NULLIF({variable}, '')"
+                                for column, variable in zip(columns, variables))
+        sql = (f"LOAD DATA LOCAL INFILE %s INTO TABLE {self.quote_identifier(source.table)} CHARACTER SET utf8mb4 "
+               f"FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+               f"LINES TERMINATED BY '\\n' IGNORE 1 LINES ({', '.join(variables)}) SET {assignments}")
+        with source.local_path() as path:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql, (path,))
+                loaded = cursor.rowcount
+                if commit:
+                    conn.commit()
+            finally:
+                cursor.close()
+        return loaded
+
+
+class CsvRowStream(io.RawIOBase):
+    """
+    Rows rendered as CSV on demand, as a file object for COPY FROM STDIN. None is written
+    unquoted (NULL), every other value quoted; lists and objects are written as JSON.
+    """
+
+    def __init__(self, rows: Iterator[Tuple[Any, ...]]) -> None:
+        self.rows = rows
+        self.buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    @staticmethod
+    def _field(value: Any) -> str:
+        if value is None:
+            return ""
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        elif isinstance(value, (dict, list)):
+            value = json.dumps(value)
+        return '"' + str(value).replace('"', '""') + '"'
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self.buffer) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.buffer += (",".join(self._field(value) for value in row) + "\n").encode("utf-8")
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+
+class PostgresDriver(Driver):
+    name = "Postgres"
+    default_port = 5432
+    migrations_dir = "postgres"
+    reader_options = {"backslash_escapes": False, "hash_comments": False, "dollar_quotes": True}
+    foreign_keys_query = ("SELECT conrelid::regclass::text, confrelid::regclass::text FROM pg_constraint "
+                          "WHERE contype = 'f' AND connamespace = current_schema()::regnamespace")
+
+    def __init__(self) -> None:
+        import psycopg2
+        self.psycopg2 = psycopg2
+
+    @property
+    def Error(self) -> Any:
+        return self.psycopg2.Error
+
+    def connect(self, host: str, port: Optional[int], user: str, password: str, database: str,
+                allow_local_infile: bool = False) -> Any:
+        conn = self.psycopg2.connect(host=host, port=port or self.default_port, user=user, password=password,
+                                     dbname=database, connect_timeout=10)
+        conn.autocommit = False
+        return conn
+
+    def is_host_error(self, err: Exception) -> bool:
+        message = str(err)
+        return isinstance(err, self.psycopg2.OperationalError) and (
+            "could not connect" in message or "timeout expired" in message or "the database system is" in message)
+
+    def is_access_denied(self, err: Exception) -> bool:
+        return isinstance(err, self.psycopg2.OperationalError) and "password authentication failed" in str(err)
+
+    def is_connected(self, conn: Any) -> bool:
+        if conn.closed:
+            return False
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        finally:
+            cursor.close()
+        return True
+
+    def quote_identifier(self, name: str) -> str:
+        return '"' + name.replace('"', '""') + '"'
+
+    def copy_statement(self, table: str, columns: Sequence[str], header: bool) -> str:
+        return (f"COPY {self.quote_identifier(table)} ({', '.join(self.quote_identifier(c) for c in columns)}) "
+                f"FROM STDIN WITH (FORMAT csv, HEADER {'true' if header else 'false'})")
+
+    def bulk_load(self, conn: Any, source: Any, columns: Sequence[str],
+                  rows: Iterator[Tuple[Any, ...]], commit: bool = True) -> Optional[int]:
+        if source.format != "csv":
+            loaded = self.load_rows(conn, source.table, columns, rows)
+            if commit:
+                conn.commit()
+            return loaded
+        cursor = conn.cursor()
+        try:
+            # The seed file is already CSV: stream it to the server as is
+            with source.open() as f:
+                cursor.copy_expert(self.copy_statement(source.table, columns, header=True), f)
+            loaded = cursor.rowcount
+            if commit:
+                conn.commit()
+        finally:
+            cursor.close()
+        return loaded
+
+    def load_rows(self, conn: Any, table: str, columns: Sequence[str],
+                  rows: Iterator[Tuple[Any, ...]]) -> Optional[int]:
+        cursor = conn.cursor()
+        try:
+            cursor.copy_expert(self.copy_statement(table, columns, header=False), CsvRowStream(rows))
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+
+DRIVERS = {MySqlDriver.name: MySqlDriver, PostgresDriver.name: PostgresDriver}
+
+
+def driver_for(engine: str) -> Driver:
+    if engine not in DRIVERS:
+        raise UnsupportedEngineError(f"No database driver for engine '{engine}', expected one of "
+                                     f"{', '.join(DRIVERS)}")
+    return DRIVERS[engine]()
@@ -1,15 +1,76 @@
+from time import monotonic, perf_counter, sleep
+
+# Reported with the first invocation of every execution environment (see record_cold_start)
+_init_started = perf_counter()
+
 import os
-import mysql.connector
-import boto3
 import json
-import logging
-from time import sleep
-from aws_lambda_powertools import Logger
-from mysql.connector import errorcode
-from typing import Dict, Any
+import platform
+import threading
+from functools import partial, wraps
+from typing import TYPE_CHECKING, Callable, Dict, Any, Optional, Tuple
+
+if TYPE_CHECKING:
+    from drivers import Driver
+    from migrations import MigrationHistory
+    from seed_loader import SeedSettings
+
+# Powertools and the migration/seed modules are imported on first use, not at module load:
+# a cold start only pays for them when the invocation needs them (never for a Delete)
+
+
+class _Lazy:
+    """Creates the wrapped object on first attribute access"""
+
+    def __init__(self, factory: Callable[[], Any]) -> None:
+        self._factory = factory
+        self._target = None
+
+    def __getattr__(self, name: str) -> Any:
+        if self._target is None:
+            self._target = self._factory()
+        return getattr(self._target, name)
+
+
+def _logger():
+    from aws_lambda_powertools import Logger
+    return Logger(service="db-initializer", level=os.getenv("LOG_LEVEL", "INFO"))
+
+
+def _metrics():
+    from aws_lambda_powertools import Metrics
+    return Metrics(namespace=os.getenv("METRICS_NAMESPACE", "DbInitializer"), service="db-initializer")
+
+
+def _metric_unit():
+    from aws_lambda_powertools.metrics import MetricUnit
+    return MetricUnit
+
 
 # Initialize logger
-logger = Logger(service="db-initializer", level=os.getenv("LOG_LEVEL", "INFO"))
+logger = _Lazy(_logger)
+
+# Published as CloudWatch Embedded Metric Format records in the function's log, with a
+# `service` dimension; the stack alarms on them (see app/utility/lambda_alarms.py)
+metrics = _Lazy(_metrics)
+MetricUnit = _Lazy(_metric_unit)
+_metrics_lock = threading.Lock()
+
+# Kept across warm invocations (including the Provider's polling): the Secrets Manager
+# client, the parsed credentials for DB_CREDENTIALS_TTL seconds and one live connection
+CREDENTIALS_TTL_SECONDS = int(os.getenv("DB_CREDENTIALS_TTL", "300"))
+_secrets_client = None
+_credentials: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_connection: Optional[Tuple[Tuple[str, str, str, str, Optional[int], bool], Any]] = None
+_drivers: Dict[str, "Driver"] = {}
+_cold_start = True
+
+# Written by Dockerfile.optimized: the size of everything the image adds to the base image
+PACKAGE_BYTES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".package-bytes")
+
+# With SEED_ASYNC=true the seed files are loaded by is_complete_handler, in checkpointed chunks,
+# leaving SEED_TIME_MARGIN seconds of each invocation to finish the chunk in flight
+SEED_TIME_MARGIN_SECONDS = int(os.getenv("SEED_TIME_MARGIN", "30"))
 
 
 class DatabaseInitializationError(Exception):
@@ -17,69 +78,192 @@ class DatabaseInitializationError(Exception):
     pass
 
 
-def get_db_connection(secret_arn: str, endpoint: str, db_name: str) -> mysql.connector.connection.MySQLConnection:
+def instrumented(handler: Callable[[Dict[str, Any], Any], Dict[str, Any]]):
+    """
+    Powertools' event logging and metrics flushing around `handler`, set up on its first call
+    """
+    wrapped = None
+
+    @wraps(handler)
+    def wrapper(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+        nonlocal wrapped
+        if wrapped is None:
+            wrapped = metrics.log_metrics(logger.inject_lambda_context(log_event=True)(handler))
+        return wrapped(event, context)
+    return wrapper
+
+
+def elapsed_ms(started: float) -> int:
+    from migrations import elapsed_ms
+    return elapsed_ms(started)
+
+
+def add_metric(name: str, unit: str, value: float) -> None:
+    # Seed loader threads open connections too
+    with _metrics_lock:
+        metrics.add_metric(name=name, unit=unit, value=value)
+
+
+def record_cold_start() -> None:
+    """
+    Report, once per execution environment, how long importing the handler took and how much
+    the image adds to the base image, per release (IMAGE_RELEASE) and architecture
+    """
+    global _cold_start
+    if not _cold_start:
+        return
+    _cold_start = False
+    from aws_lambda_powertools.metrics import single_metric
+    measurements = [("InitDuration", MetricUnit.Milliseconds, INIT_DURATION_MS)]
+    if os.path.exists(PACKAGE_BYTES_FILE):
+        with open(PACKAGE_BYTES_FILE) as f:
+            measurements.append(("PackageBytes", MetricUnit.Bytes, int(f.read().strip())))
+    for name, unit, value in measurements:
+        with single_metric(name=name, unit=unit, value=value, namespace=metrics.namespace) as metric:
+            metric.add_dimension(name="service", value="db-initializer")
+            metric.add_dimension(name="release", value=os.getenv("IMAGE_RELEASE", "dev"))
+            metric.add_dimension(name="architecture", value=platform.machine())
+
+
+def get_driver(engine: str) -> "Driver":
+    """
+    The driver for DB_ENGINE, the InstanceType value the stack was built with
+    """
+    from drivers import driver_for
+    if engine not in _drivers:
+        _drivers[engine] = driver_for(engine)
+    return _drivers[engine]
+
+
+def get_secrets_client():
+    global _secrets_client
+    if _secrets_client is None:
+        # Imported on first use: keeps boto3 out of the cold start path (and out of Delete events)
+        import boto3
+        _secrets_client = boto3.client('secretsmanager')
+    return _secrets_client
+
+
+def get_db_credentials(secret_arn: str, refresh: bool = False) -> Dict[str, Any]:
+    """
+    Parsed database secret, cached for CREDENTIALS_TTL_SECONDS
+    """
+    cached = _credentials.get(secret_arn)
+    if cached and not refresh and monotonic() - cached[0] < CREDENTIALS_TTL_SECONDS:
+        return cached[1]
+    secret = get_secrets_client().get_secret_value(SecretId=secret_arn)
+    creds = json.loads(secret['SecretString'])
+    _credentials[secret_arn] = (monotonic(), creds)
+    return creds
+
+
+def get_db_connection(driver: "Driver", secret_arn: str, endpoint: str, db_name: str, port: Optional[int] = None,
+                      allow_local_infile: bool = False) -> Any:
     """
     Establish database connection with retry logic
     """
-    secrets_client = boto3.client('secretsmanager')
     max_attempts = 5
     attempt = 0
     wait_seconds = 5
+    refresh_credentials = False
+    started = perf_counter()
 
     while attempt < max_attempts:
         try:
-            secret = secrets_client.get_secret_value(SecretId=secret_arn)
-            creds = json.loads(secret['SecretString'])
-
-            conn = mysql.connector.connect(
-                host=endpoint,
-                user=creds['username'],
-                password=creds['password'],
-                database=db_name,
-                connection_timeout=10,
-                connect_timeout=10,
-                autocommit=False
-            )
-
-            logger.info("Successfully connected to database")
+            creds = get_db_credentials(secret_arn, refresh=refresh_credentials)
+
+            conn = driver.connect(endpoint, port, creds['username'], creds['password'], db_name,
+                                  allow_local_infile=allow_local_infile)
+
+            logger.info(f"Successfully connected to {driver.name} database")
+            add_metric("ConnectLatency", MetricUnit.Milliseconds, elapsed_ms(started))
+            add_metric("ConnectRetries", MetricUnit.Count, attempt)
             return conn
 
-        except mysql.connector.Error as err:
+        except driver.Error as err:
             attempt += 1
-            if err.errno == errorcode.CR_CONN_HOST_ERROR and attempt < max_attempts:
+            if driver.is_access_denied(err) and not refresh_credentials:
+                # The cached credentials may predate a secret rotation
+                logger.warning("Access denied, retrying with freshly fetched credentials")
+                refresh_credentials = True
+            elif driver.is_host_error(err) and attempt < max_attempts:
                 logger.warning(f"Connection attempt {attempt} failed. Retrying in {wait_seconds} seconds...")
                 sleep(wait_seconds)
                 wait_seconds *= 2  # Exponential backoff
             else:
                 logger.error(f"Database connection failed: {str(err)}")
+                add_metric("ConnectRetries", MetricUnit.Count, attempt)
                 raise DatabaseInitializationError(f"Failed to connect to database: {str(err)}")
         except Exception as err:
             logger.error(f"Unexpected error connecting to database: {str(err)}")
             raise DatabaseInitializationError(f"Unexpected error: {str(err)}")
 
 
-def execute_sql_script(conn: mysql.connector.connection.MySQLConnection, script_path: str):
+def get_shared_connection(driver: "Driver", secret_arn: str, endpoint: str, db_name: str, port: Optional[int] = None,
+                          allow_local_infile: bool = False) -> Any:
+    """
+    The connection kept from a previous warm invocation when it is still alive, otherwise a new one
+    """
+    global _connection
+    key = (driver.name, secret_arn, endpoint, db_name, port, allow_local_infile)
+    if _connection is not None:
+        cached_key, conn = _connection
+        try:
+            if cached_key == key and driver.is_connected(conn):
+                logger.info("Reusing database connection from a previous invocation")
+                return conn
+        except driver.Error as err:
+            logger.warning(f"Cached database connection failed its health check: {str(err)}")
+        discard_shared_connection()
+
+    conn = get_db_connection(driver, secret_arn, endpoint, db_name, port, allow_local_infile)
+    _connection = (key, conn)
+    return conn
+
+
+def discard_shared_connection():
+    global _connection
+    if _connection is not None:
+        try:
+            _connection[1].close()
+        except Exception:
+            pass
+        _connection = None
+
+
+def execute_sql_script(conn: Any, script_path: str, driver: Optional["Driver"] = None,
+                       variables: Optional[Dict[str, str]] = None) -> int:
     """
-    Execute SQL script with transaction handling
+    Execute SQL script with transaction handling, returning the number of statements executed.
+    Statements are executed as they are read, so the script is never held in memory.
+    With `variables`, their `${NAME}` placeholders are replaced first (values are never logged).
     """
+    from drivers import MySqlDriver
+    from migrations import substitute_variables
+    from sql_script import SqlStatementReader
+
+    driver = driver or get_driver(MySqlDriver.name)
     cursor = None
     try:
         cursor = conn.cursor()
+        executed = 0
 
-        with open(script_path, "r") as f:
-            sql_commands = [cmd.strip() for cmd in f.read().split(";") if cmd.strip()]
-
-            for command in sql_commands:
+        with open(script_path, "r", encoding="utf-8") as f:
+            statements = SqlStatementReader(f, **driver.reader_options)
+            for command in statements:
                 try:
                     logger.debug(f"Executing command: {command[:100]}...")  # Log first 100 chars
-                    cursor.execute(command)
-                except mysql.connector.Error as err:
-                    logger.error(f"Error executing command: {command[:100]}... Error: {str(err)}")
+                    cursor.execute(substitute_variables(command, variables) if variables is not None else command)
+                    executed += 1
+                except driver.Error as err:
+                    logger.error(f"Error executing command at line {statements.line_number}: "
+                                 f"{command[:100]}... Error: {str(err)}")
                     conn.rollback()
                     raise DatabaseInitializationError(f"SQL execution failed: {str(err)}")
 
         conn.commit()
-        logger.info("Successfully executed SQL script")
+        logger.info(f"Successfully executed SQL script ({executed} statements)")
+        return executed
 
     except Exception as err:
         logger.error(f"Error during SQL execution: {str(err)}")
@@ -91,61 +275,264 @@ def execute_sql_script(conn: mysql.connector.connection.MySQLConnection, script_
             cursor.close()
 
 
-@logger.inject_lambda_context(log_event=True)
+def migration_variables(migrations) -> Dict[str, str]:
+    """
+    Values for the `${NAME}` placeholders of `migrations`: DB_NAME, and APP_USER_PASSWORD from
+    the APP_USER_SECRET_ARN secret (only read when a migration uses it).
+    Raises MigrationError for a placeholder without a value, before any migration runs.
+    """
+    from migrations import MigrationError, placeholders
+
+    names = set().union(*(placeholders(migration.path) for migration in migrations))
+    variables = {"DB_NAME": os.environ["DB_NAME"]}
+    if "APP_USER_PASSWORD" in names and os.environ.get("APP_USER_SECRET_ARN"):
+        variables["APP_USER_PASSWORD"] = get_db_credentials(os.environ["APP_USER_SECRET_ARN"])["password"]
+    missing = sorted(names - set(variables))
+    if missing:
+        raise MigrationError(f"No value for migration placeholders: {', '.join(missing)}")
+    return variables
+
+
+def apply_migrations(conn: Any, driver: "Driver", history: "MigrationHistory", migrations):
+    """
+    Run each pending migration, its placeholders filled in, and record it once it succeeded
+    """
+    variables = migration_variables(migrations)
+    applied = []
+    statements = 0
+    try:
+        for migration in migrations:
+            logger.info(f"Applying migration {migration.version}")
+            started = perf_counter()
+            statements += execute_sql_script(conn, migration.path, driver, variables)
+            history.record(migration.version, migration.checksum, elapsed_ms(started))
+            applied.append(migration.version)
+    finally:
+        add_metric("StatementsExecuted", MetricUnit.Count, statements)
+        add_metric("MigrationsApplied", MetricUnit.Count, len(applied))
+    return applied
+
+
+def record_seed(conn: Any, source, table: Dict[str, Any]):
+    """
+    Record a loaded seed file (on the connection that loaded it) and log its throughput
+    """
+    from migrations import MigrationHistory
+    MigrationHistory(conn).record(source.version, source.checksum, int(table["seconds"] * 1000))
+    logger.info(f"Seeded {table['table']} from {table['source']}: {table['rows']} rows in "
+                f"{table['seconds']}s ({table['rows_per_second']} rows/s)")
+
+
+def load_seeds(conn: Any, driver: "Driver", connect, settings: "SeedSettings", sources, load=None):
+    """
+    Bulk load the pending seed files after the migrations have run, in foreign key order,
+    loading independent tables in parallel over up to `settings.parallelism` connections
+    (with `load`, seed_loader.load_source by default)
+    """
+    from seed_loader import (ConnectionPool, SeedLoadError, foreign_key_dependencies, load_in_dependency_order,
+                             load_source)
+
+    if not sources:
+        return []
+    pool = ConnectionPool(connect, settings.parallelism)
+    started = perf_counter()
+    try:
+        dependencies = foreign_key_dependencies(conn, driver)
+        seeded = load_in_dependency_order(pool, sources, settings, driver, dependencies, on_loaded=record_seed,
+                                          load=load or load_source)
+        rows = sum(table["rows"] for table in seeded)
+        seconds = perf_counter() - started
+        add_metric("RowsLoaded", MetricUnit.Count, rows)
+        add_metric("SeedDuration", MetricUnit.Milliseconds, elapsed_ms(started))
+        add_metric("SeedRowsPerSecond", MetricUnit.CountPerSecond, round(rows / seconds) if seconds else rows)
+        return seeded
+    except SeedLoadError as err:
+        logger.error(f"Seed loading failed: {str(err)}")
+        raise DatabaseInitializationError(str(err))
+    finally:
+        pool.close()
+
+
+def connect_from_environment(seed_settings: "SeedSettings") -> Tuple["Driver", Any, Callable[[], Any]]:
+    """
+    The driver, the (shared) connection and a factory for the seed loaders' extra connections,
+    from the Lambda environment
+    """
+    from drivers import MySqlDriver
+    from seed_loader import BULK_MODE
+
+    # Validate environment variables
+    required_env_vars = ["DB_SECRET_ARN", "DB_ENDPOINT", "DB_NAME"]
+    for var in required_env_vars:
+        if var not in os.environ:
+            raise DatabaseInitializationError(f"Missing required environment variable: {var}")
+
+    secret_arn = os.environ["DB_SECRET_ARN"]
+    endpoint = os.environ["DB_ENDPOINT"]
+    db_name = os.environ["DB_NAME"]
+    port = int(os.environ["DB_PORT"]) if os.environ.get("DB_PORT") else None
+    driver = get_driver(os.environ.get("DB_ENGINE", MySqlDriver.name))
+
+    logger.info(f"Connecting to {driver.name} database {db_name} at {endpoint}")
+
+    # LOAD DATA LOCAL INFILE has to be allowed when the connection is opened
+    allow_local_infile = seed_settings.load_mode == BULK_MODE
+
+    def connect():
+        return get_db_connection(driver, secret_arn, endpoint, db_name, port, allow_local_infile)
+
+    # Connect to database, reusing the connection of a warm invocation
+    conn = get_shared_connection(driver, secret_arn, endpoint, db_name, port, allow_local_infile)
+    return driver, conn, connect
+
+
+def seeding_is_asynchronous() -> bool:
+    return os.getenv("SEED_ASYNC", "false").lower() == "true"
+
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda function handler for database initialization
     """
-    request_type = event["RequestType"]
-    logger.info(f"Recieved event: {request_type} ")
+    if event["RequestType"] == "Delete":
+        # Never drop data with the stack; the database instance has its own removal policy.
+        # Answered before powertools or any database module is loaded
+        print(json.dumps({"level": "INFO", "service": "db-initializer",
+                          "message": "Delete request, leaving the database untouched"}))
+        return {
+            "statusCode": 200,
+            "body": json.dumps({"message": "Nothing to do on Delete"})
+        }
+    return initialize_database(event, context)
 
-    try:
-        # Validate environment variables
-        required_env_vars = ["DB_SECRET_ARN", "DB_ENDPOINT", "DB_NAME"]
-        for var in required_env_vars:
-            if var not in os.environ:
-                raise DatabaseInitializationError(f"Missing required environment variable: {var}")
 
-        secret_arn = os.environ["DB_SECRET_ARN"]
-        endpoint = os.environ["DB_ENDPOINT"]
-        db_name = os.environ["DB_NAME"]
+@instrumented
+def initialize_database(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Apply the pending migrations, then load (or leave to is_complete_handler) the pending seed files
+    """
+    from drivers import UnsupportedEngineError
+    from migrations import (DEFAULT_MIGRATIONS_DIR, MigrationError, MigrationHistory, discover_migrations,
+                            pending_changes)
+    from seed_loader import SeedSettings, discover_sources
+    from seed_progress import SeedProgress, load_source_resumably
 
-        logger.info(f"Initializing database {db_name} at {endpoint}")
+    record_cold_start()
+    logger.info(f"Recieved event: {event['RequestType']} ")
 
-        # Connect to database
-        conn = get_db_connection(secret_arn, endpoint, db_name)
+    try:
+        db_name = os.environ.get("DB_NAME")
+        seed_settings = SeedSettings.from_environment()
+        driver, conn, connect = connect_from_environment(seed_settings)
 
         try:
-            # Execute SQL script
-            execute_sql_script(conn, "script.sql")
+            history = MigrationHistory(conn)
+            history.ensure_table()
+            applied = history.applied()
+
+            # Check every applied migration and seed file before changing anything
+            migrations = pending_changes(
+                discover_migrations(os.path.join(DEFAULT_MIGRATIONS_DIR, driver.migrations_dir)), applied)
+            seeds = pending_changes(discover_sources(seed_settings), applied)
+            logger.info(f"{len(migrations)} pending migrations, {len(seeds)} pending seed files "
+                        f"({len(applied)} already applied)")
+
+            started = perf_counter()
+            migrated = apply_migrations(conn, driver, history, migrations)
+            add_metric("MigrationDuration", MetricUnit.Milliseconds, elapsed_ms(started))
+            if seeding_is_asynchronous():
+                # Left to is_complete_handler, which the Provider polls until every file is loaded
+                logger.info(f"{len(seeds)} seed files will be loaded asynchronously")
+                seeded = []
+            else:
+                if seeds:
+                    SeedProgress(conn).ensure_table()
+                # Checkpointed: a retry after a failure does not load the committed rows again
+                seeded = load_seeds(conn, driver, connect, seed_settings, seeds, load=load_source_resumably)
 
             return {
                 "statusCode": 200,
                 "body": json.dumps({
                     "message": "Database initialized successfully",
-                    "database": db_name
+                    "database": db_name,
+                    "migrations": migrated,
+                    "seeded": seeded
                 })
             }
 
-        finally:
-            if conn and conn.is_connected():
-                conn.close()
+        except Exception:
+            # Never hand a connection in an unknown state to the next invocation
+            discard_shared_connection()
+            raise
 
-    except DatabaseInitializationError as err:
+    except (DatabaseInitializationError, MigrationError, UnsupportedEngineError) as err:
+        # Raise so the custom resource (and the deployment) fails instead of reporting success
         logger.error(f"Database initialization failed: {str(err)}")
-        return {
-            "statusCode": 500,
-            "body": json.dumps({
-                "message": "Database initialization failed",
-                "error": str(err)
-            })
-        }
+        add_metric("InitializationFailed", MetricUnit.Count, 1)
+        raise
     except Exception as err:
         logger.error(f"Unexpected error: {str(err)}")
-        return {
-            "statusCode": 500,
-            "body": json.dumps({
-                "message": "Unexpected error during initialization",
-                "error": str(err)
-            })
-        }
\ No newline at end of file
+        add_metric("InitializationFailed", MetricUnit.Count, 1)
+        raise DatabaseInitializationError(f"Unexpected error during initialization: {str(err)}")
+
+
+def is_complete_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Provider is_complete handler for asynchronous seeding: loads the pending seed files from
+    their checkpoints until the invocation is almost out of time. The Provider polls it every
+    query_interval until it reports completion or its total_timeout expires.
+    """
+    if event["RequestType"] == "Delete":
+        return {"IsComplete": True}
+    return seed_database(event, context)
+
+
+@instrumented
+def seed_database(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    from drivers import UnsupportedEngineError
+    from migrations import MigrationError, MigrationHistory, pending_changes
+    from seed_loader import SeedSettings, discover_sources
+    from seed_progress import SeedProgress, load_source_in_chunks
+
+    record_cold_start()
+
+    try:
+        seed_settings = SeedSettings.from_environment()
+        driver, conn, connect = connect_from_environment(seed_settings)
+
+        try:
+            seeds = pending_changes(discover_sources(seed_settings), MigrationHistory(conn).applied())
+            if not seeds:
+                logger.info("Every seed file is loaded")
+                return {"IsComplete": True}
+
+            SeedProgress(conn).ensure_table()
+            deadline = monotonic() + context.get_remaining_time_in_millis() / 1000 - SEED_TIME_MARGIN_SECONDS
+            seeded = load_seeds(conn, driver, connect, seed_settings, seeds,
+                                load=partial(load_source_in_chunks, deadline=deadline))
+
+            for table in seeded:
+                if not table["complete"]:
+                    logger.info(f"Seeding {table['table']} from {table['source']}: {table['total_rows']} rows "
+                                f"loaded so far ({table['rows_per_second']} rows/s), continuing on the next poll")
+            loaded = sum(1 for table in seeded if table["complete"])
+            logger.info(f"{loaded} of {len(seeds)} pending seed files loaded")
+            return {"IsComplete": loaded == len(seeds)}
+
+        except Exception:
+            # Never hand a connection in an unknown state to the next invocation
+            discard_shared_connection()
+            raise
+
+    except (DatabaseInitializationError, MigrationError, UnsupportedEngineError) as err:
+        # Raise so the custom resource (and the deployment) fails instead of polling until the timeout
+        logger.error(f"Asynchronous seeding failed: {str(err)}")
+        add_metric("InitializationFailed", MetricUnit.Count, 1)
+        raise
+    except Exception as err:
+        logger.error(f"Unexpected error: {str(err)}")
+        add_metric("InitializationFailed", MetricUnit.Count, 1)
+        raise DatabaseInitializationError(f"Unexpected error during seeding: {str(err)}")
+
+
+INIT_DURATION_MS = int((perf_counter() - _init_started) * 1000)
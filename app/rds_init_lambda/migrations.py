@@ -0,0 +1,118 @@
+"""
+Versioned, checksum-tracked migrations.
+
+Migrations are the `*.sql` files in the engine's directory under `migrations/` (`mysql/`,
+`postgres/`), applied in file name order (`0001_initial_schema.sql`, `0002_add_roles.sql`, ...). Every applied migration is recorded
+in the `schema_migrations` table with the SHA-256 of its file, so each run only applies the
+new ones, and a migration edited after it was applied is refused instead of silently skipped.
+Loaded seed files are recorded in the same table (`seed/<file name>`).
+`${NAME}` placeholders in a migration are replaced when it runs (see substitute_variables), so
+the checksum covers the template, not the values.
+"""
+import hashlib
+import os
+import re
+import time
+from typing import Any, Dict, Iterable, List, Sequence, Set
+
+DEFAULT_MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATIONS_TABLE = "schema_migrations"
+
+_PLACEHOLDER = re.compile(r"\$\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+
+class MigrationError(Exception):
+    """Raised when an applied migration was edited, or the history cannot be read"""
+    pass
+
+
+def placeholders(path: str) -> Set[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return set(_PLACEHOLDER.findall(f.read()))
+
+
+def substitute_variables(statement: str, variables: Dict[str, str]) -> str:
+    """
+    Replace the `${NAME}` placeholders of `statement` with `variables[NAME]`.
+    Raises MigrationError naming the placeholders without a value.
+    """
+    missing = sorted({name for name in _PLACEHOLDER.findall(statement) if name not in variables})
+    if missing:
+        raise MigrationError(f"No value for migration placeholders: {', '.join(missing)}")
+    return _PLACEHOLDER.sub(lambda match: variables[match.group(1)], statement)
+
+
+def file_checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Migration:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.version = os.path.splitext(os.path.basename(path))[0]
+        self.checksum = file_checksum(path)
+
+
+def discover_migrations(directory: str = DEFAULT_MIGRATIONS_DIR) -> List[Migration]:
+    if not os.path.isdir(directory):
+        return []
+    return [Migration(os.path.join(directory, filename))
+            for filename in sorted(os.listdir(directory)) if filename.endswith(".sql")]
+
+
+def pending_changes(changes: Iterable[Any], applied: Dict[str, str]) -> List[Any]:
+    """
+    The changes (anything with `version` and `checksum`) not applied yet, in order.
+    Raises MigrationError listing every applied change whose checksum no longer matches.
+    """
+    changes = list(changes)
+    edited = [change.version for change in changes
+              if change.version in applied and applied[change.version] != change.checksum]
+    if edited:
+        raise MigrationError(f"Already applied but edited since: {', '.join(edited)}. "
+                             f"Add a new migration instead of changing an applied one")
+    return [change for change in changes if change.version not in applied]
+
+
+class MigrationHistory:
+    """The applied-migrations table, read and written through a DB-API connection."""
+
+    def __init__(self, conn: Any, table: str = MIGRATIONS_TABLE) -> None:
+        self.conn = conn
+        self.table = table
+
+    def ensure_table(self) -> None:
+        self._execute(f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                      f"version VARCHAR(255) PRIMARY KEY, "
+                      f"checksum VARCHAR(64) NOT NULL, "
+                      f"execution_ms INTEGER NOT NULL, "
+                      f"applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+        self.conn.commit()
+
+    def applied(self) -> Dict[str, str]:
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(f"SELECT version, checksum FROM {self.table}")
+            return {version: checksum for version, checksum in cursor.fetchall()}
+        finally:
+            cursor.close()
+
+    def record(self, version: str, checksum: str, execution_ms: int) -> None:
+        self._execute(f"INSERT INTO {self.table} (version, checksum, execution_ms) VALUES (%s, %s, %s)",
+                      (version, checksum, execution_ms))
+        self.conn.commit()
+
+    def _execute(self, sql: str, params: Sequence[Any] = ()) -> None:
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql, params or None)
+        finally:
+            cursor.close()
+
+
+def elapsed_ms(started: float) -> int:
+    return int((time.perf_counter() - started) * 1000)
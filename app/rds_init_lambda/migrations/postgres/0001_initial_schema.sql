@@ -0,0 +1,51 @@
+-- Database initialization script with transaction support and error handling
+
+BEGIN;
+
+-- Create users table if not exists
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(100) NOT NULL UNIQUE,
+    email VARCHAR(255) NOT NULL UNIQUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create audit log table
+CREATE TABLE IF NOT EXISTS audit_log (
+    id SERIAL PRIMARY KEY,
+    user_id INT NULL REFERENCES users(id) ON DELETE SET NULL,
+    action VARCHAR(50) NOT NULL,
+    description TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Insert initial data only if tables are empty
+INSERT INTO users (username, email)
+SELECT * FROM (
+    VALUES ('admin', 'admin@example.com'),
+           ('user1', 'user1@example.com'),
+           ('user2', 'user2@example.com')
+) AS tmp (username, email)
+WHERE NOT EXISTS (SELECT 1 FROM users);
+
+-- Create stored procedure for user creation
+CREATE OR REPLACE PROCEDURE create_user(
+    p_username VARCHAR(100),
+    p_email VARCHAR(255)
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_user_id INT;
+BEGIN
+    INSERT INTO users (username, email)
+    VALUES (p_username, p_email)
+    RETURNING id INTO v_user_id;
+
+    INSERT INTO audit_log (user_id, action, description)
+    VALUES (v_user_id, 'USER_CREATE', 'Created user: ' || p_username);
+END;
+$$;
+
+COMMIT;
@@ -0,0 +1,384 @@
+"""
+Bulk seed-data loading.
+
+Every CSV (with a header row) or newline-delimited JSON file is loaded into the table named
+after the file: `users.csv`, `02_audit_log.ndjson` -> `users`, `audit_log`. Seed files are
+read from the `seeds/` directory bundled in the image and from the S3 objects listed in
+SEED_S3_OBJECTS, streamed without being held in memory.
+
+Rows are inserted with batched `executemany` (SEED_BATCH_SIZE rows per batch, a commit every
+SEED_COMMIT_INTERVAL rows). With SEED_LOAD_MODE=bulk, the database driver's bulk path is used
+instead (see drivers.py): `LOAD DATA LOCAL INFILE` for CSV files on MySQL, `COPY FROM STDIN`
+on Postgres. Empty CSV fields load as NULL.
+
+Tables are loaded in foreign key order: a table starts once every seeded table it references
+is loaded, and independent tables load concurrently over up to SEED_PARALLELISM pooled
+connections. The Lambda loads files through the checkpointing loaders of seed_progress.py,
+so a failed load resumes after the rows it committed; seeding too large for one invocation
+is loaded in checkpointed chunks over several invocations.
+"""
+import codecs
+import contextlib
+import csv
+import hashlib
+import json
+import os
+import re
+import queue
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+
+from migrations import file_checksum
+
+DEFAULT_SEED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "seeds")
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_COMMIT_INTERVAL = 50000
+DEFAULT_PARALLELISM = 1
+DEFAULT_CHUNK_SIZE = 50000
+
+INSERT_MODE = "insert"
+BULK_MODE = "bulk"
+
+FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+# Optional ordering prefix: 01_users.csv loads into `users`
+_ORDER_PREFIX = re.compile(r"^\d+_")
+
+
+class SeedLoadError(Exception):
+    """Raised when a seed file cannot be read or loaded"""
+    pass
+
+
+class SeedSettings:
+    """Where seed files come from and how they are loaded, read from the Lambda environment."""
+
+    def __init__(self, seed_dir: str = DEFAULT_SEED_DIR, s3_objects: Sequence[Mapping[str, str]] = (),
+                 batch_size: int = DEFAULT_BATCH_SIZE, commit_interval: int = DEFAULT_COMMIT_INTERVAL,
+                 load_mode: str = INSERT_MODE, parallelism: int = DEFAULT_PARALLELISM,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        if load_mode not in (INSERT_MODE, BULK_MODE):
+            raise SeedLoadError(f"Unknown seed load mode '{load_mode}'")
+        if batch_size < 1 or commit_interval < 1 or parallelism < 1 or chunk_size < 1:
+            raise SeedLoadError("Seed batch size, commit interval, parallelism and chunk size must be positive")
+        self.seed_dir = seed_dir
+        self.s3_objects = list(s3_objects)
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.load_mode = load_mode
+        self.parallelism = parallelism
+        # Rows per checkpoint when seeding in chunks
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def from_environment(cls, environ: Mapping[str, str] = os.environ) -> "SeedSettings":
+        return cls(
+            seed_dir=environ.get("SEED_DIR", DEFAULT_SEED_DIR),
+            s3_objects=json.loads(environ.get("SEED_S3_OBJECTS") or "[]"),
+            batch_size=int(environ.get("SEED_BATCH_SIZE", DEFAULT_BATCH_SIZE)),
+            commit_interval=int(environ.get("SEED_COMMIT_INTERVAL", DEFAULT_COMMIT_INTERVAL)),
+            load_mode=environ.get("SEED_LOAD_MODE", INSERT_MODE),
+            parallelism=int(environ.get("SEED_PARALLELISM", DEFAULT_PARALLELISM)),
+            chunk_size=int(environ.get("SEED_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)),
+        )
+
+
+_s3 = None
+_s3_lock = threading.Lock()
+
+
+def _s3_client() -> Any:
+    # Clients are thread safe, creating them is not: create one, shared by the loader threads
+    global _s3
+    with _s3_lock:
+        if _s3 is None:
+            import boto3
+            _s3 = boto3.client("s3")
+    return _s3
+
+
+class SeedSource:
+    """One seed file, either a local path or an S3 object (`bucket`/`key`)."""
+
+    def __init__(self, name: str, path: Optional[str] = None, bucket: Optional[str] = None,
+                 key: Optional[str] = None) -> None:
+        stem, extension = os.path.splitext(name)
+        if extension.lower() not in FORMATS:
+            raise SeedLoadError(f"Unsupported seed file '{name}', expected one of {', '.join(FORMATS)}")
+        self.name = name
+        self.table = _ORDER_PREFIX.sub("", stem)
+        self.format = FORMATS[extension.lower()]
+        self.path = path
+        self.bucket = bucket
+        self.key = key
+
+    @property
+    def location(self) -> str:
+        return self.path or f"s3://{self.bucket}/{self.key}"
+
+    @property
+    def version(self) -> str:
+        """Recorded in the migrations table once loaded, so the file is only loaded once"""
+        return f"seed/{self.name}"
+
+    @property
+    def checksum(self) -> str:
+        if self.path:
+            return file_checksum(self.path)
+        # S3 asset keys are derived from the file content
+        return hashlib.sha256(self.key.encode()).hexdigest()
+
+    @contextlib.contextmanager
+    def open(self) -> Iterator[Any]:
+        """The file as a text stream, read from S3 as it is consumed."""
+        if self.path:
+            with open(self.path, "r", encoding="utf-8", newline="") as f:
+                yield f
+            return
+        body = _s3_client().get_object(Bucket=self.bucket, Key=self.key)["Body"]
+        try:
+            yield codecs.getreader("utf-8")(body)
+        finally:
+            body.close()
+
+    @contextlib.contextmanager
+    def local_path(self) -> Iterator[str]:
+        """A local copy of the file: the file itself, or the S3 object streamed to /tmp."""
+        if self.path:
+            yield self.path
+            return
+        with tempfile.NamedTemporaryFile("wb", suffix=os.path.splitext(self.name)[1]) as f:
+            _s3_client().download_fileobj(self.bucket, self.key, f)
+            f.flush()
+            yield f.name
+
+    def lines(self) -> Iterator[str]:
+        with self.open() as f:
+            yield from f
+
+    def rows(self) -> Tuple[List[str], Iterator[Tuple[Any, ...]]]:
+        """The column names and an iterator over the rows, read lazily."""
+        lines = self.lines()
+        if self.format == "csv":
+            reader = csv.reader(lines)
+            columns = next(reader, None)
+            if not columns:
+                raise SeedLoadError(f"Seed file {self.location} has no header row")
+            return columns, (tuple(value if value != "" else None for value in row) for row in reader if row)
+
+        records = (json.loads(line) for line in lines if line.strip())
+        first = next(records, None)
+        if first is None:
+            return [], iter(())
+        columns = list(first)
+
+        def ndjson_rows() -> Iterator[Tuple[Any, ...]]:
+            yield tuple(first.get(column) for column in columns)
+            for record in records:
+                yield tuple(record.get(column) for column in columns)
+
+        return columns, ndjson_rows()
+
+
+def discover_sources(settings: SeedSettings) -> List[SeedSource]:
+    """Bundled seed files in name order, then the S3 objects in the order they were listed."""
+    sources = []
+    if os.path.isdir(settings.seed_dir):
+        for filename in sorted(os.listdir(settings.seed_dir)):
+            if os.path.splitext(filename)[1].lower() in FORMATS:
+                sources.append(SeedSource(filename, path=os.path.join(settings.seed_dir, filename)))
+    for s3_object in settings.s3_objects:
+        sources.append(SeedSource(s3_object.get("name") or os.path.basename(s3_object["key"]),
+                                  bucket=s3_object["bucket"], key=s3_object["key"]))
+    return sources
+
+
+def insert_statement(driver: Any, table: str, columns: Sequence[str]) -> str:
+    return (f"INSERT INTO {driver.quote_identifier(table)} "
+            f"({', '.join(driver.quote_identifier(column) for column in columns)}) "
+            f"VALUES ({', '.join([driver.placeholder] * len(columns))})")
+
+
+def insert_rows(conn: Any, sql: str, rows: Iterator[Tuple[Any, ...]], batch_size: int, commit_interval: int,
+                before_commit: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Insert the rows in batches, committing every `commit_interval` rows and at the end.
+    `before_commit(rows inserted so far)` runs in each transaction, just before its commit.
+    """
+    loaded = uncommitted = 0
+    cursor = conn.cursor()
+    try:
+        batch: List[Tuple[Any, ...]] = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                cursor.executemany(sql, batch)
+                loaded, uncommitted, batch = loaded + len(batch), uncommitted + len(batch), []
+                if uncommitted >= commit_interval:
+                    if before_commit:
+                        before_commit(loaded)
+                    conn.commit()
+                    uncommitted = 0
+        if batch:
+            cursor.executemany(sql, batch)
+            loaded, uncommitted = loaded + len(batch), uncommitted + len(batch)
+        if uncommitted:
+            if before_commit:
+                before_commit(loaded)
+            conn.commit()
+    finally:
+        cursor.close()
+    return loaded
+
+
+def load_source(conn: Any, source: SeedSource, settings: SeedSettings, driver: Any) -> Dict[str, Any]:
+    started = time.perf_counter()
+    columns, rows = source.rows()
+    try:
+        loaded = None
+        if columns and settings.load_mode == BULK_MODE:
+            # None when the driver has no bulk path for this format
+            loaded = driver.bulk_load(conn, source, columns, rows)
+            if loaded is not None:
+                rows.close()
+        if loaded is None:
+            loaded = insert_rows(conn, insert_statement(driver, source.table, columns), rows,
+                                 settings.batch_size, settings.commit_interval) if columns else 0
+    except Exception as err:
+        conn.rollback()
+        raise SeedLoadError(f"Loading {source.location} into {source.table} failed: {err}") from err
+
+    seconds = time.perf_counter() - started
+    return {"table": source.table, "source": source.location, "rows": loaded, "seconds": round(seconds, 3),
+            "rows_per_second": round(loaded / seconds) if seconds else loaded}
+
+
+def load_seed_data(conn: Any, settings: SeedSettings, driver: Any,
+                   sources: Optional[Sequence[SeedSource]] = None) -> List[Dict[str, Any]]:
+    """Load the given seed files (every discovered one by default), in order; returns per-table statistics."""
+    if sources is None:
+        sources = discover_sources(settings)
+    return [load_source(conn, source, settings, driver) for source in sources]
+
+
+class ConnectionPool:
+    """At most `size` connections, opened on demand by `factory` and reused."""
+
+    def __init__(self, factory: Callable[[], Any], size: int) -> None:
+        self.factory = factory
+        self.size = size
+        self._idle: "queue.LifoQueue[Any]" = queue.LifoQueue()
+        self._opened: List[Any] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Any:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._opened) < self.size:
+                conn = self.factory()
+                self._opened.append(conn)
+                return conn
+        return self._idle.get()
+
+    def release(self, conn: Any) -> None:
+        self._idle.put(conn)
+
+    def close(self) -> None:
+        for conn in self._opened:
+            conn.close()
+        self._opened = []
+
+
+def foreign_key_dependencies(conn: Any, driver: Any) -> Dict[str, Set[str]]:
+    """Table -> the tables its foreign keys reference, e.g. {"audit_log": {"users"}}."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(driver.foreign_keys_query)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    dependencies: Dict[str, Set[str]] = {}
+    for table, referenced in rows:
+        if table != referenced:
+            dependencies.setdefault(table, set()).add(referenced)
+    return dependencies
+
+
+def _complete(stats: Dict[str, Any]) -> bool:
+    return stats.get("complete", True)
+
+
+def _load_table(pool: ConnectionPool, sources: Sequence[SeedSource], settings: SeedSettings, driver: Any,
+                on_loaded: Optional[Callable[[Any, SeedSource, Dict[str, Any]], None]],
+                load: Callable[..., Dict[str, Any]]) -> List[Dict[str, Any]]:
+    conn = pool.acquire()
+    try:
+        stats = []
+        for source in sources:
+            stats.append(load(conn, source, settings, driver))
+            if not _complete(stats[-1]):
+                # Out of time: the rest of the table is loaded by the next invocation
+                break
+            if on_loaded:
+                on_loaded(conn, source, stats[-1])
+        return stats
+    finally:
+        pool.release(conn)
+
+
+def load_in_dependency_order(pool: ConnectionPool, sources: Sequence[SeedSource], settings: SeedSettings,
+                             driver: Any, dependencies: Mapping[str, Set[str]],
+                             on_loaded: Optional[Callable[[Any, SeedSource, Dict[str, Any]], None]] = None,
+                             load: Callable[..., Dict[str, Any]] = load_source) -> List[Dict[str, Any]]:
+    """
+    Load the seed files table by table, each table once the seeded tables it references are
+    loaded, up to `pool.size` tables at a time. `on_loaded(conn, source, stats)` is called on
+    the loading connection after each file. Returns the per-file statistics in load order.
+
+    `load(conn, source, settings, driver)` loads one file; when its statistics say
+    `"complete": False` the table, and the tables referencing it, are left for a later call.
+    """
+    by_table: Dict[str, List[SeedSource]] = OrderedDict()
+    for source in sources:
+        by_table.setdefault(source.table, []).append(source)
+    waiting = {table: {dependency for dependency in dependencies.get(table, ()) if dependency in by_table}
+               for table in by_table}
+    loaded: Set[str] = set()
+    unfinished: Set[str] = set()
+    stats: List[Dict[str, Any]] = []
+
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        running = {}
+        while waiting or running:
+            for table in [table for table, needs in waiting.items() if needs <= loaded]:
+                del waiting[table]
+                running[executor.submit(_load_table, pool, by_table[table], settings, driver, on_loaded,
+                                        load)] = table
+            if not running:
+                if unfinished:
+                    break
+                raise SeedLoadError(f"Circular foreign keys between seed tables: {', '.join(sorted(waiting))}")
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                table = running.pop(future)
+                try:
+                    table_stats = future.result()
+                except Exception:
+                    for pending in running:
+                        pending.cancel()
+                    raise
+                stats.extend(table_stats)
+                if all(_complete(source_stats) for source_stats in table_stats) and \
+                        len(table_stats) == len(by_table[table]):
+                    loaded.add(table)
+                else:
+                    unfinished.add(table)
+    return stats
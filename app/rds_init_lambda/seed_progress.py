@@ -0,0 +1,160 @@
+"""
+Checkpointed, resumable seed loading.
+
+Every commit of a seed file's rows also writes the file's checkpoint (rows loaded so far, in
+the `seed_progress` table) in the same transaction, so a load that fails, or runs out of
+time, loses at most the rows it had not committed. The next attempt skips the checkpointed
+rows and carries on from there instead of loading them twice.
+
+In the asynchronous (`is_complete`) mode each file is loaded in chunks of SEED_CHUNK_SIZE
+rows until the invocation is almost out of time (`load_source_in_chunks`). Synchronous
+seeding loads whole files, checkpointing each SEED_COMMIT_INTERVAL commit
+(`load_source_resumably`).
+"""
+import itertools
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+from seed_loader import BULK_MODE, SeedLoadError, SeedSettings, SeedSource, insert_rows, insert_statement
+
+PROGRESS_TABLE = "seed_progress"
+
+
+class SeedProgress:
+    """Rows loaded so far per seed file, read and written through a DB-API connection."""
+
+    def __init__(self, conn: Any, table: str = PROGRESS_TABLE) -> None:
+        self.conn = conn
+        self.table = table
+
+    def ensure_table(self) -> None:
+        self._execute(f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                      f"version VARCHAR(255) PRIMARY KEY, "
+                      f"checksum VARCHAR(64) NOT NULL, "
+                      f"rows_loaded BIGINT NOT NULL, "
+                      f"updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+        self.conn.commit()
+
+    def checkpoint(self, source: SeedSource) -> int:
+        """
+        Rows of `source` already loaded, starting its checkpoint at 0 the first time.
+        Raises SeedLoadError when the file changed since it was partly loaded.
+        """
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(f"SELECT checksum, rows_loaded FROM {self.table} WHERE version = %s", (source.version,))
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        checksum = source.checksum
+        if not rows:
+            self._execute(f"INSERT INTO {self.table} (version, checksum, rows_loaded) VALUES (%s, %s, %s)",
+                          (source.version, checksum, 0))
+            self.conn.commit()
+            return 0
+        recorded, rows_loaded = rows[0]
+        if recorded != checksum:
+            raise SeedLoadError(f"{source.location} changed after {rows_loaded} of its rows were loaded. "
+                                f"Restore it, or clear its rows and {self.table} entry")
+        return int(rows_loaded)
+
+    def advance(self, source: SeedSource, rows_loaded: int) -> None:
+        """Move the checkpoint; committed by the caller together with the chunk."""
+        self._execute(f"UPDATE {self.table} SET rows_loaded = %s, updated_at = CURRENT_TIMESTAMP WHERE version = %s",
+                      (rows_loaded, source.version))
+
+    def _execute(self, sql: str, params: Sequence[Any] = ()) -> None:
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql, params or None)
+        finally:
+            cursor.close()
+
+
+def _insert_chunk(conn: Any, sql: str, chunk: List[Tuple[Any, ...]], batch_size: int) -> None:
+    cursor = conn.cursor()
+    try:
+        for start in range(0, len(chunk), batch_size):
+            cursor.executemany(sql, chunk[start:start + batch_size])
+    finally:
+        cursor.close()
+
+
+def load_source_in_chunks(conn: Any, source: SeedSource, settings: SeedSettings, driver: Any,
+                          deadline: float) -> Dict[str, Any]:
+    """
+    Load `source` from its checkpoint, one committed chunk at a time, until it is fully loaded
+    or `deadline` (a time.monotonic() value) has passed. The statistics cover this call only;
+    `complete` tells whether the file is done.
+    """
+    started = time.perf_counter()
+    progress = SeedProgress(conn)
+    done = progress.checkpoint(source)
+    columns, source_rows = source.rows()
+    # Already loaded rows are read again but not sent; S3 objects are streamed past them
+    rows = itertools.islice(source_rows, done, None)
+    loaded = 0
+    complete = False
+    try:
+        while time.monotonic() < deadline:
+            chunk = list(itertools.islice(rows, settings.chunk_size))
+            if not chunk:
+                complete = True
+                break
+            written = None
+            if settings.load_mode == BULK_MODE:
+                # None when the driver can only bulk load whole files
+                written = driver.load_rows(conn, source.table, columns, iter(chunk))
+            if written is None:
+                _insert_chunk(conn, insert_statement(driver, source.table, columns), chunk, settings.batch_size)
+            loaded += len(chunk)
+            progress.advance(source, done + loaded)
+            conn.commit()
+    except Exception as err:
+        conn.rollback()
+        raise SeedLoadError(f"Loading {source.location} into {source.table} failed after row "
+                            f"{done + loaded}: {err}") from err
+    finally:
+        if columns:
+            # Stop reading the file (and the S3 stream) when leaving it for the next invocation
+            source_rows.close()
+
+    seconds = time.perf_counter() - started
+    return {"table": source.table, "source": source.location, "rows": loaded, "total_rows": done + loaded,
+            "complete": complete, "seconds": round(seconds, 3),
+            "rows_per_second": round(loaded / seconds) if seconds else loaded}
+
+
+def load_source_resumably(conn: Any, source: SeedSource, settings: SeedSettings, driver: Any) -> Dict[str, Any]:
+    """
+    Load `source` in one call, from its checkpoint: like seed_loader.load_source, with every
+    commit checkpointed. A whole-file bulk load is only used for a file not started yet.
+    """
+    started = time.perf_counter()
+    progress = SeedProgress(conn)
+    done = progress.checkpoint(source)
+    columns, source_rows = source.rows()
+    try:
+        loaded = None
+        if columns and settings.load_mode == BULK_MODE and done == 0:
+            # None when the driver has no bulk path for this format
+            loaded = driver.bulk_load(conn, source, columns, source_rows, commit=False)
+            if loaded is not None:
+                progress.advance(source, loaded)
+                conn.commit()
+        if loaded is None:
+            # Already loaded rows are read again but not sent
+            loaded = insert_rows(conn, insert_statement(driver, source.table, columns),
+                                 itertools.islice(source_rows, done, None), settings.batch_size,
+                                 settings.commit_interval,
+                                 before_commit=lambda rows: progress.advance(source, done + rows)) if columns else 0
+    except Exception as err:
+        conn.rollback()
+        raise SeedLoadError(f"Loading {source.location} into {source.table} failed: {err}") from err
+    finally:
+        if columns:
+            source_rows.close()
+
+    seconds = time.perf_counter() - started
+    return {"table": source.table, "source": source.location, "rows": loaded, "total_rows": done + loaded,
+            "seconds": round(seconds, 3), "rows_per_second": round(loaded / seconds) if seconds else loaded}
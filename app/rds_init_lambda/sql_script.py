@@ -0,0 +1,149 @@
+"""
+Streaming SQL script tokenizer.
+
+Reads a script line by line and yields one statement at a time, so scripts of any size are
+executed in constant memory. Follows the mysql client's rules:
+  - `DELIMITER <token>` (on its own line, between statements) changes the statement delimiter,
+    so stored procedure bodies containing `;` stay one statement
+  - delimiters inside '...', "..." and `...` quotes or comments do not end a statement
+  - `-- ` and `#` line comments and `/* */` block comments are dropped, except executable
+    `/*! ... */` and optimizer hint `/*+ ... */` comments
+For Postgres, pass `backslash_escapes=False, hash_comments=False, dollar_quotes=True` so
+`$$ ... $$` / `$tag$ ... $tag$` function bodies stay one statement.
+"""
+import re
+from typing import Iterable, Iterator, List, Optional
+
+DEFAULT_DELIMITER = ";"
+
+_DELIMITER_COMMAND = re.compile(r"\s*DELIMITER\s+(\S+)", re.IGNORECASE)
+_QUOTES = ("'", '"', "`")
+_KEPT_COMMENTS = ("!", "+")
+# $$ or $tag$, but not a $1 positional parameter
+_DOLLAR_QUOTE = r"\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$"
+
+
+class SqlScriptError(Exception):
+    """Raised when a script ends inside a quoted string or a comment"""
+    pass
+
+
+class SqlStatementReader:
+    """
+    Iterates over the statements of a SQL script, given as an iterable of lines (e.g. an
+    open file). `line_number` is the line the last yielded statement started on.
+    """
+
+    def __init__(self, lines: Iterable[str], delimiter: str = DEFAULT_DELIMITER,
+                 backslash_escapes: bool = True, hash_comments: bool = True, dollar_quotes: bool = False) -> None:
+        self.lines = lines
+        self.backslash_escapes = backslash_escapes
+        self.hash_comments = hash_comments
+        self.dollar_quotes = dollar_quotes
+        self.line_number = 0
+        self._current_line = 0
+        self._start_line = 0
+        self._pieces: List[str] = []
+        self._blank = True
+        self._set_delimiter(delimiter)
+        self._quote_patterns = {
+            quote: re.compile(r"\\.|" + re.escape(quote) if backslash_escapes and quote != "`" else re.escape(quote),
+                              re.DOTALL)
+            for quote in _QUOTES
+        }
+
+    def _set_delimiter(self, delimiter: str) -> None:
+        self.delimiter = delimiter
+        tokens = [re.escape(delimiter), "'", '"', "`", "--", r"/\*"]
+        if self.hash_comments:
+            tokens.append("#")
+        if self.dollar_quotes:
+            tokens.append(_DOLLAR_QUOTE)
+        self._normal_pattern = re.compile("|".join(tokens))
+
+    def _append(self, text: str) -> None:
+        if not text:
+            return
+        if self._blank and text.strip():
+            self._blank = False
+            self._start_line = self._current_line
+        self._pieces.append(text)
+
+    def _take_statement(self) -> Optional[str]:
+        statement = "".join(self._pieces).strip()
+        self._pieces = []
+        self._blank = True
+        self.line_number = self._start_line
+        return statement or None
+
+    def __iter__(self) -> Iterator[str]:
+        state = None
+        state_line = 0
+        keep_comment = False
+
+        for line in self.lines:
+            self._current_line += 1
+            if state is None and self._blank:
+                command = _DELIMITER_COMMAND.match(line)
+                if command:
+                    self._set_delimiter(command.group(1))
+                    self._pieces = []
+                    continue
+
+            position = 0
+            while position < len(line):
+                if state is None:
+                    match = self._normal_pattern.search(line, position)
+                    if match is None:
+                        self._append(line[position:])
+                        break
+                    self._append(line[position:match.start()])
+                    token, position = match.group(), match.end()
+                    if token == self.delimiter:
+                        statement = self._take_statement()
+                        if statement:
+                            yield statement
+                    elif token in _QUOTES or token.startswith("$"):
+                        self._append(token)
+                        state, state_line = token, self._current_line
+                    elif token == "--" and line[position:position + 1] not in ("", " ", "\t", "\r", "\n"):
+                        # `--1` is an expression, only `-- ` starts a comment
+                        self._append(token)
+                    elif token in ("--", "#"):
+                        self._append("\n")
+                        break
+                    else:
+                        keep_comment = line[position:position + 1] in _KEPT_COMMENTS
+                        if keep_comment:
+                            self._append(token)
+                        state, state_line = "/*", self._current_line
+                elif state == "/*":
+                    end = line.find("*/", position)
+                    if end < 0:
+                        if keep_comment:
+                            self._append(line[position:])
+                        break
+                    if keep_comment:
+                        self._append(line[position:end + 2])
+                    else:
+                        self._append(" ")
+                    state, position = None, end + 2
+                else:
+                    if state not in self._quote_patterns:
+                        # The closing tag of a dollar-quoted string
+                        self._quote_patterns[state] = re.compile(re.escape(state))
+                    match = self._quote_patterns[state].search(line, position)
+                    if match is None:
+                        self._append(line[position:])
+                        break
+                    self._append(line[position:match.end()])
+                    position = match.end()
+                    if match.group() == state:
+                        state = None
+
+        if state is not None:
+            kind = "comment" if state == "/*" else f"{state} quoted string"
+            raise SqlScriptError(f"Script ends inside a {kind} opened on line {state_line}")
+        statement = self._take_statement()
+        if statement:
+            yield statement
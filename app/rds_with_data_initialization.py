@@ -1,12 +1,16 @@
+import hashlib
 import uuid
+from typing import List, Optional
 
 import aws_cdk as cdk
 import os
 from aws_cdk import (
     aws_ec2 as ec2,
+    aws_ecr_assets as ecr_assets,
     aws_iam as iam,
     aws_lambda as _lambda,
     aws_logs as logs,
+    aws_s3_assets as s3_assets,
     Duration,
     custom_resources as cr,
     aws_secretsmanager as secretsmanager,
@@ -15,8 +19,27 @@ from aws_cdk import (
 from constructs import Construct
 
 from app.rds_stack import (RdsStack,InstanceType)
+from app.utility.lambda_alarms import DB_INIT_ALARMS, LambdaMetricAlarms
 from app.vpc_stack import VpcStack
 
+INIT_LAMBDA_DIR = os.path.join(os.path.dirname(__file__), "rds_init_lambda")
+METRICS_NAMESPACE = "DbInitializer"
+
+
+def content_checksum(*directories: str) -> str:
+    """SHA-256 over the files of `directories`, so the custom resource updates when any of them changes"""
+    digest = hashlib.sha256()
+    for directory in directories:
+        for root, dirs, files in os.walk(directory):
+            dirs.sort()
+            for filename in sorted(files):
+                path = os.path.join(root, filename)
+                digest.update(os.path.relpath(path, directory).encode())
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
 class RdsWithInitializationStack(RdsStack):
     def __init__(
         self,
@@ -25,10 +48,37 @@ class RdsWithInitializationStack(RdsStack):
         construct_id: str,
         vpc_stack: VpcStack,
         database_name:str,
+        seed_files: Optional[List[str]] = None,
+        seed_batch_size: int = 1000,
+        seed_commit_interval: int = 50000,
+        seed_load_mode: Optional[str] = None,
+        seed_parallelism: int = 4,
+        seed_async: bool = False,
+        seed_chunk_size: int = 50000,
+        seed_total_timeout: Optional[Duration] = None,
+        optimized_image: bool = False,
+        architecture: _lambda.Architecture = _lambda.Architecture.X86_64,
+        image_release: str = "dev",
         **kwargs,
     ) -> None:
+        """
+        seed_files: local CSV / NDJSON files uploaded as S3 assets and streamed into the table
+        named after each file (in addition to the files bundled in rds_init_lambda/seeds).
+        seed_load_mode: "insert" (batched executemany) or "bulk" (LOAD DATA LOCAL INFILE on MySQL, COPY on
+        Postgres); defaults to "bulk" on Postgres and "insert" otherwise.
+        seed_parallelism: connections used to load tables without foreign keys between them concurrently.
+        seed_async: load the seed files from the Provider's is_complete handler, in chunks of
+        seed_chunk_size rows checkpointed in the database, across as many polls as it takes within
+        seed_total_timeout (default 30 minutes, at most 2 hours) instead of within one invocation.
+        optimized_image: build the init functions from Dockerfile.optimized (multi-stage, precompiled,
+        no system packages); architecture ARM_64 builds the arm64 variant. The functions report their
+        cold start duration and image size per image_release and architecture.
+        """
         super().__init__(scope, instance_type, construct_id, vpc_stack, database_name, **kwargs)
 
+        if seed_load_mode is None:
+            seed_load_mode = "bulk" if instance_type == InstanceType.POSTGRES else "insert"
+
         # add role for lambda execution with least privilege
         #########
         ### Provides minimum permissions for a Lambda function to execute
@@ -42,33 +92,97 @@ class RdsWithInitializationStack(RdsStack):
             ]
         )
 
-        # Lambda (Docker Image)
-        docker_lambda = _lambda.DockerImageFunction(
-            self, "DbInitFunction",
-            function_name="app-db-initializer",
-            code=_lambda.DockerImageCode.from_image_asset(
-                directory=os.path.join(os.path.dirname(__file__), "lambda"),
-                file="Dockerfile"
-            ),
-            timeout=Duration.minutes(5),
-            memory_size=1024,
-            vpc=vpc_stack.vpc,
-            vpc_subnets=ec2.SubnetSelection(
-                subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS
-            ),
-            security_groups=[self.rds_sg],
-            environment={
-                "DB_SECRET_ARN": self.db_credentials_secret.secret_arn,
-                "DB_ENDPOINT": self.db_instance.db_instance_endpoint_address,
-                "DB_NAME": database_name,
-                "LOG_LEVEL": "INFO"
-            },
-            role=lambda_role,
-            log_retention=logs.RetentionDays.ONE_MONTH
+        # Password of the limited `app_user` the MySQL migration creates (its ${APP_USER_PASSWORD})
+        app_user_secret = secretsmanager.Secret(
+            self, "AppUserSecret",
+            generate_secret_string=secretsmanager.SecretStringGenerator(
+                secret_string_template='{"username": "app_user"}',
+                generate_string_key="password",
+                # Substituted into a quoted SQL literal
+                exclude_punctuation=True
+            )
         )
 
-        # Grant permissions to lambda
-        self.db_instance.secret.grant_read(docker_lambda)
+        environment = {
+            "DB_SECRET_ARN": self.db_credentials_secret.secret_arn,
+            "APP_USER_SECRET_ARN": app_user_secret.secret_arn,
+            "DB_ENDPOINT": self.db_instance.db_instance_endpoint_address,
+            "DB_NAME": database_name,
+            "DB_PORT": self.db_instance.db_instance_endpoint_port,
+            "DB_ENGINE": instance_type.value,
+            "LOG_LEVEL": "INFO",
+            "METRICS_NAMESPACE": METRICS_NAMESPACE,
+            "IMAGE_RELEASE": image_release,
+            "SEED_BATCH_SIZE": str(seed_batch_size),
+            "SEED_COMMIT_INTERVAL": str(seed_commit_interval),
+            "SEED_LOAD_MODE": seed_load_mode,
+            "SEED_PARALLELISM": str(seed_parallelism),
+            "SEED_ASYNC": "true" if seed_async else "false",
+            "SEED_CHUNK_SIZE": str(seed_chunk_size)
+        }
+
+        platform = (ecr_assets.Platform.LINUX_ARM64 if architecture.name == _lambda.Architecture.ARM_64.name
+                    else ecr_assets.Platform.LINUX_AMD64)
+
+        def init_function(construct_id: str, function_name: str, handler: str,
+                          timeout: Duration) -> _lambda.DockerImageFunction:
+            # Lambda (Docker Image)
+            return _lambda.DockerImageFunction(
+                self, construct_id,
+                function_name=function_name,
+                code=_lambda.DockerImageCode.from_image_asset(
+                    directory=INIT_LAMBDA_DIR,
+                    file="Dockerfile.optimized" if optimized_image else "Dockerfile",
+                    cmd=[handler],
+                    platform=platform,
+                    build_args={"RELEASE": image_release}
+                ),
+                architecture=architecture,
+                timeout=timeout,
+                memory_size=1024,
+                vpc=vpc_stack.vpc,
+                vpc_subnets=ec2.SubnetSelection(
+                    subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS
+                ),
+                security_groups=[self.rds_sg],
+                environment=environment,
+                role=lambda_role,
+                log_retention=logs.RetentionDays.ONE_MONTH
+            )
+
+        docker_lambda = init_function("DbInitFunction", "app-db-initializer", "handler.lambda_handler",
+                                      Duration.minutes(5))
+        init_functions = [docker_lambda]
+        # Polled by the Provider until every seed file is loaded; each poll works for up to 15 minutes
+        seed_lambda = None
+        if seed_async:
+            seed_lambda = init_function("DbSeedFunction", "app-db-seeder", "handler.is_complete_handler",
+                                        Duration.minutes(15))
+            init_functions.append(seed_lambda)
+
+        # Alarms on the handler's metrics; a seeding poll may legitimately run close to its timeout
+        LambdaMetricAlarms(self, "DbInitAlarms", function=docker_lambda, namespace=METRICS_NAMESPACE,
+                           service="db-initializer",
+                           thresholds=[threshold for threshold in DB_INIT_ALARMS
+                                       if not (seed_async and threshold.metric_name == "SeedDuration")])
+        if seed_lambda is not None:
+            LambdaMetricAlarms(self, "DbSeedAlarms", function=seed_lambda, namespace=METRICS_NAMESPACE,
+                               service="db-initializer")
+
+        # Seed files too large to bundle in the image are streamed from S3
+        seed_objects = []
+        for index, seed_file in enumerate(seed_files or []):
+            seed_asset = s3_assets.Asset(self, f"SeedData{index}", path=seed_file)
+            for function in init_functions:
+                seed_asset.grant_read(function)
+            seed_objects.append({"name": os.path.basename(seed_file), "bucket": seed_asset.s3_bucket_name,
+                                 "key": seed_asset.s3_object_key})
+        for function in init_functions:
+            if seed_objects:
+                function.add_environment("SEED_S3_OBJECTS", self.to_json_string(seed_objects))
+            # Grant permissions to lambda
+            self.db_instance.secret.grant_read(function)
+            app_user_secret.grant_read(function)
         self.rds_sg.add_ingress_rule(
             self.rds_sg,
             ec2.Port.tcp(self.db_instance.port),
@@ -79,16 +193,24 @@ class RdsWithInitializationStack(RdsStack):
         provider = cr.Provider(
             self, "DbInitProvider",
             on_event_handler=docker_lambda,
+            is_complete_handler=seed_lambda,
             log_retention=logs.RetentionDays.ONE_MONTH,
-            total_timeout=Duration.minutes(30),
+            total_timeout=seed_total_timeout or Duration.minutes(30),
             query_interval=Duration.seconds(30)
         )
 
         # Custom Resource with dependency on DB being available
+        # Only a property change sends an Update event: new migrations or seed files trigger one,
+        # and the handler then applies just the pending ones
         init_resource = cr.CustomResource(
             self, "DbInitializer",
             service_token=provider.service_token,
-            removal_policy=cdk.RemovalPolicy.DESTROY
+            removal_policy=cdk.RemovalPolicy.DESTROY,
+            properties={
+                "MigrationsChecksum": content_checksum(os.path.join(INIT_LAMBDA_DIR, "migrations"),
+                                                       os.path.join(INIT_LAMBDA_DIR, "seeds")),
+                "SeedObjects": [seed_object["key"] for seed_object in seed_objects],
+            }
         )
         init_resource.node.add_dependency(self.db_instance)
 
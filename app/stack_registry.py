@@ -0,0 +1,163 @@
+import importlib
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# cdk synth -c stacks=InfraStack,AppStack
+STACKS_CONTEXT_KEY = "stacks"
+
+# What `cdk synth` builds when no stack is named in the context
+DEFAULT_STACKS = ("VpcStack", "RdsPostgresStack", "InfraStack")
+
+
+class StackDefinition:
+    """
+    Declares a stack without importing it: the module path is only imported
+    when the stack (or a stack depending on it) is actually selected.
+    """
+
+    def __init__(self, name: str, module_path: str, factory: Callable[..., Any],
+                 dependencies: Iterable[str] = (), assets: Iterable[str] = ()) -> None:
+        self.name = name
+        self.module_path = module_path
+        self.factory = factory
+        self.dependencies = tuple(dependencies)
+        # Asset directories (relative to the project root) bundled into the stack
+        self.assets = tuple(assets)
+
+    def load_module(self) -> ModuleType:
+        return importlib.import_module(self.module_path)
+
+    def build(self, scope: Any, built: Dict[str, Any], environment_name: str, **stack_kwargs) -> Any:
+        return self.factory(self.load_module(), scope, self.name, built, environment_name, **stack_kwargs)
+
+
+class StackRegistry:
+    def __init__(self) -> None:
+        self._definitions: Dict[str, StackDefinition] = {}
+
+    def register(self, name: str, module_path: str, factory: Callable[..., Any],
+                 dependencies: Iterable[str] = (), assets: Iterable[str] = ()) -> StackDefinition:
+        if name in self._definitions:
+            raise ValueError(f"Stack '{name}' is already registered")
+        definition = StackDefinition(name, module_path, factory, dependencies, assets)
+        self._definitions[name] = definition
+        return definition
+
+    def names(self) -> List[str]:
+        return list(self._definitions)
+
+    def get(self, name: str) -> StackDefinition:
+        try:
+            return self._definitions[name]
+        except KeyError:
+            raise ValueError(f"Unknown stack '{name}'. Registered stacks: {', '.join(self._definitions)}")
+
+    def resolve(self, names: Iterable[str]) -> List[str]:
+        """
+        Return the requested stacks plus their dependencies, dependencies first.
+        """
+        ordered: List[str] = []
+        visiting = set()
+
+        def visit(name: str) -> None:
+            if name in ordered:
+                return
+            if name in visiting:
+                raise ValueError(f"Circular stack dependency involving '{name}'")
+            visiting.add(name)
+            for dependency in self.get(name).dependencies:
+                visit(dependency)
+            visiting.discard(name)
+            ordered.append(name)
+
+        for name in names:
+            visit(name)
+        return ordered
+
+    def build(self, scope: Any, names: Optional[Iterable[str]] = None, profiler: Any = None,
+              environment_name: str = "dev", **stack_kwargs) -> Dict[str, Any]:
+        """
+        Build the selected stacks (and only those) into `scope`, in dependency order.
+        Extra keyword arguments (e.g. `env`) are passed to every stack.
+        When a `SynthProfiler` is given, each stack's construction is tracked by it.
+        """
+        built: Dict[str, Any] = {}
+        for name in self.resolve(names if names is not None else DEFAULT_STACKS):
+            if profiler is None:
+                built[name] = self.get(name).build(scope, built, environment_name, **stack_kwargs)
+                continue
+            with profiler.track(name):
+                built[name] = self.get(name).build(scope, built, environment_name, **stack_kwargs)
+        return built
+
+
+def selected_stacks(context_value: Any) -> Optional[List[str]]:
+    """
+    Parse the `stacks` context value, given either as a comma separated string
+    (from `-c stacks=...`) or as a list (from cdk.json).
+    """
+    if not context_value:
+        return None
+    if isinstance(context_value, str):
+        context_value = context_value.split(",")
+    return [name.strip() for name in context_value if name.strip()]
+
+
+#####################################################################################################
+# Stack declarations. Factories receive the lazily imported module, the scope, the stack id,
+# the stacks built so far (keyed by name), the environment name and the shared stack kwargs.
+#####################################################################################################
+
+def _vpc_stack(module, scope, name, built, environment_name, **kwargs):
+    return module.VpcStack(scope, name, **kwargs)
+
+
+def _rds_postgres_stack(module, scope, name, built, environment_name, **kwargs):
+    return module.RdsStack(scope, instance_type=module.InstanceType.POSTGRES, construct_id=name,
+                           vpc_stack=built["VpcStack"], database_name='key_generator_db', **kwargs)
+
+
+def _rds_init_stack(module, scope, name, built, environment_name, **kwargs):
+    return module.RdsWithInitializationStack(scope, instance_type=module.InstanceType.MYSQL, construct_id=name,
+                                             vpc_stack=built["VpcStack"], database_name='key_generator_db',
+                                             **kwargs)
+
+
+def _infra_stack(module, scope, name, built, environment_name, **kwargs):
+    return module.InfraStack(scope, name, vpc_stack=built["VpcStack"], app_ports=[8080],
+                             environment_name=environment_name, **kwargs)
+
+
+def _app_stack(module, scope, name, built, environment_name, **kwargs):
+    return module.ECSAppStack(scope, name, cluster_name=built["InfraStack"].cluster.cluster_name,
+                              image_uri="", app_name="app-name", environment_name=environment_name, **kwargs)
+
+
+def _nginx_lb_stack(module, scope, name, built, environment_name, **kwargs):
+    vpc_stack = built["VpcStack"]
+    subnet = vpc_stack.vpc.public_subnets[0]
+    subnet_params = {'id': subnet.subnet_id, 'az': subnet.availability_zone}
+    return module.EC2WithNginxLBStack(scope, name, subnet_params=subnet_params,
+                                      sg_id=vpc_stack.ec2_sg.security_group_id,
+                                      dns=built["AppStack"].namespace, **kwargs)
+
+
+def _customised_vpc_stack(module, scope, name, built, environment_name, **kwargs):
+    return module.CustomisedVpcStack(scope, name, **kwargs)
+
+
+def _lambda_auto_deploy_stack(module, scope, name, built, environment_name, **kwargs):
+    return module.LambdaAutoDeployStack(scope, name, **kwargs)
+
+
+REGISTRY = StackRegistry()
+REGISTRY.register("VpcStack", "app.vpc_stack", _vpc_stack)
+REGISTRY.register("RdsPostgresStack", "app.rds_stack", _rds_postgres_stack, dependencies=["VpcStack"])
+REGISTRY.register("RdsInitStack", "app.rds_with_data_initialization", _rds_init_stack,
+                  dependencies=["VpcStack"], assets=["app/rds_init_lambda"])
+REGISTRY.register("InfraStack", "app.InfraStack", _infra_stack, dependencies=["VpcStack"])
+REGISTRY.register("AppStack", "app.app_stack", _app_stack, dependencies=["InfraStack"])
+REGISTRY.register("NginxLb", "app.managed_nginx", _nginx_lb_stack, dependencies=["VpcStack", "AppStack"])
+REGISTRY.register("CustomisedVpcStack", "app.customised_vpc_stack", _customised_vpc_stack)
+REGISTRY.register("LambdaAutoDeploy", "app.lambda_autodeploy_s3_stack", _lambda_auto_deploy_stack,
+                  assets=["app/auto_deploy_lambda"])
@@ -0,0 +1,49 @@
+from typing import Any, Dict, Tuple
+
+from app.stack_registry import DEFAULT_STACKS, REGISTRY, STACKS_CONTEXT_KEY, selected_stacks
+from app.utility.synth_profiler import SynthProfiler
+from app.utility.app_config import config_for
+from app.utility.incremental_synth import IncrementalSynth
+from app.utility.template_budget import analyze_assembly, write_report
+
+
+def synthesize(app: Any, env: Dict[str, str]) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Build the selected stacks into `app` and synthesize its cloud assembly.
+
+    The configuration is loaded and validated first, so configuration errors are reported
+    before any stack is built (select the environment with -c environment=<name>).
+    Only the stacks named in the `stacks` context are built (plus their dependencies), and
+    construction is profiled when the `profile` context flag is set.
+    With the `incremental` context flag, stacks whose inputs did not change since the last
+    synth are not built; their cached templates are copied into the assembly instead.
+    Every synthesized template is then checked against the configured `template_budgets`
+    (cdk.out/template-budget.json).
+    Returns the cloud assembly and the built stacks keyed by registry name.
+    """
+    config = config_for(app)
+    profiler = SynthProfiler.from_context(app)
+    incremental = IncrementalSynth.from_context(app, REGISTRY, config["environment_name"], env)
+
+    names = REGISTRY.resolve(selected_stacks(app.node.try_get_context(STACKS_CONTEXT_KEY)) or DEFAULT_STACKS)
+    to_build = incremental.stacks_to_build(names) if incremental else names
+
+    try:
+        stacks = REGISTRY.build(app, to_build, profiler=profiler, environment_name=config["environment_name"],
+                                env=env)
+        assembly = app.synth()
+    finally:
+        # Never leave the jsii kernel patched for the rest of the process when a stack fails
+        if profiler:
+            profiler.uninstall()
+
+    if profiler:
+        profiler.write_report(app.outdir)
+
+    if incremental:
+        incremental.restore([name for name in names if name not in stacks], app.outdir)
+        incremental.save(list(stacks), app.outdir)
+
+    write_report(analyze_assembly(app.outdir, config.get("template_budgets", {})), app.outdir)
+
+    return assembly, stacks
@@ -0,0 +1,158 @@
+import copy
+import functools
+import json
+import os
+from typing import Any, Dict, List, Mapping, Optional
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config")
+
+DEFAULTS_FILE = "defaults.json"
+EC2_FILE = "ec2_env.json"
+ACCOUNTS_FILE = "account_details.env.json"
+
+# cdk synth -c environment=prod
+ENVIRONMENT_CONTEXT_KEY = "environment"
+DEFAULT_ENVIRONMENT = "dev"
+
+# cdk synth -c config_overrides='{"ec2": {"type": "t3.small"}}'
+OVERRIDES_CONTEXT_KEY = "config_overrides"
+
+EC2_INT_KEYS = ("min_capacity", "max_capacity", "desired_capacity")
+
+# app_stack.SecretMode values
+SECRET_MODES = ("per_key", "json", "reference")
+
+
+class ConfigurationError(ValueError):
+    """Raised with every validation error found in the merged configuration"""
+
+    def __init__(self, environment_name: str, errors: List[str]) -> None:
+        self.errors = errors
+        super().__init__(f"Invalid configuration for '{environment_name}':\n  - " + "\n  - ".join(errors))
+
+
+def _read_json(filename: str, required: bool = False) -> Dict[str, Any]:
+    path = os.path.join(CONFIG_DIR, filename)
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        if required:
+            raise FileNotFoundError(f"Configuration file not found at {path}")
+        return {}
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON in config file {path}: {e}")
+
+
+def deep_merge(base: Dict[str, Any], override: Mapping[str, Any]) -> Dict[str, Any]:
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, Mapping) and isinstance(merged.get(key), Mapping):
+            merged[key] = deep_merge(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def environment_names() -> List[str]:
+    """Environments with an account/region entry in account_details.env.json"""
+    return list(_read_json(ACCOUNTS_FILE).get("context", {}).get("envs", {}))
+
+
+def validate(config: Mapping[str, Any]) -> List[str]:
+    errors = []
+
+    ec2 = config.get("ec2")
+    if not isinstance(ec2, Mapping):
+        errors.append("'ec2' must be an object")
+    else:
+        if not isinstance(ec2.get("type"), str) or not ec2.get("type"):
+            errors.append("'ec2.type' must be an instance type such as 't3.micro'")
+        capacities = {key: ec2.get(key) for key in EC2_INT_KEYS}
+        bad = [key for key, value in capacities.items() if not isinstance(value, int) or value < 0]
+        errors.extend(f"'ec2.{key}' must be a non-negative integer" for key in bad)
+        if not bad and not capacities["min_capacity"] <= capacities["desired_capacity"] <= capacities["max_capacity"]:
+            errors.append("'ec2' capacities must satisfy min_capacity <= desired_capacity <= max_capacity")
+
+    for key in ("plain_parameters", "secrete_parameters"):
+        if not isinstance(config.get(key), Mapping):
+            errors.append(f"'{key}' must be an object")
+
+    if config.get("secret_mode", "per_key") not in SECRET_MODES:
+        errors.append(f"'secret_mode' must be one of {', '.join(SECRET_MODES)}")
+    fields = config.get("db_secret_fields", [])
+    if not isinstance(fields, list) or not all(isinstance(field, str) and field for field in fields):
+        errors.append("'db_secret_fields' must be a list of DB secret field names")
+
+    for key in ("account", "region"):
+        if not isinstance(config.get(key), str) or not config.get(key):
+            errors.append(f"'{key}' must be a string (set in {ACCOUNTS_FILE})")
+
+    budgets = config.get("template_budgets", {})
+    limits = {"default": budgets.get("default", {})}
+    limits.update({f"stacks.{name}": value for name, value in budgets.get("stacks", {}).items()})
+    for scope, values in limits.items():
+        errors.extend(f"'template_budgets.{scope}.{key}' must be a non-negative integer"
+                      for key, value in values.items() if not isinstance(value, int) or value < 0)
+
+    return errors
+
+
+@functools.lru_cache(maxsize=None)
+def _load(environment_name: str, overrides_json: str) -> Dict[str, Any]:
+    config = _read_json(DEFAULTS_FILE, required=True)
+    ec2_envs = _read_json(EC2_FILE)
+    account_envs = _read_json(ACCOUNTS_FILE).get("context", {}).get("envs", {})
+    # An unknown (or misspelled) environment must not silently get the defaults' sizing and no account
+    unknown = [f"unknown environment '{environment_name}': not in {filename} (known: {', '.join(envs)})"
+               for filename, envs in ((ACCOUNTS_FILE, account_envs), (EC2_FILE, ec2_envs))
+               if environment_name not in envs]
+    if unknown:
+        raise ConfigurationError(environment_name, unknown)
+    config = deep_merge(config, {"ec2": ec2_envs[environment_name]})
+    config = deep_merge(config, account_envs[environment_name])
+    config = deep_merge(config, _read_json(f"{environment_name}.env.json"))
+    config = deep_merge(config, json.loads(overrides_json))
+    config["environment_name"] = environment_name
+
+    errors = validate(config)
+    if errors:
+        raise ConfigurationError(environment_name, errors)
+    return config
+
+
+def parse_overrides(context_value: Any) -> Dict[str, Any]:
+    if not context_value:
+        return {}
+    if isinstance(context_value, str):
+        try:
+            context_value = json.loads(context_value)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON in '{OVERRIDES_CONTEXT_KEY}' context: {e}")
+    if not isinstance(context_value, Mapping):
+        raise ValueError(f"'{OVERRIDES_CONTEXT_KEY}' context must be an object")
+    return dict(context_value)
+
+
+def load_config(environment_name: str, overrides: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Load the configuration of an environment, merged from (lowest precedence first):
+      config/defaults.json
+      config/ec2_env.json            -> "ec2" section for the environment (required)
+      config/account_details.env.json -> account and region of the environment (required)
+      config/<environment>.env.json  (optional)
+      overrides (the `config_overrides` context)
+    The merged result is validated and memoized for the process; callers get their own copy.
+    """
+    overrides_json = json.dumps(overrides or {}, sort_keys=True)
+    return copy.deepcopy(_load(environment_name, overrides_json))
+
+
+def config_for(scope: Any, environment_name: Optional[str] = None) -> Dict[str, Any]:
+    """Configuration for a construct, honouring the `environment` and `config_overrides` context."""
+    environment_name = environment_name or scope.node.try_get_context(ENVIRONMENT_CONTEXT_KEY) or DEFAULT_ENVIRONMENT
+    return load_config(environment_name, parse_overrides(scope.node.try_get_context(OVERRIDES_CONTEXT_KEY)))
+
+
+def clear_config_cache() -> None:
+    _load.cache_clear()
@@ -0,0 +1,257 @@
+import ast
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.utility.parameter_resolver import DEFAULT_TTL_SECONDS, parameters_used
+
+# cdk synth -c incremental=true
+INCREMENTAL_CONTEXT_KEY = "incremental"
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_CACHE_DIR = os.path.join(PROJECT_ROOT, ".cdk-incremental")
+FINGERPRINTS_FILE = "fingerprints.json"
+MANIFEST_FILE = "manifest.json"
+
+# Inputs every stack shares: the registry holds the factories' arguments, the config layer feeds every stack
+SHARED_INPUTS = ("app/stack_registry.py", "app/config", "cdk.json")
+PARAMETER_CACHE = os.path.join(PROJECT_ROOT, ".ssm-parameter-cache.json")
+
+# Context keys that select what/how to synthesize but do not change any template
+CONTROL_CONTEXT_KEYS = ("stacks", "profile", INCREMENTAL_CONTEXT_KEY)
+
+
+def incremental_enabled(context_value: Any) -> bool:
+    if isinstance(context_value, str):
+        return context_value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(context_value)
+
+
+def _hash_file(digest: Any, path: str) -> None:
+    digest.update(os.path.relpath(path, PROJECT_ROOT).encode())
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+
+
+def _hash_path(digest: Any, path: str) -> None:
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+            for filename in sorted(files):
+                _hash_file(digest, os.path.join(root, filename))
+    elif os.path.exists(path):
+        _hash_file(digest, path)
+
+
+def _module_file(module_name: str) -> Optional[str]:
+    base = os.path.join(PROJECT_ROOT, *module_name.split("."))
+    for candidate in (base + ".py", os.path.join(base, "__init__.py")):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def module_closure(module_name: str) -> List[str]:
+    """Source files of `module_name` and of every project module it imports, transitively."""
+    seen: Set[str] = set()
+    pending = [module_name]
+    while pending:
+        name = pending.pop()
+        path = _module_file(name)
+        if path is None or path in seen:
+            continue
+        seen.add(path)
+        package = name if path.endswith("__init__.py") else name.rpartition(".")[0]
+        with open(path, "r") as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                if node.level:
+                    parts = package.split(".")
+                    base = ".".join(parts[:len(parts) - node.level + 1])
+                    imported = f"{base}.{node.module}" if node.module else base
+                else:
+                    imported = node.module or ""
+                pending.append(imported)
+                # `from app.utility import parameter_resolver` imports a submodule
+                pending.extend(f"{imported}.{alias.name}" for alias in node.names)
+    return sorted(seen)
+
+
+def all_context(scope: Any) -> Dict[str, Any]:
+    try:
+        context = dict(scope.node.get_all_context())
+    except AttributeError:
+        context = json.loads(os.environ.get("CDK_CONTEXT_JSON", "{}"))
+    return {key: value for key, value in context.items() if key not in CONTROL_CONTEXT_KEYS}
+
+
+class IncrementalSynth:
+    """
+    Reuses the synthesized template and manifest entries of stacks whose inputs did not change.
+
+    A stack's fingerprint covers its module and everything it imports from the project, the
+    shared config, its asset directories, the context, the target environment and the
+    fingerprints of the stacks it depends on. Unchanged stacks are not constructed at all:
+    their cached artifacts are copied into the new cloud assembly after synth.
+    """
+
+    def __init__(self, registry: Any, environment_name: str, env: Dict[str, str], context: Dict[str, Any],
+                 cache_dir: str = DEFAULT_CACHE_DIR) -> None:
+        self.registry = registry
+        self.environment_name = environment_name
+        self.env = env
+        self.context = context
+        self.cache_dir = os.path.join(cache_dir, environment_name)
+        self.fingerprints: Dict[str, str] = {}
+        self.selected: List[str] = []
+        self.previous = self._read_json(os.path.join(self.cache_dir, FINGERPRINTS_FILE))
+
+    @classmethod
+    def from_context(cls, scope: Any, registry: Any, environment_name: str,
+                     env: Dict[str, str]) -> Optional["IncrementalSynth"]:
+        if not incremental_enabled(scope.node.try_get_context(INCREMENTAL_CONTEXT_KEY)):
+            return None
+        return cls(registry, environment_name, env, all_context(scope))
+
+    def fingerprint(self, name: str) -> str:
+        if name in self.fingerprints:
+            return self.fingerprints[name]
+        definition = self.registry.get(name)
+        digest = hashlib.sha256()
+        digest.update(json.dumps({"name": name, "environment": self.environment_name, "env": self.env,
+                                  "context": self.context}, sort_keys=True, default=str).encode())
+        for path in module_closure(definition.module_path):
+            _hash_file(digest, path)
+        for path in SHARED_INPUTS + tuple(definition.assets):
+            _hash_path(digest, os.path.join(PROJECT_ROOT, path))
+        digest.update(json.dumps(self._parameter_values(name), sort_keys=True).encode())
+        for dependency in definition.dependencies:
+            digest.update(self.fingerprint(dependency).encode())
+        self.fingerprints[name] = digest.hexdigest()
+        return self.fingerprints[name]
+
+    def stacks_to_build(self, names: Iterable[str]) -> List[str]:
+        """
+        Stacks whose fingerprint changed, that have no cached artifacts or whose cached SSM values
+        expired, plus what they depend on and every selected stack depending on a rebuilt one.
+        A dependent adds to its producers' templates (exports, ingress rules), so a producer is
+        never rebuilt without its selected dependents, nor reused when they differ from the
+        dependents it was cached with.
+        """
+        self.selected = self.registry.resolve(names)
+        build = self.registry.resolve(name for name in self.selected if self._changed(name))
+        while True:
+            dependents = [name for name in self.selected if name not in build
+                          and any(dependency in build for dependency in self.registry.get(name).dependencies)]
+            if not dependents:
+                return build
+            build = self.registry.resolve(build + dependents)
+
+    def restore(self, names: Iterable[str], outdir: str) -> None:
+        """Copy the cached artifacts of unchanged stacks into the freshly synthesized assembly."""
+        manifest_path = os.path.join(outdir, MANIFEST_FILE)
+        manifest = self._read_json(manifest_path)
+        for name in names:
+            stack_dir = os.path.join(self.cache_dir, name)
+            cached = self._read_json(os.path.join(stack_dir, MANIFEST_FILE))
+            manifest.setdefault("artifacts", {}).update(cached["artifacts"])
+            for relative in cached["files"]:
+                self._copy(os.path.join(stack_dir, relative), os.path.join(outdir, relative))
+            print(f"incremental: reused {name} (fingerprint {self.fingerprint(name)[:12]})")
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    def save(self, names: Iterable[str], outdir: str) -> None:
+        """Cache the artifacts of the stacks just synthesized, and record every fingerprint."""
+        names = list(names)
+        manifest = self._read_json(os.path.join(outdir, MANIFEST_FILE))
+        artifacts = manifest.get("artifacts", {})
+        for name in names:
+            stack_dir = os.path.join(self.cache_dir, name)
+            shutil.rmtree(stack_dir, ignore_errors=True)
+            entries = {artifact_id: artifact for artifact_id, artifact in artifacts.items()
+                       if artifact_id in (name, f"{name}.assets")}
+            files = self._artifact_files(entries, outdir)
+            for relative in files:
+                self._copy(os.path.join(outdir, relative), os.path.join(stack_dir, relative))
+            with open(os.path.join(stack_dir, MANIFEST_FILE), "w") as f:
+                json.dump({"artifacts": entries, "files": files, "dependents": self._selected_dependents(name),
+                           "parameters": parameters_used(name)}, f, indent=2)
+
+        # The build refreshed the SSM values it used: record the fingerprints of those values
+        computed = set(self.fingerprints) | set(names)
+        self.fingerprints.clear()
+        for name in sorted(computed):
+            self.fingerprint(name)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fingerprints = dict(self.previous, **self.fingerprints)
+        with open(os.path.join(self.cache_dir, FINGERPRINTS_FILE), "w") as f:
+            json.dump(fingerprints, f, indent=2, sort_keys=True)
+
+    def _artifact_files(self, artifacts: Dict[str, Any], outdir: str) -> List[str]:
+        files = []
+        for artifact in artifacts.values():
+            properties = artifact.get("properties", {})
+            for key in ("templateFile", "file"):
+                if properties.get(key):
+                    files.append(properties[key])
+            if artifact.get("type") == "cdk:asset-manifest" and properties.get("file"):
+                assets = self._read_json(os.path.join(outdir, properties["file"]))
+                for asset in list(assets.get("files", {}).values()) + list(assets.get("dockerImages", {}).values()):
+                    source = asset.get("source", {})
+                    path = source.get("path") or source.get("directory")
+                    if path:
+                        files.append(path)
+        return sorted(set(files))
+
+    def _cached(self, name: str) -> bool:
+        return os.path.exists(os.path.join(self.cache_dir, name, MANIFEST_FILE))
+
+    def _changed(self, name: str) -> bool:
+        if self.previous.get(name) != self.fingerprint(name) or not self._cached(name):
+            return True
+        cached = self._read_json(os.path.join(self.cache_dir, name, MANIFEST_FILE))
+        return cached.get("dependents") != self._selected_dependents(name) or self._parameters_expired(name)
+
+    def _selected_dependents(self, name: str) -> List[str]:
+        return [other for other in self.selected if name in self.registry.get(other).dependencies]
+
+    def _parameter_entries(self, name: str) -> Dict[str, Dict[str, Any]]:
+        """The SSM cache entries of the parameters `name` resolved when it was last built."""
+        recorded = self._read_json(os.path.join(self.cache_dir, name, MANIFEST_FILE)).get("parameters", {})
+        cache = self._read_json(PARAMETER_CACHE)
+        return {f"{key}:{parameter}": cache.get(key, {}).get(parameter)
+                for key, parameters in recorded.items() for parameter in parameters}
+
+    def _parameter_values(self, name: str) -> Dict[str, Any]:
+        """Values (without fetch timestamps) of the stack's SSM parameters, so a changed one rebuilds it."""
+        return {parameter: entry and entry.get("value") for parameter, entry in self._parameter_entries(name).items()}
+
+    def _parameters_expired(self, name: str) -> bool:
+        now = time.time()
+        return any(entry is None or now - entry.get("fetched_at", 0) >= DEFAULT_TTL_SECONDS
+                   for entry in self._parameter_entries(name).values())
+
+    @staticmethod
+    def _copy(source: str, destination: str) -> None:
+        if not os.path.exists(source):
+            return
+        if os.path.isdir(source):
+            shutil.copytree(source, destination, dirs_exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            shutil.copy2(source, destination)
+
+    @staticmethod
+    def _read_json(path: str) -> Dict[str, Any]:
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r") as f:
+            return json.load(f)
@@ -0,0 +1,88 @@
+from typing import Optional, Sequence
+
+from aws_cdk import Duration
+from aws_cdk import aws_cloudwatch as cloudwatch
+from aws_cdk import aws_cloudwatch_actions as cloudwatch_actions
+from aws_cdk import aws_lambda as _lambda
+from aws_cdk import aws_sns as sns
+from constructs import Construct
+
+
+# Period of the alarms whose threshold does not set one
+DEFAULT_PERIOD_MINUTES = 5
+
+
+class MetricThreshold:
+    """Alarm when `statistic` of the metric over `period` (DEFAULT_PERIOD_MINUTES by default) reaches `threshold`."""
+
+    def __init__(self, metric_name: str, threshold: float, statistic: str = "Sum",
+                 period: Optional[Duration] = None, description: str = "") -> None:
+        self.metric_name = metric_name
+        self.threshold = threshold
+        self.statistic = statistic
+        self.period = period
+        self.description = description
+
+
+# Metrics published by app/rds_init_lambda/handler.py
+DB_INIT_ALARMS = [
+    MetricThreshold("InitializationFailed", 1, description="Database initialization or seeding failed"),
+    MetricThreshold("ConnectRetries", 3, statistic="Maximum",
+                    description="Connecting to the database needed several attempts"),
+    # 80% of the init function's 5 minute timeout
+    MetricThreshold("SeedDuration", 240000, statistic="Maximum",
+                    description="Seeding is close to the Lambda timeout, consider seed_async"),
+]
+
+# Metrics published by app/auto_deploy_lambda/deployer.py
+AUTO_DEPLOY_ALARMS = [
+    MetricThreshold("DeployFailures", 1, description="Deploying an uploaded function failed"),
+]
+
+# Metrics published by app/check_out_todo/config_auto_update_ecs/lambda/lambda.py
+CONFIG_UPDATE_ALARMS = [
+    MetricThreshold("UpdateFailures", 1, description="Applying an uploaded ECS config failed"),
+]
+
+
+class LambdaMetricAlarms(Construct):
+    """
+    Alarms on a function's errors and on the Embedded Metric Format metrics its handler
+    publishes under `namespace` with a `service` dimension. Alarm actions notify `topic`
+    when one is given.
+    """
+
+    def __init__(self, scope: Construct, construct_id: str, function: _lambda.IFunction, namespace: str,
+                 service: str, thresholds: Sequence[MetricThreshold] = (),
+                 topic: Optional[sns.ITopic] = None) -> None:
+        super().__init__(scope, construct_id)
+        self.alarms = [
+            function.metric_errors(period=Duration.minutes(DEFAULT_PERIOD_MINUTES)).create_alarm(
+                self, "Errors",
+                threshold=1,
+                evaluation_periods=1,
+                comparison_operator=cloudwatch.ComparisonOperator.GREATER_THAN_OR_EQUAL_TO_THRESHOLD,
+                treat_missing_data=cloudwatch.TreatMissingData.NOT_BREACHING,
+                alarm_description=f"{service} invocations failed",
+            )
+        ]
+        for threshold in thresholds:
+            metric = cloudwatch.Metric(
+                namespace=namespace,
+                metric_name=threshold.metric_name,
+                dimensions_map={"service": service},
+                statistic=threshold.statistic,
+                period=threshold.period or Duration.minutes(DEFAULT_PERIOD_MINUTES),
+            )
+            self.alarms.append(metric.create_alarm(
+                self, threshold.metric_name,
+                threshold=threshold.threshold,
+                evaluation_periods=1,
+                comparison_operator=cloudwatch.ComparisonOperator.GREATER_THAN_OR_EQUAL_TO_THRESHOLD,
+                # No record means the handler did not run
+                treat_missing_data=cloudwatch.TreatMissingData.NOT_BREACHING,
+                alarm_description=threshold.description or f"{service} {threshold.metric_name}",
+            ))
+        if topic is not None:
+            for alarm in self.alarms:
+                alarm.add_alarm_action(cloudwatch_actions.SnsAction(topic))
@@ -0,0 +1,282 @@
+import configparser
+import fcntl
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_REGION = "us-east-1"
+# The project's profile, used when it is configured and AWS_PROFILE is not set (see default_profile)
+DEFAULT_PROFILE = "iac-cdk"
+DEFAULT_TTL_SECONDS = 3600
+
+# GetParameters accepts at most 10 names per call
+MAX_NAMES_PER_CALL = 10
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                  ".ssm-parameter-cache.json")
+
+VPC_ID_PARAMETER = "vpcstack_vpc_vpc_id"
+
+
+class ParameterResolutionError(Exception):
+    """Raised when SSM does not know some of the requested parameters"""
+    pass
+
+
+class StubSsmClient:
+    """
+    Offline stand-in for the boto3 SSM client, answering get_parameters from a dict.
+    `calls` records the names requested per call.
+    """
+
+    def __init__(self, values: Dict[str, str]) -> None:
+        self.values = dict(values)
+        self.calls: List[List[str]] = []
+
+    def get_parameters(self, Names: List[str], WithDecryption: bool = False) -> Dict[str, Any]:
+        self.calls.append(list(Names))
+        return {
+            "Parameters": [{"Name": name, "Value": self.values[name]} for name in Names if name in self.values],
+            "InvalidParameters": [name for name in Names if name not in self.values],
+        }
+
+
+def _configured_profiles() -> List[str]:
+    """Profile names in the shared AWS config and credentials files."""
+    config = configparser.ConfigParser()
+    config.read([os.path.expanduser(os.environ.get("AWS_CONFIG_FILE", "~/.aws/config")),
+                 os.path.expanduser(os.environ.get("AWS_SHARED_CREDENTIALS_FILE", "~/.aws/credentials"))])
+    return [section[len("profile "):] if section.startswith("profile ") else section for section in config.sections()]
+
+
+def default_profile() -> Optional[str]:
+    """
+    AWS_PROFILE when set, else DEFAULT_PROFILE when it is configured on this machine, else
+    None: the default credential chain (environment credentials in CI, instance roles, SSO).
+    """
+    if os.environ.get("AWS_PROFILE"):
+        return os.environ["AWS_PROFILE"]
+    return DEFAULT_PROFILE if DEFAULT_PROFILE in _configured_profiles() else None
+
+
+def _boto3_client(region: str, profile: Optional[str]) -> Any:
+    import boto3
+    return boto3.Session(region_name=region, profile_name=profile).client("ssm")
+
+
+class ParameterResolver:
+    """
+    Resolves SSM String parameters for a synth in as few GetParameters calls as possible.
+
+    Stacks `require` every name they will need, then `get` them; the first `get` fetches all
+    pending names in batches of 10. Results are kept in an on-disk cache for `ttl_seconds`
+    so repeated synths do not go back to SSM.
+    """
+
+    def __init__(self, region: str = DEFAULT_REGION, profile: Optional[str] = None,
+                 cache_path: Optional[str] = DEFAULT_CACHE_PATH, ttl_seconds: int = DEFAULT_TTL_SECONDS,
+                 client: Any = None,
+                 client_factory: Callable[[str, Optional[str]], Any] = _boto3_client,
+                 account: Optional[str] = None) -> None:
+        self.region = region
+        self.profile = profile
+        # Only part of the cache key: the profile's credentials pick the account SSM answers for
+        self.account = account
+        self.cache_path = cache_path
+        self.ttl_seconds = ttl_seconds
+        self._client = client
+        self._client_factory = client_factory
+        self._pending: List[str] = []
+        self._values: Dict[str, Dict[str, Any]] = self._read_cache()
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            self._client = self._client_factory(self.region, self.profile)
+        return self._client
+
+    def require(self, *names: str) -> None:
+        for name in names:
+            if name not in self._pending:
+                self._pending.append(name)
+
+    def get(self, name: str) -> str:
+        self.require(name)
+        return self.resolve()[name]
+
+    def get_many(self, names: Iterable[str]) -> Dict[str, str]:
+        names = list(names)
+        self.require(*names)
+        resolved = self.resolve()
+        return {name: resolved[name] for name in names}
+
+    def resolve(self) -> Dict[str, str]:
+        """Fetch every required name that is missing or expired, then return all known values."""
+        stale = [name for name in self._pending if not self._is_fresh(name)]
+        if stale:
+            self._fetch(stale)
+        return {name: entry["value"] for name, entry in self._values.items()}
+
+    def refresh(self, names: Optional[Iterable[str]] = None) -> Dict[str, str]:
+        """Drop cached values (all of them by default) and fetch them again."""
+        names = list(names) if names is not None else list(self._values)
+        for name in names:
+            self._values.pop(name, None)
+        self.require(*names)
+        return self.resolve()
+
+    def _is_fresh(self, name: str) -> bool:
+        entry = self._values.get(name)
+        return entry is not None and time.time() - entry["fetched_at"] < self.ttl_seconds
+
+    def _fetch(self, names: List[str]) -> None:
+        invalid: List[str] = []
+        fetched_at = time.time()
+        for start in range(0, len(names), MAX_NAMES_PER_CALL):
+            response = self.client.get_parameters(Names=names[start:start + MAX_NAMES_PER_CALL],
+                                                  WithDecryption=False)
+            for parameter in response.get("Parameters", []):
+                self._values[parameter["Name"]] = {"value": parameter["Value"], "fetched_at": fetched_at}
+            invalid.extend(response.get("InvalidParameters", []))
+        self._write_cache()
+        if invalid:
+            raise ParameterResolutionError(f"SSM parameters not found in {self.region}: {', '.join(invalid)}")
+
+    def _cache_key(self) -> str:
+        if self.account:
+            return f"{self.profile or 'default'}:{self.account}:{self.region}"
+        return f"{self.profile or 'default'}:{self.region}"
+
+    def _read_cache(self) -> Dict[str, Dict[str, Any]]:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, "r") as f:
+                return json.load(f).get(self._cache_key(), {})
+        except (OSError, ValueError):
+            return {}
+
+    def _write_cache(self) -> None:
+        if not self.cache_path:
+            return
+        # Parallel synth processes share the file: merge into it under a lock so none drops another's entries
+        with open(f"{self.cache_path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            cache = {}
+            if os.path.exists(self.cache_path):
+                try:
+                    with open(self.cache_path, "r") as f:
+                        cache = json.load(f)
+                except (OSError, ValueError):
+                    cache = {}
+            cache[self._cache_key()] = dict(cache.get(self._cache_key(), {}), **self._values)
+            # Write then rename, so readers never see a half-written cache
+            temp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(cache, f, indent=2, sort_keys=True)
+            os.replace(temp_path, self.cache_path)
+
+
+class StackParameters:
+    """
+    The shared resolver as seen by one stack: the names the stack requires are recorded
+    (per cache key) so incremental synth can fingerprint and expire just those.
+    """
+
+    def __init__(self, resolver: ParameterResolver, stack_name: str) -> None:
+        self.resolver = resolver
+        self._names = _stack_parameters.setdefault(stack_name, {}).setdefault(resolver._cache_key(), set())
+
+    def require(self, *names: str) -> None:
+        self._names.update(names)
+        self.resolver.require(*names)
+
+    def get(self, name: str) -> str:
+        self.require(name)
+        return self.resolver.get(name)
+
+    def get_many(self, names: Iterable[str]) -> Dict[str, str]:
+        names = list(names)
+        self.require(*names)
+        return self.resolver.get_many(names)
+
+
+_shared: Dict[Tuple[Optional[str], str, Optional[str]], ParameterResolver] = {}
+_shared_options: Dict[str, Any] = {}
+# Stack name -> cache key -> names the stack required during this synth
+_stack_parameters: Dict[str, Dict[str, Set[str]]] = {}
+
+
+def shared_resolver(region: Optional[str] = None, profile: Optional[str] = None,
+                    account: Optional[str] = None) -> ParameterResolver:
+    """
+    One resolver per account/region/profile for the whole synth process, so stacks share
+    fetched values. The profile defaults to default_profile().
+    """
+    region = region or os.environ.get("CDK_DEFAULT_REGION") or DEFAULT_REGION
+    profile = profile or default_profile()
+    key = (account, region, profile)
+    if key not in _shared:
+        _shared[key] = ParameterResolver(region=region, profile=profile, account=account, **_shared_options)
+    return _shared[key]
+
+
+def configure_shared_resolvers(**options: Any) -> None:
+    """
+    Reset the shared resolvers and build new ones with `options`, e.g. an offline stub:
+        configure_shared_resolvers(client_factory=lambda region, profile: StubSsmClient(values), cache_path=None)
+    """
+    _shared.clear()
+    _shared_options.clear()
+    _stack_parameters.clear()
+    _shared_options.update(options)
+
+
+def parameters_used(stack_name: str) -> Dict[str, List[str]]:
+    """The SSM names `stack_name` required through resolver_for, keyed by resolver cache key."""
+    return {key: sorted(names) for key, names in _stack_parameters.get(stack_name, {}).items()}
+
+
+def resolver_for(scope: Any) -> StackParameters:
+    """
+    The shared resolver for the account and region of the stack containing `scope`, recording
+    what that stack resolves. An environment-agnostic stack falls back to the `region`
+    context, then CDK_DEFAULT_REGION.
+    """
+    from aws_cdk import Stack, Token
+
+    stack = Stack.of(scope)
+    region = stack.region if not Token.is_unresolved(stack.region) else scope.node.try_get_context("region")
+    account = stack.account if not Token.is_unresolved(stack.account) else None
+    return StackParameters(shared_resolver(region, account=account), stack.node.id)
+
+
+def main(argv: List[str]) -> int:
+    """
+    python -m app.utility.parameter_resolver refresh [--region REGION] [--profile PROFILE] [NAME ...]
+    python -m app.utility.parameter_resolver show [--region REGION] [--profile PROFILE]
+    """
+    if not argv or argv[0] not in ("refresh", "show"):
+        print(main.__doc__)
+        return 2
+    command, rest = argv[0], argv[1:]
+    options = {"--region": None, "--profile": None}
+    names = []
+    while rest:
+        arg = rest.pop(0)
+        if arg in options:
+            options[arg] = rest.pop(0)
+        else:
+            names.append(arg)
+
+    resolver = shared_resolver(options["--region"], options["--profile"])
+    values = resolver.refresh(names or None) if command == "refresh" else resolver.resolve()
+    for name, value in sorted(values.items()):
+        print(f"{name}={value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,24 +1,75 @@
 import os
 import json
+import threading
+import time
 import boto3
-from typing import Dict, Any, Mapping
+from typing import Dict, Any, Iterable, List, Mapping, Optional, Tuple
+
+from app.utility.parameter_resolver import default_profile
+
+DEFAULT_REGION = "us-east-1"
+DEFAULT_TTL_SECONDS = 300
+
+# BatchGetSecretValue accepts at most 20 secret ids per call
+MAX_SECRETS_PER_CALL = 20
+
+# Fixture used instead of Secrets Manager in offline mode, e.g.
+#   cdk synth -c secrets_fixture=app/config/secrets.offline.json
+SECRETS_FIXTURE_ENV = "SECRETS_FIXTURE"
+DEFAULT_FIXTURE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "secrets.offline.json")
+
+# One session/client per region and profile for the whole process
+_clients: Dict[Tuple[str, str], Any] = {}
+_clients_lock = threading.Lock()
+
+# (region, profile, secret name) -> (expires at, parsed secret)
+_secret_cache: Dict[Tuple[str, str, str], Tuple[float, Dict[str, Any]]] = {}
+
+
+def secrets_client(region: str, profile: str) -> Any:
+    key = (region, profile)
+    with _clients_lock:
+        if key not in _clients:
+            session = boto3.Session(region_name=region, profile_name=profile)
+            _clients[key] = session.client("secretsmanager")
+        return _clients[key]
+
+
+def clear_secret_cache() -> None:
+    _secret_cache.clear()
+
+
+def fixture_from_context(context_value: Any) -> Optional[str]:
+    """`-c secrets_fixture=true` selects the bundled fixture, any other value is a path."""
+    if context_value in (True, "true", "True", "1"):
+        return DEFAULT_FIXTURE_PATH
+    return context_value or None
 
 
 class AwsSecretsManagerService:
     """
     Utility class for retrieving secrets from AWS Secrets Manager,
     specifically for use in CDK-based application stack provisioning.
+
+    Clients are shared per region/profile and parsed secrets are cached in memory
+    for `TTL` seconds, so repeated or multi-app synths fetch each secret once.
+    With `FIXTURE` (or the SECRETS_FIXTURE environment variable) set, secrets are read
+    from that JSON file instead and Secrets Manager is never called.
     """
 
 
     def __init__(self, secret_parameters: Mapping[Any, Any], account_parameters: Dict[str, str]) -> None:
 
-        DEFAULT_REGION = "us-east-1"
         self.region = account_parameters.get("REGION") or DEFAULT_REGION
-        self.profile = account_parameters.get("PROFILE") or 'iac-cdk'
+        self.profile = account_parameters.get("PROFILE") or default_profile()
+        self.ttl_seconds = float(account_parameters.get("TTL") or DEFAULT_TTL_SECONDS)
+        self.fixture_path = account_parameters.get("FIXTURE") or os.environ.get(SECRETS_FIXTURE_ENV)
 
         self.secret_parameters = secret_parameters
-        self.session = boto3.Session(region_name=self.region, profile_name=self.profile)
+
+    @property
+    def offline(self) -> bool:
+        return bool(self.fixture_path)
 
     def get_db_secret(self) -> Dict[str, str]:
         """
@@ -26,31 +77,67 @@ class AwsSecretsManagerService:
         """
         secret_name = self.secret_parameters.get("DB_SECRET_NAME")
 
-        # Fake client and response for testing
         if not secret_name:
             raise ValueError("Environment variable DB_SECRET_NAME is required")
 
-        # client = boto3.client("secretsmanager", region_name="us-east-1")
-        client = self.session.client("secretsmanager")
+        return self.get_secrets([secret_name])[secret_name]
+
+    def get_secrets(self, secret_names: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch many secrets at once; names not in the cache are retrieved with batched calls.
+        """
+        secret_names = list(dict.fromkeys(secret_names))
+        if self.offline:
+            return self._from_fixture(secret_names)
+
+        now = time.time()
+        secrets: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+        for name in secret_names:
+            cached = _secret_cache.get((self.region, self.profile, name))
+            if cached and cached[0] > now:
+                secrets[name] = cached[1]
+            else:
+                missing.append(name)
+
+        for start in range(0, len(missing), MAX_SECRETS_PER_CALL):
+            secrets.update(self._fetch(missing[start:start + MAX_SECRETS_PER_CALL]))
+        return secrets
 
+    def _fetch(self, secret_names: List[str]) -> Dict[str, Dict[str, Any]]:
+        client = secrets_client(self.region, self.profile)
         try:
-            response = client.get_secret_value(SecretId=secret_name)
-            secret_string = response.get("SecretString")
+            response = client.batch_get_secret_value(SecretIdList=secret_names)
+        except Exception as e:
+            raise RuntimeError(f"Failed to retrieve secrets {secret_names}: {e}") from e
+
+        errors = response.get("Errors") or []
+        if errors:
+            details = ", ".join(f"{err.get('SecretId')}: {err.get('Message')}" for err in errors)
+            raise RuntimeError(f"Failed to retrieve secrets: {details}")
+
+        expires_at = time.time() + self.ttl_seconds
+        secrets = {}
+        for value in response.get("SecretValues", []):
+            secret_string = value.get("SecretString")
             if not secret_string:
-                raise ValueError("SecretString not found in Secrets Manager response.")
+                raise ValueError(f"SecretString not found for {value.get('Name')} in Secrets Manager response.")
+            secret = {str(k): str(v) for k, v in json.loads(secret_string).items()}
+            # Key the result by the id we asked for, which may be the name or the ARN
+            requested = next((name for name in secret_names if name in (value.get("Name"), value.get("ARN"))),
+                             value.get("Name"))
+            secrets[requested] = secret
+            _secret_cache[(self.region, self.profile, requested)] = (expires_at, secret)
+        return secrets
 
-            secret = json.loads(secret_string)
-            print("CRED:", secret)  # For debugging, can be replaced with logging
-            return secret
-        except Exception as e:
-            dummy_secret = {
-                str(k): str(v) for k, v in {
-                    "username": "test_user",
-                    "password": "test_pass",
-                    "host": "localhost",
-                    "port": 5432,
-                    "dbname": "mydb"
-                }.items()
-            }
-            return dummy_secret
-            # raise RuntimeError(f"Failed to retrieve or parse secret: {e}") from e
+    def _from_fixture(self, secret_names: List[str]) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.fixture_path, "r") as f:
+                fixture = json.load(f)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Secrets fixture not found at {self.fixture_path}")
+
+        missing = [name for name in secret_names if name not in fixture]
+        if missing:
+            raise ValueError(f"Secrets fixture {self.fixture_path} has no entry for: {', '.join(missing)}")
+        return {name: {str(k): str(v) for k, v in fixture[name].items()} for name in secret_names}
@@ -0,0 +1,191 @@
+import contextlib
+import functools
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional
+
+# cdk synth -c profile=true
+PROFILE_CONTEXT_KEY = "profile"
+REPORT_FILENAME = "synth-profile.json"
+
+# jsii kernel entry points; every call is one round-trip to the node process
+KERNEL_METHODS = ("create", "invoke", "sinvoke", "get", "sget", "set", "sset")
+INSTANCE_METHODS = ("invoke", "get", "set")
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def profiling_enabled(context_value: Any) -> bool:
+    if isinstance(context_value, str):
+        return context_value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(context_value)
+
+
+def _new_entry() -> Dict[str, Any]:
+    return {"seconds": 0.0, "calls": 0}
+
+
+class SynthProfiler:
+    """
+    Opt-in profiler for stack construction. While installed it intercepts every jsii
+    kernel call and attributes its time to:
+      - the construct path the call creates or operates on (e.g. AppStack/MySecretUsername)
+      - the code in `app/` that made the call (e.g. app_stack.py:ECSAppStack.prepare_environment)
+    """
+
+    def __init__(self, source_root: str = APP_ROOT) -> None:
+        self.source_root = source_root
+        self.construct_paths: Dict[str, Dict[str, Any]] = defaultdict(_new_entry)
+        self.callers: Dict[str, Dict[str, Any]] = defaultdict(_new_entry)
+        self.stacks: Dict[str, Dict[str, Any]] = {}
+        self.total = _new_entry()
+        self._object_paths: Dict[int, Any] = {}
+        self._depth = 0
+        self._resolving = False
+        self._kernel_class = None
+        self._originals: Dict[str, Any] = {}
+
+    @classmethod
+    def from_context(cls, scope: Any) -> Optional["SynthProfiler"]:
+        """Return an installed profiler when the `profile` context flag is set, otherwise None."""
+        if not profiling_enabled(scope.node.try_get_context(PROFILE_CONTEXT_KEY)):
+            return None
+        profiler = cls()
+        profiler.install()
+        return profiler
+
+    def install(self, kernel_class: Any = None) -> None:
+        if kernel_class is None:
+            from jsii._kernel import Kernel as kernel_class
+        self._kernel_class = kernel_class
+        for method in KERNEL_METHODS:
+            original = getattr(kernel_class, method, None)
+            if original is None:
+                continue
+            self._originals[method] = original
+            setattr(kernel_class, method, self._wrap(method, original))
+
+    def uninstall(self) -> None:
+        for method, original in self._originals.items():
+            setattr(self._kernel_class, method, original)
+        self._originals = {}
+
+    @contextlib.contextmanager
+    def track(self, stack_name: str) -> Iterator[None]:
+        """Measure construction of one stack (wall time plus the jsii calls made meanwhile)."""
+        calls, seconds = self.total["calls"], self.total["seconds"]
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stacks[stack_name] = {
+                "seconds": time.perf_counter() - started,
+                "jsii_seconds": self.total["seconds"] - seconds,
+                "calls": self.total["calls"] - calls,
+            }
+
+    def _wrap(self, method: str, original: Any) -> Any:
+        profiler = self
+
+        @functools.wraps(original)
+        def wrapper(kernel, *args, **kwargs):
+            if profiler._resolving or profiler._depth:
+                # Nested callbacks and our own path lookups are accounted to the outer call
+                return original(kernel, *args, **kwargs)
+            profiler._depth += 1
+            started = time.perf_counter()
+            try:
+                return original(kernel, *args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                profiler._depth -= 1
+                profiler._record(method, args, elapsed)
+
+        return wrapper
+
+    def _record(self, method: str, args: tuple, elapsed: float) -> None:
+        path = self._path_for_call(method, args)
+        for entry in (self.total, self.construct_paths[path], self.callers[self._caller()]):
+            entry["seconds"] += elapsed
+            entry["calls"] += 1
+
+    def _path_for_call(self, method: str, args: tuple) -> str:
+        if method == "create":
+            # create(klass, obj, args): construct constructors take (scope, id, ...)
+            obj, ctor_args = args[1], (args[2] if len(args) > 2 else None) or []
+            if len(ctor_args) >= 2 and isinstance(ctor_args[1], str):
+                parent = self._path_of(ctor_args[0])
+                if parent is not None:
+                    path = f"{parent}/{ctor_args[1]}" if parent else ctor_args[1]
+                    self._object_paths[id(obj)] = (obj, path)
+                    return path
+            return "<non-construct>"
+        if method in INSTANCE_METHODS:
+            path = self._path_of(args[0])
+            return path if path is not None else "<non-construct>"
+        # Static calls such as ssm.StringParameter.value_from_lookup(scope, ...) are charged to their scope
+        static_args = args[2] if method == "sinvoke" and len(args) > 2 else None
+        if static_args:
+            path = self._path_of(static_args[0])
+            if path is not None:
+                return path
+        return "<static>"
+
+    def _path_of(self, obj: Any) -> Optional[str]:
+        cached = self._object_paths.get(id(obj))
+        if cached is not None and cached[0] is obj:
+            return cached[1]
+        self._resolving = True
+        try:
+            node = getattr(obj, "node", None)
+            path = getattr(node, "path", None) if node is not None else None
+        except Exception:
+            path = None
+        finally:
+            self._resolving = False
+        if isinstance(path, str):
+            self._object_paths[id(obj)] = (obj, path)
+            return path
+        return None
+
+    def _caller(self) -> str:
+        frame = sys._getframe(2)
+        while frame is not None:
+            filename = os.path.abspath(frame.f_code.co_filename)
+            if filename.startswith(self.source_root) and filename != os.path.abspath(__file__):
+                name = getattr(frame.f_code, "co_qualname", frame.f_code.co_name)
+                return f"{os.path.relpath(filename, self.source_root)}:{name}"
+            frame = frame.f_back
+        return "<outside app>"
+
+    def report(self) -> Dict[str, Any]:
+        def hot_spots(entries: Dict[str, Dict[str, Any]], key: str) -> List[Dict[str, Any]]:
+            rows = [{key: name, **entry} for name, entry in entries.items()]
+            return sorted(rows, key=lambda row: (row["seconds"], row["calls"]), reverse=True)
+
+        return {
+            "total": dict(self.total),
+            "stacks": self.stacks,
+            "construct_paths": hot_spots(self.construct_paths, "path"),
+            "callers": hot_spots(self.callers, "caller"),
+        }
+
+    def write_report(self, outdir: str, top: int = 15) -> str:
+        report = self.report()
+        os.makedirs(outdir, exist_ok=True)
+        report_path = os.path.join(outdir, REPORT_FILENAME)
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+        print(f"Synth profile ({report['total']['calls']} jsii calls, "
+              f"{report['total']['seconds']:.3f}s) written to {report_path}")
+        for name, stack in report["stacks"].items():
+            print(f"  stack {name:30} {stack['seconds']:8.3f}s {stack['calls']:6} calls")
+        for row in report["construct_paths"][:top]:
+            print(f"  path  {row['path']:30} {row['seconds']:8.3f}s {row['calls']:6} calls")
+        for row in report["callers"][:top]:
+            print(f"  code  {row['caller']:30} {row['seconds']:8.3f}s {row['calls']:6} calls")
+        return report_path
@@ -0,0 +1,187 @@
+"""
+Template budget analyzer for a synthesized cloud assembly.
+
+Reads every CloudFormation stack in cdk.out (no AWS access needed) and reports its template
+size, resources by type, outputs, parameters and exports against the `template_budgets`
+configured in app/config/defaults.json (per stack under `stacks`). It also points at the
+constructs driving template growth: the largest resources, sibling constructs repeated many
+times (e.g. one secret per key) and long property lists (e.g. one ingress rule per port).
+
+    python -m app.utility.template_budget                  # cdk.out, dev budgets
+    python -m app.utility.template_budget --outdir cdk.out/prod --env prod
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterator, List, Mapping, Tuple
+
+from app.utility.app_config import load_config
+
+REPORT_FILENAME = "template-budget.json"
+MANIFEST_FILE = "manifest.json"
+STACK_ARTIFACT_TYPE = "aws:cloudformation:stack"
+PATH_METADATA = "aws:cdk:path"
+
+METRICS = ("template_bytes", "resources", "outputs", "parameters", "exports")
+
+# CloudFormation quotas, used when no budget is configured
+# https://docs.aws.amazon.com/AWSCloudFormation/latest/UserGuide/cloudformation-limits.html
+CLOUDFORMATION_LIMITS = {"template_bytes": 1048576, "resources": 500, "outputs": 200, "parameters": 200,
+                         "exports": 200}
+DEFAULT_WARN_RATIO = 0.8
+DEFAULT_REPEAT_THRESHOLD = 4
+
+# Default construct children that hold the CloudFormation resource of their parent
+RESOURCE_CHILDREN = ("Resource", "Default")
+
+
+def construct_path(logical_id: str, resource: Mapping[str, Any]) -> str:
+    path = resource.get("Metadata", {}).get(PATH_METADATA, logical_id)
+    parent, _, child = path.rpartition("/")
+    return parent if parent and child in RESOURCE_CHILDREN else path
+
+
+def _compact_size(value: Any) -> int:
+    return len(json.dumps(value, separators=(",", ":")))
+
+
+def _long_lists(value: Any, threshold: int, path: str = "") -> Iterator[Tuple[str, int]]:
+    """Property lists with at least `threshold` entries; intrinsic function arguments are skipped."""
+    if isinstance(value, dict):
+        for key, child in value.items():
+            if not key.startswith("Fn::"):
+                yield from _long_lists(child, threshold, f"{path}.{key}" if path else key)
+    elif isinstance(value, list):
+        if len(value) >= threshold:
+            yield path, len(value)
+        for index, child in enumerate(value):
+            yield from _long_lists(child, threshold, f"{path}[{index}]")
+
+
+def stack_budget(budgets: Mapping[str, Any], stack_name: str) -> Dict[str, int]:
+    budget = dict(CLOUDFORMATION_LIMITS)
+    budget.update(budgets.get("default", {}))
+    budget.update(budgets.get("stacks", {}).get(stack_name, {}))
+    return budget
+
+
+def _status(value: int, limit: int, warn_ratio: float) -> str:
+    if value > limit:
+        return "over"
+    return "warn" if value >= limit * warn_ratio else "ok"
+
+
+def analyze_template(stack_name: str, template_path: str, budgets: Mapping[str, Any],
+                     top: int = 10) -> Dict[str, Any]:
+    with open(template_path, "r") as f:
+        template = json.load(f)
+
+    resources = template.get("Resources", {})
+    outputs = template.get("Outputs", {})
+    repeat_threshold = budgets.get("repeat_threshold", DEFAULT_REPEAT_THRESHOLD)
+    warn_ratio = budgets.get("warn_ratio", DEFAULT_WARN_RATIO)
+
+    usage = {
+        "template_bytes": os.path.getsize(template_path),
+        "resources": len(resources),
+        "outputs": len(outputs),
+        "parameters": len(template.get("Parameters", {})),
+        "exports": sum(1 for output in outputs.values() if "Export" in output),
+    }
+    budget = stack_budget(budgets, stack_name)
+    metrics = {
+        metric: {"value": usage[metric], "limit": budget[metric],
+                 "status": _status(usage[metric], budget[metric], warn_ratio)}
+        for metric in METRICS
+    }
+
+    constructs = []
+    siblings: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+    long_lists = []
+    for logical_id, resource in resources.items():
+        path = construct_path(logical_id, resource)
+        constructs.append({"path": path, "type": resource.get("Type"), "bytes": _compact_size(resource)})
+        parent, _, child = path.rpartition("/")
+        siblings[(parent, resource.get("Type"))].append(child)
+        for property_path, length in _long_lists(resource.get("Properties", {}), repeat_threshold):
+            long_lists.append({"path": path, "property": property_path, "entries": length})
+
+    repeated = [
+        {"parent": parent, "type": resource_type, "count": len(children), "constructs": sorted(children)}
+        for (parent, resource_type), children in siblings.items() if len(children) >= repeat_threshold
+    ]
+
+    return {
+        "stack": stack_name,
+        "template": template_path,
+        "metrics": metrics,
+        "resource_types": dict(Counter(resource.get("Type") for resource in resources.values()).most_common()),
+        "exports": sorted(name for name, output in outputs.items() if "Export" in output),
+        "largest_constructs": sorted(constructs, key=lambda row: row["bytes"], reverse=True)[:top],
+        "repeated_constructs": sorted(repeated, key=lambda row: row["count"], reverse=True),
+        "long_property_lists": sorted(long_lists, key=lambda row: row["entries"], reverse=True),
+    }
+
+
+def stack_templates(outdir: str) -> List[Tuple[str, str]]:
+    """(stack name, template path) of every stack artifact in the cloud assembly at `outdir`."""
+    manifest_path = os.path.join(outdir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"No cloud assembly at {outdir}, run `cdk synth` first")
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+
+    templates = []
+    for artifact_id, artifact in manifest.get("artifacts", {}).items():
+        if artifact.get("type") == STACK_ARTIFACT_TYPE:
+            properties = artifact.get("properties", {})
+            templates.append((artifact_id, os.path.join(outdir, properties["templateFile"])))
+    return templates
+
+
+def analyze_assembly(outdir: str, budgets: Mapping[str, Any], top: int = 10) -> Dict[str, Any]:
+    stacks = [analyze_template(name, path, budgets, top) for name, path in stack_templates(outdir)]
+    return {
+        "stacks": stacks,
+        "over_budget": [stack["stack"] for stack in stacks
+                        if any(metric["status"] == "over" for metric in stack["metrics"].values())],
+    }
+
+
+def write_report(report: Dict[str, Any], outdir: str) -> str:
+    report_path = os.path.join(outdir, REPORT_FILENAME)
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Template budgets written to {report_path}")
+    for stack in report["stacks"]:
+        metrics = stack["metrics"]
+        print(f"  stack {stack['stack']:30} " + "  ".join(
+            f"{metric} {metrics[metric]['value']}/{metrics[metric]['limit']}"
+            + ("" if metrics[metric]["status"] == "ok" else f" ({metrics[metric]['status'].upper()})")
+            for metric in METRICS))
+        for row in stack["repeated_constructs"]:
+            print(f"    {row['count']} x {row['type']} under {row['parent'] or stack['stack']}")
+        for row in stack["long_property_lists"]:
+            print(f"    {row['entries']} entries in {row['path']} {row['property']}")
+    return report_path
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Check synthesized templates against their budgets")
+    parser.add_argument("--outdir", default="cdk.out", help="cloud assembly directory (default: cdk.out)")
+    parser.add_argument("--env", default="dev", help="environment whose template_budgets apply")
+    parser.add_argument("--top", type=int, default=10, help="largest constructs to list per stack")
+    args = parser.parse_args(argv)
+
+    report = analyze_assembly(args.outdir, load_config(args.env).get("template_budgets", {}), args.top)
+    write_report(report, args.outdir)
+    for name in report["over_budget"]:
+        print(f"{name} is over budget")
+    return 1 if report["over_budget"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
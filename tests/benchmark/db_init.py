@@ -0,0 +1,231 @@
+"""
+Local benchmark harness for the RDS init handler (`app/rds_init_lambda/handler.py`).
+
+The handler runs in-process against a local database container, with Secrets Manager
+replaced by a stub returning the container's credentials. A synthetic, deterministic
+workload is generated for every run: a migration of DB_BENCHMARK_STATEMENTS statements,
+then DB_BENCHMARK_ROWS rows split over a CSV and an NDJSON seed file. The same sizes
+always produce the same files, so results are comparable across commits.
+
+Each workload runs in a fresh process and is invoked twice, like the custom resource
+would be: a Create that applies the migration, then an Update that loads the seeds.
+Reported: statements/s, rows/s, total time and the process' peak RSS.
+
+    docker run -d -p 3306:3306 -e MYSQL_ROOT_PASSWORD=secret -e MYSQL_DATABASE=bench mysql:8.0 --local-infile=1
+    docker run -d -p 5432:5432 -e POSTGRES_PASSWORD=secret -e POSTGRES_DB=bench postgres:16
+    pip install -r app/rds_init_lambda/requirements.txt boto3
+
+    DB_BENCHMARK_ENGINE=MySQL DB_BENCHMARK_PASSWORD=secret python -m tests.benchmark.db_init
+    DB_BENCHMARK_ENGINE=Postgres python -m pytest tests/benchmark/test_db_init_benchmark.py -s
+
+    DB_BENCHMARK_ENGINE           MySQL or Postgres (the benchmark is skipped when unset)
+    DB_BENCHMARK_HOST / _PORT     127.0.0.1 / the engine's default port
+    DB_BENCHMARK_USER             root (MySQL) or postgres (Postgres)
+    DB_BENCHMARK_PASSWORD         secret
+    DB_BENCHMARK_DATABASE         bench
+    DB_BENCHMARK_STATEMENTS=5000  statements in the synthetic migration
+    DB_BENCHMARK_ROWS=100000      seed rows, half CSV and half NDJSON
+    DB_BENCHMARK_OUTPUT           also write the results (with the commit measured) to this JSON file
+"""
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+LAMBDA_DIR = os.path.join(ROOT_DIR, "app", "rds_init_lambda")
+
+ENGINE = os.environ.get("DB_BENCHMARK_ENGINE")
+STATEMENTS = int(os.environ.get("DB_BENCHMARK_STATEMENTS", "5000"))
+ROWS = int(os.environ.get("DB_BENCHMARK_ROWS", "100000"))
+LOAD_MODES = ["insert", "bulk"]
+
+# Generated workloads never change for a given size
+SEED = 20240101
+TABLES = ["bench_events", "bench_tags", "bench_items", "schema_migrations", "seed_progress"]
+
+
+def connection_settings(engine: str) -> dict:
+    postgres = engine == "Postgres"
+    return {
+        "engine": engine,
+        "host": os.environ.get("DB_BENCHMARK_HOST", "127.0.0.1"),
+        "port": int(os.environ.get("DB_BENCHMARK_PORT", "5432" if postgres else "3306")),
+        "user": os.environ.get("DB_BENCHMARK_USER", "postgres" if postgres else "root"),
+        "password": os.environ.get("DB_BENCHMARK_PASSWORD", "secret"),
+        "database": os.environ.get("DB_BENCHMARK_DATABASE", "bench"),
+    }
+
+
+def write_workload(directory: str, statements: int, rows: int) -> dict:
+    """The migration and seed files of one workload; returns their paths."""
+    rng = random.Random(SEED)
+    migrations_dir = os.path.join(directory, "migrations")
+    seed_dir = os.path.join(directory, "seeds")
+    os.makedirs(migrations_dir)
+    os.makedirs(seed_dir)
+
+    with open(os.path.join(migrations_dir, "0001_benchmark.sql"), "w", encoding="utf-8") as f:
+        f.write("-- Synthetic benchmark schema\n"
+                "CREATE TABLE bench_items (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, payload TEXT);\n"
+                "CREATE TABLE bench_events (id INTEGER PRIMARY KEY, item_id INTEGER, name VARCHAR(100), "
+                "amount NUMERIC(12, 2), note TEXT, FOREIGN KEY (item_id) REFERENCES bench_items (id));\n"
+                "CREATE TABLE bench_tags (id INTEGER PRIMARY KEY, label VARCHAR(50), weight INTEGER);\n")
+        for item in range(1, statements - 2):
+            payload = "".join(rng.choice("abcdefgh ;'") for _ in range(rng.randint(10, 80))).replace("'", "''")
+            f.write(f"INSERT INTO bench_items (id, name, payload) VALUES ({item}, 'item-{item}', '{payload}');\n")
+
+    items = max(statements - 3, 1)
+    csv_rows = rows // 2
+    with open(os.path.join(seed_dir, "01_bench_events.csv"), "w", encoding="utf-8") as f:
+        f.write("id,item_id,name,amount,note\n")
+        for row in range(1, csv_rows + 1):
+            note = "" if row % 10 == 0 else f'"note, {rng.randint(0, 10 ** 6)} ""quoted"""'
+            f.write(f"{row},{rng.randint(1, items)},event-{row},{rng.randint(0, 10 ** 6) / 100:.2f},{note}\n")
+    with open(os.path.join(seed_dir, "02_bench_tags.ndjson"), "w", encoding="utf-8") as f:
+        for row in range(1, rows - csv_rows + 1):
+            f.write(json.dumps({"id": row, "label": f"tag-{rng.randint(0, 999)}", "weight": rng.randint(0, 100)})
+                    + "\n")
+    return {"migrations_dir": migrations_dir, "seed_dir": seed_dir}
+
+
+class StubSecretsClient:
+    """Answers get_secret_value with the container's credentials."""
+
+    def __init__(self, username: str, password: str) -> None:
+        self.secret = json.dumps({"username": username, "password": password})
+
+    def get_secret_value(self, SecretId: str) -> dict:
+        return {"SecretString": self.secret}
+
+
+class LambdaContext:
+    function_name = "app-db-initializer"
+    function_version = "$LATEST"
+    memory_limit_in_mb = 1024
+    invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:app-db-initializer"
+    aws_request_id = "benchmark"
+
+    def __init__(self, timeout_seconds: int = 900) -> None:
+        self.deadline = time.monotonic() + timeout_seconds
+
+    def get_remaining_time_in_millis(self) -> int:
+        return int((self.deadline - time.monotonic()) * 1000)
+
+
+def _peak_rss_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _reset_database(driver, settings: dict) -> None:
+    conn = driver.connect(settings["host"], settings["port"], settings["user"], settings["password"],
+                          settings["database"])
+    cursor = conn.cursor()
+    try:
+        for table in TABLES:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def run_workload(settings: dict, load_mode: str, statements: int, rows: int) -> dict:
+    """Run in a fresh process: generate the workload, then invoke the handler twice."""
+    with tempfile.TemporaryDirectory(prefix="db-init-benchmark-") as directory:
+        workload = write_workload(directory, statements, rows)
+        empty_seed_dir = os.path.join(directory, "no-seeds")
+        os.makedirs(empty_seed_dir)
+        os.environ.update({
+            "DB_SECRET_ARN": "arn:aws:secretsmanager:us-east-1:123456789012:secret:benchmark",
+            "DB_ENDPOINT": settings["host"],
+            "DB_PORT": str(settings["port"]),
+            "DB_NAME": settings["database"],
+            "DB_ENGINE": settings["engine"],
+            "SEED_LOAD_MODE": load_mode,
+            "SEED_PARALLELISM": "2",
+            "SEED_ASYNC": "false",
+            "LOG_LEVEL": "WARNING",
+        })
+        sys.path.insert(0, LAMBDA_DIR)
+        import handler
+        import migrations
+        from drivers import driver_for
+
+        driver = driver_for(settings["engine"])
+        _reset_database(driver, settings)
+        handler._secrets_client = StubSecretsClient(settings["user"], settings["password"])
+        # The engine subdirectory of the generated migrations directory
+        migrations.DEFAULT_MIGRATIONS_DIR = os.path.dirname(workload["migrations_dir"])
+        driver.migrations_dir = os.path.basename(workload["migrations_dir"])
+        handler._drivers[settings["engine"]] = driver
+
+        started = time.perf_counter()
+        os.environ["SEED_DIR"] = empty_seed_dir
+        handler.lambda_handler({"RequestType": "Create"}, LambdaContext())
+        migrated = time.perf_counter()
+        os.environ["SEED_DIR"] = workload["seed_dir"]
+        handler.lambda_handler({"RequestType": "Update"}, LambdaContext())
+        seeded = time.perf_counter()
+        handler.discard_shared_connection()
+
+    return {
+        "migrate_seconds": migrated - started,
+        "seed_seconds": seeded - migrated,
+        "total_seconds": seeded - started,
+        "statements_per_second": statements / (migrated - started),
+        "rows_per_second": rows / (seeded - migrated),
+        "peak_rss_mib": _peak_rss_mib(),
+    }
+
+
+def measure(settings: dict, load_mode: str, statements: int = STATEMENTS, rows: int = ROWS) -> dict:
+    # A fresh process per workload keeps peak RSS and the handler's warm state from leaking between runs
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(run_workload, settings, load_mode, statements, rows).result()
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_results(path: str, results: dict) -> None:
+    with open(path, "w") as f:
+        json.dump({"commit": current_commit(), "statements": STATEMENTS, "rows": ROWS, "results": results},
+                  f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def format_result(name: str, result: dict) -> str:
+    return (f"{name:18} {result['statements_per_second']:>9.0f} statements/s "
+            f"{result['rows_per_second']:>9.0f} rows/s total={result['total_seconds']:.2f}s "
+            f"peak_rss={result['peak_rss_mib']:.0f}MiB")
+
+
+def main() -> None:
+    if not ENGINE:
+        sys.exit("Set DB_BENCHMARK_ENGINE to MySQL or Postgres (see the module docstring)")
+    settings = connection_settings(ENGINE)
+    results = {}
+    for load_mode in LOAD_MODES:
+        name = f"{ENGINE}[{load_mode}]"
+        results[name] = measure(settings, load_mode)
+        print(format_result(name, results[name]))
+    if os.environ.get("DB_BENCHMARK_OUTPUT"):
+        write_results(os.environ["DB_BENCHMARK_OUTPUT"], results)
+
+
+if __name__ == "__main__":
+    main()
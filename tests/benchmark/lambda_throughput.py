@@ -0,0 +1,481 @@
+"""
+Offline throughput harness for the auto-deploy Lambda (`app/auto_deploy_lambda/deployer.py`)
+and the ECS config-update Lambda (`app/check_out_todo/config_auto_update_ecs/lambda/lambda.py`).
+
+The handlers run in-process against local stand-ins for S3, Lambda, ECS and Secrets Manager,
+which keep their state in memory and count every API call. Each call also sleeps for the
+simulated round trip, so concurrency and batching show up in the timings as they would
+against AWS. A deterministic workload of synthetic S3 event batches is generated for every run:
+the uploads of a batch are written to the local S3, then the handler is invoked with the batch.
+
+Reported per scenario: events/s (handler time only), API calls per event, the calls per
+operation, and invocation latency percentiles.
+
+    python -m tests.benchmark.lambda_throughput
+
+    LAMBDA_BENCHMARK_EVENTS=2000        S3 events per scenario
+    LAMBDA_BENCHMARK_BATCH_SIZE=10      events per invocation
+    LAMBDA_BENCHMARK_FUNCTIONS=50       distinct functions (deployer) / config files (config update)
+    LAMBDA_BENCHMARK_API_LATENCY_MS=2   simulated round trip of every API call
+    LAMBDA_BENCHMARK_OUTPUT             also write the results (with the commit measured) to this JSON file
+"""
+import base64
+import contextlib
+import copy
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEPLOYER_PATH = os.path.join(ROOT_DIR, "app", "auto_deploy_lambda", "deployer.py")
+CONFIG_UPDATE_PATH = os.path.join(ROOT_DIR, "app", "check_out_todo", "config_auto_update_ecs", "lambda", "lambda.py")
+
+EVENTS = int(os.environ.get("LAMBDA_BENCHMARK_EVENTS", "2000"))
+BATCH_SIZE = int(os.environ.get("LAMBDA_BENCHMARK_BATCH_SIZE", "10"))
+FUNCTIONS = int(os.environ.get("LAMBDA_BENCHMARK_FUNCTIONS", "50"))
+API_LATENCY_MS = float(os.environ.get("LAMBDA_BENCHMARK_API_LATENCY_MS", "2"))
+
+# Generated workloads never change for a given size
+SEED = 20240101
+ACCOUNT = "123456789012"
+REGION = "us-east-1"
+BUCKET = "benchmark-bucket"
+CLUSTER = "benchmark-cluster"
+SERVICE = "benchmark-service"
+WORKER_SERVICE = "benchmark-worker"
+CONTAINER = "app"
+TASK_FAMILY = "benchmark-task"
+
+DEPLOYER_ENVIRONMENT = {
+    "LAMBDA_ROLE_ARN": f"arn:aws:iam::{ACCOUNT}:role/benchmark-deployer",
+    "METRICS_NAMESPACE": "LambdaAutoDeploy",
+    "DEPLOY_CONCURRENCY": "8",
+}
+CONFIG_UPDATE_ENVIRONMENT = {
+    "CLUSTER_NAME": CLUSTER,
+    "SERVICE_NAME": SERVICE,
+    "CONTAINER_NAME": CONTAINER,
+    "TASK_ROLE_ARN": f"arn:aws:iam::{ACCOUNT}:role/benchmark-task",
+    "EXECUTION_ROLE_ARN": f"arn:aws:iam::{ACCOUNT}:role/benchmark-execution",
+    "TASK_FAMILY": TASK_FAMILY,
+    "METRICS_NAMESPACE": "ConfigUpdate",
+}
+
+
+class ClientError(Exception):
+    """Raised like botocore's ClientError, with the error code in `response`."""
+
+    def __init__(self, code: str, operation: str) -> None:
+        super().__init__(f"An error occurred ({code}) when calling the {operation} operation")
+        self.response = {"Error": {"Code": code}}
+
+
+class NoSuchKey(ClientError):
+    pass
+
+
+class ResourceNotFoundException(ClientError):
+    pass
+
+
+class Exceptions:
+    """The `client.exceptions` the handlers catch."""
+    ClientError = ClientError
+    NoSuchKey = NoSuchKey
+    ResourceNotFoundException = ResourceNotFoundException
+
+
+class ApiCalls:
+    """Counts the calls made to the stand-ins, per operation, and waits out the simulated round trip."""
+
+    def __init__(self, latency_seconds: float = 0.0) -> None:
+        self.latency_seconds = latency_seconds
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, operation: str) -> None:
+        with self._lock:
+            self.counts[operation] += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+
+class StandIn:
+    exceptions = Exceptions
+
+    def __init__(self, calls: ApiCalls) -> None:
+        self.calls = calls
+        self._lock = threading.Lock()
+
+
+class Body:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+
+    def read(self) -> bytes:
+        return self.data
+
+    def iter_chunks(self, chunk_size: int):
+        for start in range(0, len(self.data), chunk_size):
+            yield self.data[start:start + chunk_size]
+
+
+def sha256_base64(data: bytes) -> str:
+    return base64.b64encode(hashlib.sha256(data).digest()).decode()
+
+
+class LocalS3(StandIn):
+    """Objects by (bucket, key); `put` is the upload and is not counted as a handler call."""
+
+    def __init__(self, calls: ApiCalls) -> None:
+        super().__init__(calls)
+        self.objects = {}
+
+    def put(self, bucket: str, key: str, data: bytes, metadata: dict = None) -> None:
+        self.objects[(bucket, key)] = (data, metadata or {})
+
+    def _object(self, bucket: str, key: str, operation: str):
+        if (bucket, key) not in self.objects:
+            raise NoSuchKey("404" if operation == "HeadObject" else "NoSuchKey", operation)
+        return self.objects[(bucket, key)]
+
+    def get_object(self, Bucket: str, Key: str) -> dict:
+        self.calls.record("s3:GetObject")
+        data, metadata = self._object(Bucket, Key, "GetObject")
+        return {"Body": Body(data), "ContentLength": len(data), "Metadata": dict(metadata)}
+
+    def head_object(self, Bucket: str, Key: str, ChecksumMode: str = None) -> dict:
+        self.calls.record("s3:HeadObject")
+        data, metadata = self._object(Bucket, Key, "HeadObject")
+        head = {"ContentLength": len(data), "Metadata": dict(metadata)}
+        if ChecksumMode == "ENABLED":
+            head["ChecksumSHA256"] = sha256_base64(data)
+        return head
+
+
+class Waiter:
+    def __init__(self, calls: ApiCalls) -> None:
+        self.calls = calls
+
+    def wait(self, **kwargs) -> None:
+        # Updates complete at once here: one poll
+        self.calls.record("lambda:GetFunctionConfiguration")
+
+
+class LocalLambda(StandIn):
+    """Function configurations by name; code hashes are taken from the local S3."""
+
+    def __init__(self, calls: ApiCalls, s3: LocalS3) -> None:
+        super().__init__(calls)
+        self.s3 = s3
+        self.functions = {}
+        self.concurrency = {}
+
+    def _code_sha256(self, bucket: str, key: str) -> str:
+        return sha256_base64(self.s3.objects[(bucket, key)][0])
+
+    def _function(self, name: str, operation: str) -> dict:
+        if name not in self.functions:
+            raise ResourceNotFoundException("ResourceNotFoundException", operation)
+        return self.functions[name]
+
+    @staticmethod
+    def _apply(configuration: dict, settings: dict) -> None:
+        for name, value in settings.items():
+            configuration[name] = [{"Arn": arn} for arn in value] if name == "Layers" else copy.deepcopy(value)
+
+    def get_function(self, FunctionName: str) -> dict:
+        self.calls.record("lambda:GetFunction")
+        with self._lock:
+            response = {"Configuration": copy.deepcopy(self._function(FunctionName, "GetFunction"))}
+            if FunctionName in self.concurrency:
+                response["Concurrency"] = {"ReservedConcurrentExecutions": self.concurrency[FunctionName]}
+        return response
+
+    def create_function(self, FunctionName: str, Code: dict, **settings) -> dict:
+        self.calls.record("lambda:CreateFunction")
+        configuration = {"FunctionName": FunctionName, "Architectures": ["x86_64"],
+                         "EphemeralStorage": {"Size": 512}, "Layers": [], "Environment": {"Variables": {}},
+                         "CodeSha256": self._code_sha256(Code["S3Bucket"], Code["S3Key"])}
+        self._apply(configuration, settings)
+        with self._lock:
+            self.functions[FunctionName] = configuration
+        return copy.deepcopy(configuration)
+
+    def update_function_code(self, FunctionName: str, S3Bucket: str, S3Key: str, Architectures: list = None) -> dict:
+        self.calls.record("lambda:UpdateFunctionCode")
+        with self._lock:
+            configuration = self._function(FunctionName, "UpdateFunctionCode")
+            configuration["CodeSha256"] = self._code_sha256(S3Bucket, S3Key)
+            if Architectures:
+                configuration["Architectures"] = list(Architectures)
+            return copy.deepcopy(configuration)
+
+    def update_function_configuration(self, FunctionName: str, **settings) -> dict:
+        self.calls.record("lambda:UpdateFunctionConfiguration")
+        with self._lock:
+            configuration = self._function(FunctionName, "UpdateFunctionConfiguration")
+            self._apply(configuration, settings)
+            return copy.deepcopy(configuration)
+
+    def put_function_concurrency(self, FunctionName: str, ReservedConcurrentExecutions: int) -> dict:
+        self.calls.record("lambda:PutFunctionConcurrency")
+        with self._lock:
+            self._function(FunctionName, "PutFunctionConcurrency")
+            self.concurrency[FunctionName] = ReservedConcurrentExecutions
+        return {"ReservedConcurrentExecutions": ReservedConcurrentExecutions}
+
+    def get_waiter(self, waiter_name: str) -> Waiter:
+        return Waiter(self.calls)
+
+
+class LocalEcs(StandIn):
+    """One service per (cluster, service name) and the task definition revisions of every family."""
+
+    def __init__(self, calls: ApiCalls) -> None:
+        super().__init__(calls)
+        self.services = {}
+        self.task_definitions = {}
+        self.revisions = Counter()
+        self.deployments = Counter()
+
+    def add_service(self, cluster: str, service: str, family: str, container_definitions: list,
+                    **roles) -> None:
+        arn = self._register(family, {
+            "networkMode": "awsvpc", "requiresCompatibilities": ["FARGATE"], "cpu": "256", "memory": "512",
+            "containerDefinitions": container_definitions, **roles,
+        })
+        self.services[(cluster, service)] = arn
+
+    def _register(self, family: str, definition: dict) -> str:
+        self.revisions[family] += 1
+        arn = f"arn:aws:ecs:{REGION}:{ACCOUNT}:task-definition/{family}:{self.revisions[family]}"
+        self.task_definitions[arn] = dict(copy.deepcopy(definition), family=family, taskDefinitionArn=arn,
+                                          revision=self.revisions[family])
+        return arn
+
+    def describe_services(self, cluster: str, services: list) -> dict:
+        self.calls.record("ecs:DescribeServices")
+        return {"services": [{"serviceName": name, "taskDefinition": self.services[(cluster, name)]}
+                             for name in services if (cluster, name) in self.services]}
+
+    def describe_task_definition(self, taskDefinition: str) -> dict:
+        self.calls.record("ecs:DescribeTaskDefinition")
+        return {"taskDefinition": copy.deepcopy(self.task_definitions[taskDefinition])}
+
+    def register_task_definition(self, family: str, **definition) -> dict:
+        self.calls.record("ecs:RegisterTaskDefinition")
+        with self._lock:
+            arn = self._register(family, definition)
+            return {"taskDefinition": copy.deepcopy(self.task_definitions[arn])}
+
+    def update_service(self, cluster: str, service: str, taskDefinition: str, forceNewDeployment: bool = False) -> dict:
+        self.calls.record("ecs:UpdateService")
+        with self._lock:
+            self.services[(cluster, service)] = taskDefinition
+            self.deployments[(cluster, service)] += 1
+        return {"service": {"serviceName": service, "taskDefinition": taskDefinition}}
+
+
+class LocalSecretsManager(StandIn):
+    def describe_secret(self, SecretId: str) -> dict:
+        self.calls.record("secretsmanager:DescribeSecret")
+        return {"ARN": f"arn:aws:secretsmanager:{REGION}:{ACCOUNT}:secret:{SecretId}", "Name": SecretId}
+
+
+def load_handler_module(name: str, path: str):
+    """A fresh copy of a handler module (`lambda.py` cannot be imported by name)."""
+    spec = importlib.util.spec_from_file_location(f"benchmark_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@contextlib.contextmanager
+def patched_environment(values: dict):
+    saved = {name: os.environ.get(name) for name in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def s3_record(key: str, sequence: int) -> dict:
+    event_time = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(milliseconds=sequence)
+    return {
+        "eventSource": "aws:s3",
+        "eventName": "ObjectCreated:Put",
+        "eventTime": event_time.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        "s3": {"bucket": {"name": BUCKET}, "object": {"key": key, "sequencer": f"{sequence:016X}"}},
+    }
+
+
+def sqs_record(record: dict, sequence: int) -> dict:
+    return {"eventSource": "aws:sqs", "messageId": f"message-{sequence}", "body": json.dumps({"Records": [record]})}
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def summarize(events: int, latencies: list, calls: ApiCalls) -> dict:
+    seconds = sum(latencies)
+    return {
+        "events": events,
+        "invocations": len(latencies),
+        "seconds": seconds,
+        "events_per_second": events / seconds if seconds else 0.0,
+        "api_calls_per_event": calls.total() / events if events else 0.0,
+        "api_calls": dict(sorted(calls.counts.items())),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p90_ms": percentile(latencies, 0.90) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def invoke(handler, event: dict, latencies: list) -> None:
+    # The handlers print a line per record and the metrics records: keep them out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        handler(event, None)
+        latencies.append(time.perf_counter() - started)
+
+
+def run_deployer(events: int = EVENTS, batch_size: int = BATCH_SIZE, functions: int = FUNCTIONS,
+                 latency_ms: float = API_LATENCY_MS, sqs: bool = False) -> dict:
+    """
+    Uploads spread over `functions` packages: about a third re-upload unchanged code, every
+    fourth function carries a sidecar manifest. With `sqs` the records arrive wrapped in SQS
+    messages, as with LambdaAutoDeployStack(buffered=True).
+    """
+    rng = random.Random(SEED)
+    calls = ApiCalls(latency_ms / 1000)
+    s3 = LocalS3(calls)
+    lambda_ = LocalLambda(calls, s3)
+    for function in range(0, functions, 4):
+        s3.put(BUCKET, f"function-{function}.json", json.dumps({"memory": 1024, "architecture": "arm64"}).encode())
+
+    with patched_environment(DEPLOYER_ENVIRONMENT):
+        deployer = load_handler_module("deployer", DEPLOYER_PATH)
+        deployer._clients.update({"s3": s3, "lambda": lambda_})
+        latencies = []
+        for start in range(0, events, batch_size):
+            records = []
+            for sequence in range(start, min(start + batch_size, events)):
+                key = f"function-{rng.randrange(functions)}.zip"
+                if (BUCKET, key) not in s3.objects or rng.random() > 0.33:
+                    s3.put(BUCKET, key, f"package {sequence} {rng.random()}".encode() * 64)
+                record = s3_record(key, sequence)
+                records.append(sqs_record(record, sequence) if sqs else record)
+            invoke(deployer.lambda_handler, {"Records": records}, latencies)
+
+    result = summarize(events, latencies, calls)
+    result["deployed"] = {name: configuration["CodeSha256"] for name, configuration in lambda_.functions.items()}
+    result["uploaded"] = {key[:-len(".zip")]: sha256_base64(data)
+                          for (_, key), (data, _) in s3.objects.items() if key.endswith(".zip")}
+    return result
+
+
+def run_config_update(events: int = EVENTS, batch_size: int = BATCH_SIZE, configs: int = FUNCTIONS,
+                      latency_ms: float = API_LATENCY_MS) -> dict:
+    """
+    Uploads spread over `configs` config files, each with a secret to resolve: the odd ones
+    name the worker service, the even ones apply to the Lambda's own service.
+    """
+    rng = random.Random(SEED)
+    calls = ApiCalls(latency_ms / 1000)
+    s3 = LocalS3(calls)
+    ecs = LocalEcs(calls)
+    ecs.add_service(CLUSTER, SERVICE, TASK_FAMILY, [{"name": CONTAINER, "image": "app:latest", "environment": []}])
+    ecs.add_service(CLUSTER, WORKER_SERVICE, "benchmark-worker-task",
+                    [{"name": CONTAINER, "image": "worker:latest", "environment": []}])
+
+    with patched_environment(CONFIG_UPDATE_ENVIRONMENT):
+        config_update = load_handler_module("config_update", CONFIG_UPDATE_PATH)
+        config_update._clients.update({"s3": s3, "ecs": ecs, "secretsmanager": LocalSecretsManager(calls)})
+        latencies = []
+        uploaded = {}
+        for start in range(0, events, batch_size):
+            records = []
+            for sequence in range(start, min(start + batch_size, events)):
+                config = rng.randrange(configs)
+                key = f"configs/config-{config}.json"
+                uploaded[WORKER_SERVICE if config % 2 else SERVICE] = {f"param_{config}": f"value_{sequence}"}
+                s3.put(BUCKET, key, json.dumps({
+                    "environment": {f"param_{config}": f"value_{sequence}"},
+                    "secrets": [{"resource": f"resource_{config}", "secret_name": f"secret-{config}"}],
+                    **({"service": WORKER_SERVICE} if config % 2 else {}),
+                }).encode())
+                records.append(s3_record(key, sequence))
+            invoke(config_update.lambda_handler, {"Records": records}, latencies)
+
+    result = summarize(events, latencies, calls)
+    result["deployments"] = {service: ecs.deployments[(cluster, service)] for cluster, service in ecs.services}
+    result["task_definitions"] = {service: ecs.task_definitions[arn] for (cluster, service), arn in ecs.services.items()}
+    result["uploaded"] = uploaded
+    return result
+
+
+SCENARIOS = {
+    "deployer[s3]": lambda: run_deployer(sqs=False),
+    "deployer[sqs]": lambda: run_deployer(sqs=True),
+    "config-update": run_config_update,
+}
+
+REPORTED = ("events", "invocations", "seconds", "events_per_second", "api_calls_per_event", "api_calls",
+            "p50_ms", "p90_ms", "p99_ms")
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_results(path: str, results: dict) -> None:
+    with open(path, "w") as f:
+        json.dump({"commit": current_commit(), "events": EVENTS, "batch_size": BATCH_SIZE,
+                   "api_latency_ms": API_LATENCY_MS,
+                   "results": {name: {metric: result[metric] for metric in REPORTED}
+                               for name, result in results.items()}},
+                  f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def format_result(name: str, result: dict) -> str:
+    return (f"{name:14} {result['events_per_second']:>8.0f} events/s "
+            f"{result['api_calls_per_event']:>5.2f} calls/event p50={result['p50_ms']:.1f}ms "
+            f"p90={result['p90_ms']:.1f}ms p99={result['p99_ms']:.1f}ms")
+
+
+def main() -> None:
+    results = {}
+    for name, scenario in SCENARIOS.items():
+        results[name] = scenario()
+        print(format_result(name, results[name]))
+        print("    " + " ".join(f"{operation}={count}" for operation, count in results[name]["api_calls"].items()))
+    if os.environ.get("LAMBDA_BENCHMARK_OUTPUT"):
+        write_results(os.environ["LAMBDA_BENCHMARK_OUTPUT"], results)
+
+
+if __name__ == "__main__":
+    main()
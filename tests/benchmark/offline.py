@@ -0,0 +1,75 @@
+"""
+Offline stand-ins for the context lookups and AWS calls made while constructing stacks,
+so every stack in `app/` can be synthesized without credentials or network access.
+"""
+import aws_cdk as cdk
+
+from app.utility import parameter_resolver
+
+ACCOUNT = "123456789012"
+REGION = "us-east-1"
+VPC_ID = "vpc-0offline0000000"
+
+ENV = cdk.Environment(account=ACCOUNT, region=REGION)
+
+APP_CONFIG = {
+    "plain_parameters": {
+        "SPRING_PROFILE": "/app/dev/spring_profile",
+        "LOG_LEVEL": "/app/dev/log_level",
+    },
+    "secrete_parameters": {
+        "DB_SECRET_NAME": "offline/db-secret",
+    },
+}
+
+
+def vpc_context_key(vpc_id: str) -> str:
+    return f"vpc-provider:account={ACCOUNT}:filter.vpc-id={vpc_id}:region={REGION}:returnAsymmetricSubnets=true"
+
+
+def _subnets(kind: str, offset: int):
+    return [
+        {
+            "subnetId": f"subnet-{kind.lower()}{az}",
+            "cidr": f"10.0.{offset + i}.0/24",
+            "availabilityZone": f"{REGION}{az}",
+            "routeTableId": f"rtb-{kind.lower()}{az}",
+        }
+        for i, az in enumerate("ab")
+    ]
+
+
+def lookup_context() -> dict:
+    """Context values answering every lookup the stacks make."""
+    return {
+        "region": REGION,
+        "secrets_fixture": "true",
+        "config_overrides": APP_CONFIG,
+        vpc_context_key(VPC_ID): {
+            "vpcId": VPC_ID,
+            "vpcCidrBlock": "10.0.0.0/16",
+            "availabilityZones": [],
+            "subnetGroups": [
+                {"name": "Public", "type": "Public", "subnets": _subnets("Public", 0)},
+                {"name": "Private", "type": "Private", "subnets": _subnets("Private", 10)},
+            ],
+        },
+    }
+
+
+def ssm_parameters() -> dict:
+    parameters = {parameter_resolver.VPC_ID_PARAMETER: VPC_ID}
+    for parameter_name in APP_CONFIG["plain_parameters"].values():
+        parameters[parameter_name] = f"offline-value-for-{parameter_name}"
+    return parameters
+
+
+def offline_app() -> cdk.App:
+    return cdk.App(context=lookup_context())
+
+
+def stub_aws() -> None:
+    """Answer SSM lookups from a stub client. Secrets come from the bundled offline fixture and
+    the app configuration from `config_overrides` (see the context above)."""
+    client = parameter_resolver.StubSsmClient(ssm_parameters())
+    parameter_resolver.configure_shared_resolvers(client_factory=lambda region, profile: client, cache_path=None)
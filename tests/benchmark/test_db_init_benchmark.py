@@ -0,0 +1,74 @@
+"""
+DB init handler benchmark against a local database container (see `db_init.py`).
+
+Skipped unless DB_BENCHMARK_ENGINE is set. Results are compared against
+`db_init_baseline.json`; a measurement slower/larger than baseline * threshold fails, and
+so does a run with no baseline for its engine, load mode and workload size.
+
+    DB_BENCHMARK_UPDATE=1      write the baseline from this run
+    DB_BENCHMARK_THRESHOLD=1.5 allowed regression factor
+"""
+import json
+import os
+
+import pytest
+
+from tests.benchmark import db_init
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "db_init_baseline.json")
+THRESHOLD = float(os.environ.get("DB_BENCHMARK_THRESHOLD", "1.5"))
+UPDATE_BASELINE = os.environ.get("DB_BENCHMARK_UPDATE") == "1"
+
+# Only compared when measured on the same workload size
+COMPARED = ("migrate_seconds", "seed_seconds", "total_seconds", "peak_rss_mib")
+
+
+def load_baseline() -> dict:
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+
+def has_baseline(name: str, result: dict, baseline: dict) -> bool:
+    """Only measurements of the same workload size are comparable."""
+    expected = baseline.get(name, {})
+    return (expected.get("statements"), expected.get("rows")) == (result["statements"], result["rows"])
+
+
+def regressions(name: str, result: dict, baseline: dict) -> list:
+    expected = baseline[name]
+    return [f"{name}.{metric}: {result[metric]:.3f} > {expected[metric]:.3f} * {THRESHOLD}"
+            for metric in COMPARED if metric in expected and result[metric] > expected[metric] * THRESHOLD]
+
+
+@pytest.fixture(scope="module")
+def results():
+    collected = {}
+    yield collected
+    if UPDATE_BASELINE and collected:
+        baseline = load_baseline()
+        baseline.update(collected)
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+    if collected and os.environ.get("DB_BENCHMARK_OUTPUT"):
+        db_init.write_results(os.environ["DB_BENCHMARK_OUTPUT"], collected)
+    for name, result in collected.items():
+        print(db_init.format_result(name, result))
+
+
+@pytest.mark.skipif(not db_init.ENGINE, reason="DB_BENCHMARK_ENGINE is not set")
+@pytest.mark.parametrize("load_mode", db_init.LOAD_MODES)
+def test_db_init_benchmark(load_mode, results):
+    name = f"{db_init.ENGINE}[{load_mode}]"
+    result = db_init.measure(db_init.connection_settings(db_init.ENGINE), load_mode)
+    result.update(statements=db_init.STATEMENTS, rows=db_init.ROWS)
+    results[name] = result
+
+    if not UPDATE_BASELINE:
+        baseline = load_baseline()
+        if not has_baseline(name, result, baseline):
+            pytest.fail(f"No {os.path.basename(BASELINE_PATH)} entry for {name} with {result['statements']} "
+                        f"statements and {result['rows']} rows: run once with DB_BENCHMARK_UPDATE=1 and commit it")
+        assert not regressions(name, result, baseline)
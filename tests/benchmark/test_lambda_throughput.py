@@ -0,0 +1,99 @@
+"""
+Auto-deploy and config-update Lambdas driven by `lambda_throughput.py` on a small workload,
+with no simulated API latency: checks the outcome and prints the throughput and API calls.
+"""
+import json
+
+import pytest
+
+from tests.benchmark import lambda_throughput
+
+EVENTS = 200
+
+
+@pytest.mark.parametrize("sqs", [False, True], ids=["s3", "sqs"])
+def test_deployer_deploys_the_latest_upload_of_every_function(sqs):
+    result = lambda_throughput.run_deployer(events=EVENTS, batch_size=10, functions=20, latency_ms=0, sqs=sqs)
+    print(lambda_throughput.format_result(f"deployer[{'sqs' if sqs else 's3'}]", result))
+
+    assert result["deployed"] == result["uploaded"]
+    assert result["invocations"] == EVENTS // 10
+    # Merged uploads are deployed once: fewer calls than one get/head/read/update per event
+    assert result["api_calls"]["lambda:GetFunction"] < EVENTS
+
+
+@pytest.mark.parametrize("batch_size", [1, 10])
+def test_config_update_applies_the_last_config_of_each_service(batch_size):
+    result = lambda_throughput.run_config_update(events=EVENTS, batch_size=batch_size, configs=5, latency_ms=0)
+    print(lambda_throughput.format_result(f"config-update[{batch_size}]", result))
+
+    # One revision and one deployment per service and invocation at most
+    for service in (lambda_throughput.SERVICE, lambda_throughput.WORKER_SERVICE):
+        assert 0 < result["deployments"][service] <= result["invocations"]
+    assert result["api_calls"]["ecs:UpdateService"] == sum(result["deployments"].values())
+
+    # The environment of each service's last uploaded config
+    for service, task_definition in result["task_definitions"].items():
+        container = task_definition["containerDefinitions"][0]
+        assert container["secrets"][0]["valueFrom"].startswith("arn:aws:secretsmanager:")
+        assert {variable["name"]: variable["value"] for variable in container["environment"]} == \
+            result["uploaded"][service]
+
+
+WORKER_ROLES = {"executionRoleArn": "arn:aws:iam::123456789012:role/worker-execution",
+                "taskRoleArn": "arn:aws:iam::123456789012:role/worker-task"}
+
+
+def worker_ecs(calls):
+    ecs = lambda_throughput.LocalEcs(calls)
+    ecs.add_service(lambda_throughput.CLUSTER, lambda_throughput.WORKER_SERVICE, "worker-task",
+                    [{"name": "worker", "image": "worker:latest", "environment": []},
+                     {"name": "sidecar", "image": "sidecar:latest", "environment": []}], **WORKER_ROLES)
+    return ecs
+
+
+def invoke_config_update(calls, ecs, uploads):
+    """Run the config-update handler once on an event with one record per (key, config) upload."""
+    s3 = lambda_throughput.LocalS3(calls)
+    records = []
+    for sequence, (key, config) in enumerate(uploads):
+        s3.put(lambda_throughput.BUCKET, key, json.dumps(config).encode())
+        records.append(lambda_throughput.s3_record(key, sequence))
+    with lambda_throughput.patched_environment(lambda_throughput.CONFIG_UPDATE_ENVIRONMENT):
+        config_update = lambda_throughput.load_handler_module("config_update", lambda_throughput.CONFIG_UPDATE_PATH)
+        config_update._clients.update({"s3": s3, "ecs": ecs,
+                                       "secretsmanager": lambda_throughput.LocalSecretsManager(calls)})
+        lambda_throughput.invoke(config_update.lambda_handler, {"Records": records}, [])
+
+
+def test_config_update_merges_the_containers_of_a_service_into_one_revision():
+    calls = lambda_throughput.ApiCalls()
+    ecs = worker_ecs(calls)
+    invoke_config_update(calls, ecs, [
+        ("worker.json", {"service": lambda_throughput.WORKER_SERVICE, "container": "worker",
+                         "environment": {"QUEUE": "jobs"}}),
+        ("sidecar.json", {"service": lambda_throughput.WORKER_SERVICE, "container": "sidecar",
+                          "environment": {"PORT": "9000"}}),
+    ])
+
+    service = (lambda_throughput.CLUSTER, lambda_throughput.WORKER_SERVICE)
+    task_definition = ecs.task_definitions[ecs.services[service]]
+    assert ecs.deployments[service] == 1
+    assert {container["name"]: container["environment"] for container in task_definition["containerDefinitions"]} == {
+        "worker": [{"name": "QUEUE", "value": "jobs"}],
+        "sidecar": [{"name": "PORT", "value": "9000"}],
+    }
+    # A service named by its config keeps its own family and roles
+    assert task_definition["family"] == "worker-task"
+    assert {name: task_definition[name] for name in WORKER_ROLES} == WORKER_ROLES
+
+
+def test_config_update_fails_on_an_unknown_container():
+    calls = lambda_throughput.ApiCalls()
+    ecs = worker_ecs(calls)
+    with pytest.raises(RuntimeError):
+        invoke_config_update(calls, ecs, [("typo.json", {"service": lambda_throughput.WORKER_SERVICE,
+                                                         "container": "wroker", "environment": {"QUEUE": "jobs"}})])
+
+    # Not reported as up to date: nothing registered, the invocation failed
+    assert "ecs:RegisterTaskDefinition" not in calls.counts
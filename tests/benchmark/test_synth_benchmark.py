@@ -0,0 +1,169 @@
+"""
+Synthesis benchmark for every stack in `app/`.
+
+Each stack is built offline (see `offline.py`) and measured for construction time,
+`Template.from_stack` time and peak Python memory. Results are compared against
+`synth_baseline.json`; a measurement slower/larger than baseline * threshold fails, and so
+does a stack missing from the baseline. Skipped unless SYNTH_BENCHMARK=1, to keep the unit
+run fast.
+
+    SYNTH_BENCHMARK=1 python -m pytest tests/benchmark/test_synth_benchmark.py -s
+
+    SYNTH_BENCHMARK_UPDATE=1      write the baseline from this run (implies SYNTH_BENCHMARK=1)
+    SYNTH_BENCHMARK_THRESHOLD=1.5 allowed regression factor
+    SYNTH_BENCHMARK_ROUNDS=3      rounds per stack, the fastest one is kept
+"""
+import json
+import os
+import time
+import tracemalloc
+
+import pytest
+import aws_cdk.assertions as assertions
+
+from tests.benchmark import offline
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "synth_baseline.json")
+THRESHOLD = float(os.environ.get("SYNTH_BENCHMARK_THRESHOLD", "1.5"))
+ROUNDS = int(os.environ.get("SYNTH_BENCHMARK_ROUNDS", "3"))
+UPDATE_BASELINE = os.environ.get("SYNTH_BENCHMARK_UPDATE") == "1"
+ENABLED = UPDATE_BASELINE or os.environ.get("SYNTH_BENCHMARK") == "1"
+
+# Timings below this many seconds are noise and never fail the comparison
+MIN_SECONDS = 0.05
+
+
+def _vpc_stack(app):
+    from app.vpc_stack import VpcStack
+    return VpcStack(app, "VpcStack", env=offline.ENV)
+
+
+def _rds_stack(instance_type_name):
+    def build(app):
+        from app.rds_stack import RdsStack, InstanceType
+        return RdsStack(app, instance_type=InstanceType[instance_type_name], construct_id="RdsStack",
+                        vpc_stack=_vpc_stack(app), database_name="benchmark_db", env=offline.ENV)
+    return build
+
+
+def _rds_with_initialization_stack(app):
+    from app.rds_stack import InstanceType
+    from app.rds_with_data_initialization import RdsWithInitializationStack
+    return RdsWithInitializationStack(app, instance_type=InstanceType.MYSQL, construct_id="RdsInitStack",
+                                      vpc_stack=_vpc_stack(app), database_name="benchmark_db", env=offline.ENV)
+
+
+def _infra_stack(app):
+    from app.InfraStack import InfraStack
+    return InfraStack(app, "InfraStack", vpc_stack=_vpc_stack(app), app_ports=[8080],
+                      environment_name="dev", env=offline.ENV)
+
+
+def _ecs_app_stack(secret_mode_name):
+    def build(app):
+        from app.app_stack import ECSAppStack, SecretMode
+        return ECSAppStack(app, "AppStack", cluster_name="ecs-cluster.dev", image_uri="nginx:latest",
+                           app_name="benchmark", environment_name="dev",
+                           secret_mode=SecretMode[secret_mode_name], env=offline.ENV)
+    return build
+
+
+def _ec2_stack(app):
+    from app.ec2_stack import EC2Stack
+    meta_data = {"rds_endpoint": "db.local", "secret_cred_arn": "arn:aws:secretsmanager:::secret:db",
+                 "secret_cred_name": "db", "default_region": offline.REGION}
+    return EC2Stack(app, "EC2Stack", vpc_stack=_vpc_stack(app), meta_data=meta_data, env=offline.ENV)
+
+
+def _nginx_lb_stack(app):
+    from app.managed_nginx import EC2WithNginxLBStack
+    return EC2WithNginxLBStack(app, "NginxLb", subnet_params={"id": "subnet-publica", "az": "us-east-1a"},
+                               sg_id="sg-0offline", dns="app.ecs-cluster.dev.ofspain", env=offline.ENV)
+
+
+STACKS = {
+    "VpcStack": _vpc_stack,
+    "RdsStack[POSTGRES]": _rds_stack("POSTGRES"),
+    "RdsStack[MYSQL]": _rds_stack("MYSQL"),
+    "RdsStack[ORACLE]": _rds_stack("ORACLE"),
+    "RdsWithInitializationStack": _rds_with_initialization_stack,
+    "InfraStack": _infra_stack,
+    "ECSAppStack[PER_KEY]": _ecs_app_stack("PER_KEY"),
+    "ECSAppStack[JSON]": _ecs_app_stack("JSON"),
+    "ECSAppStack[REFERENCE]": _ecs_app_stack("REFERENCE"),
+    "EC2Stack": _ec2_stack,
+    "EC2WithNginxLBStack": _nginx_lb_stack,
+}
+
+
+def measure(build) -> dict:
+    """Build the stack in a fresh offline app and measure one round."""
+    app = offline.offline_app()
+    tracemalloc.start()
+    started = time.perf_counter()
+    stack = build(app)
+    constructed = time.perf_counter()
+    assertions.Template.from_stack(stack)
+    synthesized = time.perf_counter()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "construct_seconds": constructed - started,
+        "template_seconds": synthesized - constructed,
+        "peak_kib": peak / 1024,
+    }
+
+
+def best_of(build, rounds: int) -> dict:
+    results = [measure(build) for _ in range(rounds)]
+    return {metric: min(result[metric] for result in results) for metric in results[0]}
+
+
+def load_baseline() -> dict:
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+
+def regressions(name: str, result: dict, baseline: dict) -> list:
+    found = []
+    for metric, expected in baseline.get(name, {}).items():
+        actual = result.get(metric)
+        if actual is None:
+            continue
+        if metric.endswith("_seconds") and actual < MIN_SECONDS:
+            continue
+        if actual > expected * THRESHOLD:
+            found.append(f"{name}.{metric}: {actual:.3f} > {expected:.3f} * {THRESHOLD}")
+    return found
+
+
+@pytest.fixture(scope="module")
+def results():
+    collected = {}
+    yield collected
+    if UPDATE_BASELINE and collected:
+        baseline = load_baseline()
+        baseline.update(collected)
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+    for name, result in collected.items():
+        print(f"{name:28} construct={result['construct_seconds']:.3f}s "
+              f"template={result['template_seconds']:.3f}s peak={result['peak_kib']:.0f}KiB")
+
+
+@pytest.mark.skipif(not ENABLED, reason="SYNTH_BENCHMARK is not set")
+@pytest.mark.parametrize("name", list(STACKS))
+def test_synth_benchmark(name, results):
+    offline.stub_aws()
+    result = best_of(STACKS[name], ROUNDS)
+    results[name] = result
+
+    if not UPDATE_BASELINE:
+        baseline = load_baseline()
+        if name not in baseline:
+            pytest.fail(f"{name} has no baseline in {os.path.basename(BASELINE_PATH)}: "
+                        f"run once with SYNTH_BENCHMARK_UPDATE=1 and commit it")
+        assert not regressions(name, result, baseline)
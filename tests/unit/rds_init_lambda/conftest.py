@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The Lambda image runs its modules from /var/task, so they import each other as top-level modules
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))),
+                          "app", "rds_init_lambda")
+if LAMBDA_DIR not in sys.path:
+    sys.path.insert(0, LAMBDA_DIR)
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from drivers import CsvRowStream, PostgresDriver, UnsupportedEngineError, driver_for
+from seed_loader import BULK_MODE, SeedSettings, load_seed_data
+
+# statement building and COPY need no psycopg2 module
+POSTGRES = PostgresDriver.__new__(PostgresDriver)
+
+
+class CopyCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+
+    def copy_expert(self, sql, f):
+        data = f.read()
+        self.conn.copies.append((sql, data if isinstance(data, str) else data.decode("utf-8")))
+        self.rowcount = self.conn.copies[-1][1].count("\n") - ("HEADER true" in sql)
+
+    def close(self):
+        pass
+
+
+class CopyConnection:
+    def __init__(self):
+        self.copies = []
+        self.commits = 0
+
+    def cursor(self):
+        return CopyCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_rows_are_streamed_as_csv():
+    stream = CsvRowStream(iter([(1, "a,\"b\"", None), (2, {"k": [1]}, True)]))
+    assert stream.read(4) == b'"1",'
+    assert stream.read() == b'"a,""b""",\n"2","{""k"": [1]}","true"\n'
+    assert stream.read() == b""
+
+
+def test_copy_statement_quotes_identifiers():
+    assert POSTGRES.copy_statement("audit log", ["user_id", 'odd"name'], header=True) == (
+        'COPY "audit log" ("user_id", "odd""name") FROM STDIN WITH (FORMAT csv, HEADER true)')
+
+
+def test_postgres_bulk_mode_copies_csv_and_ndjson(tmp_path):
+    (tmp_path / "01_users.csv").write_text("username,email\nadmin,admin@example.com\n")
+    (tmp_path / "02_audit_log.ndjson").write_text(json.dumps({"user_id": 1, "action": "SEED"}) + "\n")
+    conn = CopyConnection()
+    stats = load_seed_data(conn, SeedSettings(seed_dir=str(tmp_path), load_mode=BULK_MODE), POSTGRES)
+
+    (users_sql, users_data), (audit_sql, audit_data) = conn.copies
+    # the CSV file is sent as is, header included
+    assert users_sql.startswith('COPY "users" ("username", "email")') and "HEADER true" in users_sql
+    assert users_data == "username,email\nadmin,admin@example.com\n"
+    assert "HEADER false" in audit_sql and audit_data == '"1","SEED"\n'
+    assert [(table["table"], table["rows"]) for table in stats] == [("users", 1), ("audit_log", 1)]
+
+
+def test_unknown_engine_is_rejected():
+    with pytest.raises(UnsupportedEngineError, match="Oracle"):
+        driver_for("Oracle")
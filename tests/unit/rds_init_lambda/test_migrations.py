@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+from migrations import (DEFAULT_MIGRATIONS_DIR, MigrationError, MigrationHistory, discover_migrations,
+                        pending_changes, placeholders, substitute_variables)
+
+
+class HistoryCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.result = []
+
+    def execute(self, sql, params=None):
+        if sql.startswith("SELECT"):
+            self.result = [(version, checksum) for version, checksum, _ in self.rows]
+        elif sql.startswith("INSERT"):
+            self.rows.append(tuple(params))
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class HistoryConnection:
+    def __init__(self):
+        self.rows = []
+        self.commits = 0
+
+    def cursor(self):
+        return HistoryCursor(self.rows)
+
+    def commit(self):
+        self.commits += 1
+
+
+def _migrations(tmp_path):
+    (tmp_path / "0002_add_roles.sql").write_text("CREATE TABLE roles (id INT);")
+    (tmp_path / "0001_initial_schema.sql").write_text("CREATE TABLE users (id INT);")
+    (tmp_path / "README.md").write_text("not a migration")
+    return discover_migrations(str(tmp_path))
+
+
+def test_migrations_in_file_name_order(tmp_path):
+    assert [migration.version for migration in _migrations(tmp_path)] == ["0001_initial_schema", "0002_add_roles"]
+
+
+def test_only_new_migrations_are_pending(tmp_path):
+    first, second = _migrations(tmp_path)
+    assert pending_changes([first, second], {}) == [first, second]
+    assert pending_changes([first, second], {first.version: first.checksum}) == [second]
+
+
+def test_edited_migration_is_refused(tmp_path):
+    first, second = _migrations(tmp_path)
+    (tmp_path / "0001_initial_schema.sql").write_text("CREATE TABLE users (id BIGINT);")
+    edited, _ = discover_migrations(str(tmp_path))
+    with pytest.raises(MigrationError, match="0001_initial_schema"):
+        pending_changes([edited, second], {first.version: first.checksum})
+
+
+def test_history_records_applied_versions(tmp_path):
+    first, _ = _migrations(tmp_path)
+    history = MigrationHistory(HistoryConnection())
+    history.ensure_table()
+    history.record(first.version, first.checksum, 12)
+    assert history.applied() == {first.version: first.checksum}
+
+
+def test_placeholders_are_substituted_when_the_migration_runs():
+    mysql_schema, = discover_migrations(os.path.join(DEFAULT_MIGRATIONS_DIR, "mysql"))
+    assert placeholders(mysql_schema.path) == {"APP_USER_PASSWORD", "DB_NAME"}
+
+    grant = "GRANT SELECT ON ${DB_NAME}.* TO 'app_user'@'%'"
+    assert substitute_variables(grant, {"DB_NAME": "key_generator_db"}) == \
+        "GRANT SELECT ON key_generator_db.* TO 'app_user'@'%'"
+    with pytest.raises(MigrationError, match="DB_NAME"):
+        substitute_variables(grant, {})
+    # Postgres dollar quoting is not a placeholder
+    assert substitute_variables("DO $$ BEGIN NULL; END $$", {}) == "DO $$ BEGIN NULL; END $$"
@@ -0,0 +1,157 @@
+import json
+import threading
+
+import pytest
+
+from drivers import MySqlDriver
+from seed_loader import (BULK_MODE, ConnectionPool, SeedLoadError, SeedSettings, SeedSource, discover_sources,
+                         foreign_key_dependencies, load_in_dependency_order, load_seed_data)
+
+
+# quoting and LOAD DATA need no connector module
+MYSQL = MySqlDriver.__new__(MySqlDriver)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+
+    def executemany(self, sql, rows):
+        self.conn.batches.append((sql, list(rows)))
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append((sql, params))
+        self.rowcount = 2
+
+    def fetchall(self):
+        return self.conn.fetched
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.batches = []
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.fetched = []
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+def _seeds(tmp_path):
+    (tmp_path / "01_users.csv").write_text("username,email\nadmin,admin@example.com\nuser1,\nuser2,u2@example.com\n")
+    (tmp_path / "02_audit_log.ndjson").write_text(
+        json.dumps({"user_id": 1, "action": "SEED"}) + "\n\n" + json.dumps({"action": "SEED"}) + "\n")
+    (tmp_path / "notes.txt").write_text("ignored")
+    return str(tmp_path)
+
+
+def test_sources_are_discovered_in_name_order(tmp_path):
+    sources = discover_sources(SeedSettings(seed_dir=_seeds(tmp_path),
+                                            s3_objects=[{"bucket": "b", "key": "assets/abc.csv", "name": "roles.csv"}]))
+    assert [(source.table, source.format) for source in sources] == [
+        ("users", "csv"), ("audit_log", "ndjson"), ("roles", "csv")]
+    assert sources[2].location == "s3://b/assets/abc.csv"
+
+
+def test_rows_are_inserted_in_batches(tmp_path):
+    conn = FakeConnection()
+    stats = load_seed_data(conn, SeedSettings(seed_dir=_seeds(tmp_path), batch_size=2, commit_interval=2), MYSQL)
+
+    assert [(table["table"], table["rows"]) for table in stats] == [("users", 3), ("audit_log", 2)]
+    users_sql, first_batch = conn.batches[0]
+    assert users_sql == "INSERT INTO `users` (`username`, `email`) VALUES (%s, %s)"
+    assert first_batch == [("admin", "admin@example.com"), ("user1", None)]
+    assert conn.batches[1][1] == [("user2", "u2@example.com")]
+    assert conn.batches[2][1] == [(1, "SEED"), (None, "SEED")]
+    # one commit at the commit interval, one at the end of each table
+    assert conn.commits == 3
+
+
+def test_mysql_bulk_mode_uses_local_infile_for_csv(tmp_path):
+    conn = FakeConnection()
+    load_seed_data(conn, SeedSettings(seed_dir=_seeds(tmp_path), load_mode=BULK_MODE), MYSQL)
+
+    sql, params = conn.statements[0]
+    assert sql.startswith("LOAD DATA LOCAL INFILE %s INTO TABLE `users`")
+    assert "SET `username` = NULLIF(@c0, ''), `email` = NULLIF(@c1, '')" in sql
+    assert params[0].endswith("01_users.csv")
+    # NDJSON has no LOAD DATA equivalent and is inserted instead
+    assert conn.batches[0][0].startswith("INSERT INTO `audit_log`")
+
+
+def test_settings_from_environment():
+    settings = SeedSettings.from_environment({"SEED_BATCH_SIZE": "500", "SEED_COMMIT_INTERVAL": "10000",
+                                              "SEED_S3_OBJECTS": '[{"bucket": "b", "key": "k.csv"}]'})
+    assert (settings.batch_size, settings.commit_interval, settings.load_mode) == (500, 10000, "insert")
+    assert settings.s3_objects == [{"bucket": "b", "key": "k.csv"}]
+    with pytest.raises(SeedLoadError):
+        SeedSettings(load_mode="copy")
+    with pytest.raises(SeedLoadError):
+        SeedSource("users.xml")
+
+
+def _table_seeds(tmp_path, tables):
+    for table in tables:
+        (tmp_path / f"{table}.csv").write_text("id\n1\n2\n")
+    return discover_sources(SeedSettings(seed_dir=str(tmp_path)))
+
+
+def test_foreign_key_dependencies():
+    conn = FakeConnection()
+    conn.fetched = [("audit_log", "users"), ("audit_log", "actions"), ("users", "users")]
+    assert foreign_key_dependencies(conn, MYSQL) == {"audit_log": {"users", "actions"}}
+
+
+def test_tables_load_after_the_tables_they_reference(tmp_path):
+    sources = _table_seeds(tmp_path, ["audit_log", "roles", "users", "user_roles"])
+    dependencies = {"audit_log": {"users"}, "user_roles": {"users", "roles"}, "users": {"accounts"}}
+    pool = ConnectionPool(FakeConnection, 3)
+    stats = load_in_dependency_order(pool, sources, SeedSettings(seed_dir=str(tmp_path), parallelism=3),
+                                     MYSQL, dependencies)
+    pool.close()
+
+    order = [row["table"] for row in stats]
+    assert sorted(order) == ["audit_log", "roles", "user_roles", "users"]
+    assert order.index("users") < order.index("audit_log")
+    assert order.index("users") < order.index("user_roles") and order.index("roles") < order.index("user_roles")
+    assert all(row["rows"] == 2 for row in stats)
+
+
+def test_independent_tables_load_concurrently(tmp_path):
+    sources = _table_seeds(tmp_path, ["a", "b", "c"])
+    barrier = threading.Barrier(3, timeout=5)
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    pool = ConnectionPool(connect, 3)
+    # every table waits for the others: only completes if all three load at the same time
+    load_in_dependency_order(pool, sources, SeedSettings(seed_dir=str(tmp_path)), MYSQL, {},
+                             on_loaded=lambda conn, source, stats: barrier.wait())
+    pool.close()
+    assert len(opened) == 3 and all(conn.closed for conn in opened)
+
+
+def test_circular_foreign_keys_are_reported(tmp_path):
+    sources = _table_seeds(tmp_path, ["a", "b"])
+    with pytest.raises(SeedLoadError, match="Circular"):
+        load_in_dependency_order(ConnectionPool(FakeConnection, 2), sources, SeedSettings(seed_dir=str(tmp_path)),
+                                 MYSQL, {"a": {"b"}, "b": {"a"}})
@@ -0,0 +1,149 @@
+import pytest
+
+import seed_progress
+from drivers import MySqlDriver
+from seed_loader import ConnectionPool, SeedLoadError, SeedSettings, discover_sources, load_in_dependency_order
+from seed_progress import load_source_in_chunks, load_source_resumably
+
+MYSQL = MySqlDriver.__new__(MySqlDriver)
+
+
+class ProgressCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.result = []
+
+    def execute(self, sql, params=None):
+        if sql.startswith("SELECT"):
+            row = self.conn.progress.get(params[0])
+            self.result = [row] if row else []
+        elif sql.startswith("INSERT INTO seed_progress"):
+            self.conn.pending[params[0]] = (params[1], params[2])
+        elif sql.startswith("UPDATE"):
+            rows_loaded, version = params
+            self.conn.pending[version] = (self.conn.progress[version][0], rows_loaded)
+
+    def executemany(self, sql, rows):
+        self.conn.pending_rows.extend(rows)
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class ProgressConnection:
+    """Checkpoints and loaded rows only become visible on commit."""
+
+    def __init__(self):
+        self.progress = {}
+        self.rows = []
+        self.pending = {}
+        self.pending_rows = []
+
+    def cursor(self):
+        return ProgressCursor(self)
+
+    def commit(self):
+        self.progress.update(self.pending)
+        self.rows.extend(self.pending_rows)
+        self.pending, self.pending_rows = {}, []
+
+    def rollback(self):
+        self.pending, self.pending_rows = {}, []
+
+    def close(self):
+        pass
+
+
+def _users(tmp_path, count=5):
+    (tmp_path / "users.csv").write_text("id\n" + "".join(f"{i}\n" for i in range(count)))
+    return discover_sources(SeedSettings(seed_dir=str(tmp_path)))
+
+
+def _chunks_until(monkeypatch, polls):
+    # time.monotonic() stays before the deadline for `polls` checks
+    clock = iter([0] * polls + [100] * 100)
+    monkeypatch.setattr(seed_progress.time, "monotonic", lambda: next(clock))
+
+
+def test_loading_resumes_from_the_checkpoint(tmp_path, monkeypatch):
+    source, = _users(tmp_path)
+    settings = SeedSettings(seed_dir=str(tmp_path), chunk_size=2)
+    conn = ProgressConnection()
+
+    _chunks_until(monkeypatch, 1)
+    first = load_source_in_chunks(conn, source, settings, MYSQL, deadline=50)
+    assert (first["rows"], first["total_rows"], first["complete"]) == (2, 2, False)
+    assert conn.progress[source.version][1] == 2
+
+    _chunks_until(monkeypatch, 10)
+    second = load_source_in_chunks(conn, source, settings, MYSQL, deadline=50)
+    assert (second["rows"], second["total_rows"], second["complete"]) == (3, 5, True)
+    assert conn.rows == [(str(i),) for i in range(5)]
+
+
+def test_failed_chunk_keeps_the_previous_checkpoint(tmp_path):
+    source, = _users(tmp_path)
+    conn = ProgressConnection()
+
+    class FailingDriver(MySqlDriver):
+        def quote_identifier(self, name):
+            if conn.progress.get(source.version, (None, 0))[1] >= 2:
+                raise RuntimeError("connection lost")
+            return super().quote_identifier(name)
+
+    with pytest.raises(SeedLoadError, match="after row 2"):
+        load_source_in_chunks(conn, source, SeedSettings(seed_dir=str(tmp_path), chunk_size=2),
+                              FailingDriver.__new__(FailingDriver), deadline=float("inf"))
+    assert conn.progress[source.version][1] == 2 and len(conn.rows) == 2
+
+
+def test_failed_synchronous_load_resumes_after_its_committed_rows(tmp_path):
+    source, = _users(tmp_path)
+    settings = SeedSettings(seed_dir=str(tmp_path), batch_size=2, commit_interval=2)
+
+    class FailingConnection(ProgressConnection):
+        commits = 0
+
+        def commit(self):
+            # After the checkpoint's creation and the first two rows, the connection is lost
+            self.commits += 1
+            if self.commits == 3:
+                raise RuntimeError("connection lost")
+            super().commit()
+
+    conn = FailingConnection()
+    with pytest.raises(SeedLoadError, match="connection lost"):
+        load_source_resumably(conn, source, settings, MYSQL)
+    assert conn.progress[source.version][1] == 2 and len(conn.rows) == 2
+
+    stats = load_source_resumably(conn, source, settings, MYSQL)
+    assert (stats["rows"], stats["total_rows"]) == (3, 5)
+    assert conn.rows == [(str(i),) for i in range(5)]
+    assert conn.progress[source.version][1] == 5
+
+
+def test_edited_partially_loaded_file_is_refused(tmp_path):
+    source, = _users(tmp_path)
+    conn = ProgressConnection()
+    conn.progress[source.version] = ("stale", 2)
+    with pytest.raises(SeedLoadError, match="changed after 2"):
+        load_source_in_chunks(conn, source, SeedSettings(seed_dir=str(tmp_path)), MYSQL, deadline=float("inf"))
+
+
+def test_tables_referencing_an_unfinished_table_wait(tmp_path):
+    for table in ["users", "audit_log", "roles"]:
+        (tmp_path / f"{table}.csv").write_text("id\n1\n")
+    sources = discover_sources(SeedSettings(seed_dir=str(tmp_path)))
+
+    def load(conn, source, settings, driver):
+        return {"table": source.table, "rows": 0, "complete": source.table != "users", "seconds": 0}
+
+    loaded = []
+    stats = load_in_dependency_order(ConnectionPool(ProgressConnection, 2), sources,
+                                     SeedSettings(seed_dir=str(tmp_path)), MYSQL, {"audit_log": {"users"}},
+                                     on_loaded=lambda conn, source, table: loaded.append(source.table), load=load)
+    assert sorted(table["table"] for table in stats) == ["roles", "users"]
+    assert loaded == ["roles"]
@@ -0,0 +1,71 @@
+import io
+import os
+
+import pytest
+
+from sql_script import SqlScriptError, SqlStatementReader
+from .conftest import LAMBDA_DIR
+
+
+def _statements(script, **kwargs):
+    return list(SqlStatementReader(io.StringIO(script), **kwargs))
+
+
+def test_shipped_script_keeps_procedure_body_together():
+    with open(os.path.join(LAMBDA_DIR, "migrations", "mysql", "0001_initial_schema.sql"), "r") as f:
+        statements = list(SqlStatementReader(f))
+
+    procedure, = [statement for statement in statements if statement.startswith("CREATE PROCEDURE")]
+    assert procedure.endswith("END")
+    assert "RESIGNAL;" in procedure
+    assert statements[0] == "START TRANSACTION"
+    assert statements[-1] == "FLUSH PRIVILEGES"
+    assert not any("DELIMITER" in statement for statement in statements)
+
+
+def test_shipped_postgres_script_keeps_function_body_together():
+    with open(os.path.join(LAMBDA_DIR, "migrations", "postgres", "0001_initial_schema.sql"), "r") as f:
+        statements = list(SqlStatementReader(f, backslash_escapes=False, hash_comments=False, dollar_quotes=True))
+
+    procedure, = [statement for statement in statements if statement.startswith("CREATE OR REPLACE PROCEDURE")]
+    assert procedure.endswith("$$")
+    assert statements[0] == "BEGIN" and statements[-1] == "COMMIT"
+
+
+def test_dollar_quoted_bodies_are_kept_together():
+    script = "DO $body$ BEGIN PERFORM 'a;b'; END $body$;\nSELECT $$x;y$$;\nSELECT $1;"
+    assert _statements(script, dollar_quotes=True) == [
+        "DO $body$ BEGIN PERFORM 'a;b'; END $body$", "SELECT $$x;y$$", "SELECT $1"]
+
+
+def test_delimiters_in_quotes_and_comments_are_ignored():
+    script = (
+        "INSERT INTO t VALUES ('a;b', \"c;d\", 'it\\'s;');\n"
+        "SELECT `odd;name` FROM t; -- trailing; comment\n"
+        "/* block; comment */ SELECT 1 # hash; comment\n"
+        ";\n"
+        "SELECT 2--1;\n"
+    )
+    assert _statements(script) == [
+        "INSERT INTO t VALUES ('a;b', \"c;d\", 'it\\'s;')",
+        "SELECT `odd;name` FROM t",
+        "SELECT 1",
+        "SELECT 2--1",
+    ]
+
+
+def test_multiline_strings_and_executable_comments():
+    script = "/*!40101 SET NAMES utf8 */;\nINSERT INTO t VALUES ('line one;\nline two');\nSELECT 3"
+    assert _statements(script) == ["/*!40101 SET NAMES utf8 */", "INSERT INTO t VALUES ('line one;\nline two')",
+                                   "SELECT 3"]
+
+
+def test_statement_line_numbers():
+    reader = SqlStatementReader(io.StringIO("-- header\n\nSELECT 1;\nSELECT\n  2;\n"))
+    lines = [reader.line_number for _ in reader]
+    assert lines == [3, 4]
+
+
+def test_unterminated_string_is_reported():
+    with pytest.raises(SqlScriptError, match="line 2"):
+        _statements("SELECT 1;\nSELECT 'open\n")
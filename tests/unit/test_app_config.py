@@ -0,0 +1,53 @@
+import pytest
+
+from app.utility import app_config
+from app.utility.app_config import ConfigurationError, load_config
+
+
+def test_layers_are_merged_in_order():
+    dev = load_config("dev")
+    assert dev["ec2"] == {"type": "t2.micro", "min_capacity": 1, "max_capacity": 2, "desired_capacity": 1}
+    assert (dev["account"], dev["region"]) == ("111111111111", "us-west-2")
+    prod = load_config("prod")
+    assert prod["ec2"]["type"] == "m5.large"
+    assert (prod["account"], prod["region"]) == ("222222222222", "us-east-1")
+
+    overridden = load_config("dev", {"ec2": {"type": "t3.small"}})
+    assert overridden["ec2"]["type"] == "t3.small"
+    assert overridden["ec2"]["max_capacity"] == 2
+
+
+def test_config_is_memoized_and_copied(monkeypatch):
+    app_config.clear_config_cache()
+    reads = []
+    read_json = app_config._read_json
+    monkeypatch.setattr(app_config, "_read_json", lambda *args, **kwargs: reads.append(args) or read_json(*args, **kwargs))
+
+    first = load_config("dev")
+    first["ec2"]["type"] = "mutated"
+    assert load_config("dev")["ec2"]["type"] == "t2.micro"
+    assert len(reads) == 4
+    app_config.clear_config_cache()
+
+
+def test_all_validation_errors_are_reported_together():
+    with pytest.raises(ConfigurationError) as error:
+        load_config("dev", {"ec2": {"type": "", "min_capacity": 3}, "plain_parameters": []})
+    assert len(error.value.errors) == 3
+
+
+def test_secret_mode_defaults_to_per_key_and_is_validated():
+    assert load_config("dev")["secret_mode"] == "per_key"
+    assert load_config("dev", {"secret_mode": "reference", "db_secret_fields": ["username"]})["secret_mode"] == \
+        "reference"
+
+    with pytest.raises(ConfigurationError) as error:
+        load_config("dev", {"secret_mode": "shared", "db_secret_fields": "username"})
+    assert len(error.value.errors) == 2
+
+
+def test_unknown_environment_is_refused():
+    with pytest.raises(ConfigurationError) as error:
+        load_config("production")
+    assert len(error.value.errors) == 2
+    assert "known: dev, prod" in str(error.value)
@@ -0,0 +1,123 @@
+import json
+import os
+import time
+
+from app.stack_registry import StackRegistry
+from app.utility import incremental_synth, parameter_resolver
+from app.utility.incremental_synth import IncrementalSynth, module_closure
+from app.utility.parameter_resolver import ParameterResolver, StackParameters, StubSsmClient
+
+
+def _registry():
+    registry = StackRegistry()
+    factory = lambda module, scope, name, built, environment_name, **kwargs: name
+    registry.register("VpcStack", "app.vpc_stack", factory)
+    registry.register("RdsStack", "app.rds_stack", factory, dependencies=["VpcStack"])
+    registry.register("InitStack", "app.rds_with_data_initialization", factory, dependencies=["VpcStack"],
+                      assets=["app/rds_init_lambda"])
+    registry.register("AutoDeployStack", "app.lambda_autodeploy_s3_stack", factory)
+    return registry
+
+
+def _incremental(tmp_path, context=None):
+    return IncrementalSynth(_registry(), "dev", {"account": "123456789012", "region": "us-east-1"},
+                            context or {}, cache_dir=str(tmp_path))
+
+
+def _assembly(outdir, names):
+    os.makedirs(outdir, exist_ok=True)
+    artifacts = {}
+    for name in names:
+        artifacts[name] = {"type": "aws:cloudformation:stack", "properties": {"templateFile": f"{name}.template.json"}}
+        with open(os.path.join(outdir, f"{name}.template.json"), "w") as f:
+            json.dump({"Resources": {name: {}}}, f)
+    with open(os.path.join(outdir, "manifest.json"), "w") as f:
+        json.dump({"version": "36.0.0", "artifacts": artifacts}, f)
+
+
+def test_module_closure_follows_project_imports():
+    closure = [os.path.relpath(path) for path in module_closure("app.rds_with_data_initialization")]
+    assert os.path.join("app", "rds_stack.py") in closure
+    assert os.path.join("app", "vpc_stack.py") in closure
+
+
+def test_fingerprint_changes_with_context_and_dependencies(tmp_path):
+    first = _incremental(tmp_path)
+    second = _incremental(tmp_path, {"config_overrides": '{"ec2": {"type": "t3.small"}}'})
+    assert first.fingerprint("RdsStack") == _incremental(tmp_path).fingerprint("RdsStack")
+    assert first.fingerprint("RdsStack") != second.fingerprint("RdsStack")
+
+
+def test_unchanged_stacks_are_restored_from_cache(tmp_path):
+    cache_dir, outdir = tmp_path / "cache", tmp_path / "out"
+    incremental = IncrementalSynth(_registry(), "dev", {}, {}, cache_dir=str(cache_dir))
+    assert incremental.stacks_to_build(["RdsStack"]) == ["VpcStack", "RdsStack"]
+    _assembly(str(outdir), ["VpcStack", "RdsStack"])
+    incremental.save(["VpcStack", "RdsStack"], str(outdir))
+
+    incremental = IncrementalSynth(_registry(), "dev", {}, {}, cache_dir=str(cache_dir))
+    assert incremental.stacks_to_build(["VpcStack", "RdsStack"]) == []
+
+    fresh = tmp_path / "fresh"
+    _assembly(str(fresh), [])
+    incremental.restore(["VpcStack", "RdsStack"], str(fresh))
+    with open(fresh / "manifest.json") as f:
+        assert sorted(json.load(f)["artifacts"]) == ["RdsStack", "VpcStack"]
+    assert (fresh / "RdsStack.template.json").exists()
+
+
+def _synth(cache_dir, outdir, names, build=lambda name: None):
+    """One incremental synth of `names`: `build` stands in for constructing each stack."""
+    incremental = IncrementalSynth(_registry(), "dev", {}, {}, cache_dir=str(cache_dir))
+    to_build = incremental.stacks_to_build(names)
+    for name in to_build:
+        build(name)
+    _assembly(str(outdir), to_build)
+    incremental.save(to_build, str(outdir))
+    return to_build
+
+
+def test_dependents_of_a_rebuilt_stack_are_rebuilt(tmp_path):
+    cache_dir, outdir = tmp_path / "cache", tmp_path / "out"
+    assert _synth(cache_dir, outdir, ["RdsStack", "InitStack"]) == ["VpcStack", "RdsStack", "InitStack"]
+
+    # RdsStack changed: VpcStack is rebuilt for it, and InitStack's additions to VpcStack with it
+    fingerprints = cache_dir / "dev" / "fingerprints.json"
+    fingerprints.write_text(json.dumps(dict(json.loads(fingerprints.read_text()), RdsStack="changed")))
+    assert _synth(cache_dir, outdir, ["RdsStack", "InitStack"]) == ["VpcStack", "RdsStack", "InitStack"]
+    assert _synth(cache_dir, outdir, ["RdsStack", "InitStack"]) == []
+
+    # VpcStack is only reused with the dependents it was cached with: without InitStack it lacks its additions
+    assert _synth(cache_dir, outdir, ["RdsStack"]) == ["VpcStack", "RdsStack"]
+    assert _synth(cache_dir, outdir, ["RdsStack", "InitStack"]) == ["VpcStack", "RdsStack", "InitStack"]
+
+
+def test_only_stacks_whose_parameters_expired_or_changed_are_rebuilt(tmp_path, monkeypatch):
+    cache_dir, outdir, parameters = tmp_path / "cache", tmp_path / "out", tmp_path / "ssm.json"
+    monkeypatch.setattr(incremental_synth, "PARAMETER_CACHE", str(parameters))
+    monkeypatch.setattr(parameter_resolver, "_stack_parameters", {})
+    ssm = {"vpc_id": "vpc-1"}
+
+    def build(name):
+        if name == "AutoDeployStack":
+            resolver = ParameterResolver(cache_path=str(parameters), client=StubSsmClient(dict(ssm)))
+            StackParameters(resolver, name).get("vpc_id")
+
+    def update_cache(**entry):
+        cache = json.loads(parameters.read_text())
+        for values in cache.values():
+            values["vpc_id"].update(entry)
+        parameters.write_text(json.dumps(cache))
+
+    names = ["RdsStack", "AutoDeployStack"]
+    assert _synth(cache_dir, outdir, names, build) == ["VpcStack", "RdsStack", "AutoDeployStack"]
+    assert _synth(cache_dir, outdir, names, build) == []
+
+    # Expired: SSM may hold another value, so the stack that resolved it is built (and fetches it) again
+    ssm["vpc_id"] = "vpc-2"
+    update_cache(fetched_at=time.time() - parameter_resolver.DEFAULT_TTL_SECONDS)
+    assert _synth(cache_dir, outdir, names, build) == ["AutoDeployStack"]
+    assert _synth(cache_dir, outdir, names, build) == []
+
+    update_cache(value="vpc-3")
+    assert _synth(cache_dir, outdir, names, build) == ["AutoDeployStack"]
@@ -0,0 +1,13 @@
+import json
+
+from app.multi_env_synth import missing_context
+
+
+def test_missing_lookups_are_read_from_the_manifest(tmp_path):
+    (tmp_path / "manifest.json").write_text(json.dumps({"version": "36.0.0", "artifacts": {}}))
+    assert missing_context(str(tmp_path)) == []
+
+    (tmp_path / "manifest.json").write_text(json.dumps({"version": "36.0.0", "missing": [
+        {"key": "vpc-provider:account=111111111111:region=us-west-2", "provider": "vpc-provider", "props": {}},
+    ]}))
+    assert missing_context(str(tmp_path)) == ["vpc-provider:account=111111111111:region=us-west-2 (vpc-provider)"]
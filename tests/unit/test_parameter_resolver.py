@@ -0,0 +1,85 @@
+import pytest
+
+from app.utility import parameter_resolver
+from app.utility.parameter_resolver import ParameterResolver, ParameterResolutionError, StubSsmClient
+
+
+def _values(count):
+    return {f"/app/dev/param_{i}": f"value_{i}" for i in range(count)}
+
+
+def test_required_names_are_fetched_in_batches_of_ten(tmp_path):
+    client = StubSsmClient(_values(23))
+    resolver = ParameterResolver(cache_path=str(tmp_path / "cache.json"), client=client)
+    resolver.require(*_values(23))
+
+    assert resolver.get("/app/dev/param_22") == "value_22"
+    assert [len(names) for names in client.calls] == [10, 10, 3]
+
+    resolver.get_many(_values(23))
+    assert len(client.calls) == 3
+
+
+def test_disk_cache_is_reused_until_ttl_expires(tmp_path):
+    cache_path = str(tmp_path / "cache.json")
+    ParameterResolver(cache_path=cache_path, client=StubSsmClient(_values(2))).get_many(_values(2))
+
+    client = StubSsmClient(_values(2))
+    assert ParameterResolver(cache_path=cache_path, client=client).get("/app/dev/param_1") == "value_1"
+    assert client.calls == []
+
+    expired = ParameterResolver(cache_path=cache_path, client=client, ttl_seconds=0)
+    expired.get("/app/dev/param_1")
+    assert client.calls == [["/app/dev/param_1"]]
+
+
+def test_refresh_refetches_cached_values(tmp_path):
+    cache_path = str(tmp_path / "cache.json")
+    ParameterResolver(cache_path=cache_path, client=StubSsmClient(_values(2))).get_many(_values(2))
+
+    client = StubSsmClient({name: "new" for name in _values(2)})
+    assert ParameterResolver(cache_path=cache_path, client=client).refresh() == {name: "new" for name in _values(2)}
+
+
+def test_unknown_parameters_are_reported():
+    resolver = ParameterResolver(cache_path=None, client=StubSsmClient({}))
+    with pytest.raises(ParameterResolutionError):
+        resolver.get("/missing")
+
+
+def test_default_profile_follows_the_environment_and_the_configured_profiles(tmp_path, monkeypatch):
+    config_path = tmp_path / "config"
+    monkeypatch.setenv("AWS_CONFIG_FILE", str(config_path))
+    monkeypatch.setenv("AWS_SHARED_CREDENTIALS_FILE", str(tmp_path / "credentials"))
+    monkeypatch.delenv("AWS_PROFILE", raising=False)
+
+    # Not configured here: the default credential chain
+    assert parameter_resolver.default_profile() is None
+
+    config_path.write_text(f"[profile {parameter_resolver.DEFAULT_PROFILE}]\nregion = us-east-1\n")
+    assert parameter_resolver.default_profile() == parameter_resolver.DEFAULT_PROFILE
+
+    monkeypatch.setenv("AWS_PROFILE", "ci")
+    assert parameter_resolver.default_profile() == "ci"
+
+
+def test_cached_values_are_kept_per_account(tmp_path):
+    cache_path = str(tmp_path / "cache.json")
+    ParameterResolver(cache_path=cache_path, client=StubSsmClient({"name": "dev"}), account="111111111111").get("name")
+
+    client = StubSsmClient({"name": "prod"})
+    assert ParameterResolver(cache_path=cache_path, client=client, account="222222222222").get("name") == "prod"
+    assert client.calls == [["name"]]
+
+
+def test_concurrent_writers_keep_each_others_entries(tmp_path):
+    cache_path = str(tmp_path / "cache.json")
+    values = {"/dev/vpc_id": "vpc-1", "/prod/vpc_id": "vpc-2"}
+    # Both read the cache before either wrote, as parallel environment synths do
+    dev, prod = (ParameterResolver(cache_path=cache_path, client=StubSsmClient(values)) for _ in range(2))
+    dev.get("/dev/vpc_id")
+    prod.get("/prod/vpc_id")
+
+    client = StubSsmClient(values)
+    assert ParameterResolver(cache_path=cache_path, client=client).get_many(values) == values
+    assert client.calls == []
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from app.utility import secret_extractor
+from app.utility.secret_extractor import AwsSecretsManagerService
+
+
+class FakeSecretsClient:
+    def __init__(self, secrets):
+        self.secrets = secrets
+        self.calls = []
+
+    def batch_get_secret_value(self, SecretIdList):
+        self.calls.append(list(SecretIdList))
+        return {
+            "SecretValues": [{"Name": name, "SecretString": json.dumps(self.secrets[name])} for name in SecretIdList],
+            "Errors": [],
+        }
+
+
+@pytest.fixture
+def client(monkeypatch):
+    secret_extractor.clear_secret_cache()
+    fake = FakeSecretsClient({f"secret-{i}": {"username": f"user{i}", "port": 5432} for i in range(25)})
+    monkeypatch.setitem(secret_extractor._clients, ("us-east-1", secret_extractor.default_profile()), fake)
+    yield fake
+    secret_extractor.clear_secret_cache()
+
+
+def test_secrets_are_batched_and_cached(client):
+    service = AwsSecretsManagerService({}, {"REGION": "us-east-1"})
+    secrets = service.get_secrets(f"secret-{i}" for i in range(25))
+
+    assert secrets["secret-24"] == {"username": "user24", "port": "5432"}
+    assert [len(ids) for ids in client.calls] == [20, 5]
+
+    AwsSecretsManagerService({}, {"REGION": "us-east-1"}).get_secrets(["secret-3"])
+    assert len(client.calls) == 2
+
+
+def test_offline_fixture_is_used_instead_of_secrets_manager(client):
+    service = AwsSecretsManagerService({"DB_SECRET_NAME": "offline/db-secret"},
+                                       {"FIXTURE": secret_extractor.DEFAULT_FIXTURE_PATH})
+    assert service.get_db_secret()["username"] == "test_user"
+    assert client.calls == []
+
+    with pytest.raises(ValueError):
+        service.get_secrets(["unknown"])
@@ -0,0 +1,41 @@
+import sys
+
+import pytest
+
+from app.stack_registry import REGISTRY, StackRegistry, selected_stacks
+
+
+def _registry():
+    registry = StackRegistry()
+    factory = lambda module, scope, name, built, environment_name, **kwargs: (name, sorted(built), kwargs)
+    registry.register("VpcStack", "json", factory)
+    registry.register("RdsStack", "json", factory, dependencies=["VpcStack"])
+    registry.register("InfraStack", "json", factory, dependencies=["VpcStack"])
+    registry.register("AppStack", "json", factory, dependencies=["InfraStack"])
+    return registry
+
+
+def test_resolve_adds_dependencies_first():
+    assert _registry().resolve(["AppStack"]) == ["VpcStack", "InfraStack", "AppStack"]
+
+
+def test_build_only_selected_stacks():
+    built = _registry().build(scope=None, names=["InfraStack"], env={"region": "us-east-1"})
+    assert list(built) == ["VpcStack", "InfraStack"]
+    assert built["InfraStack"] == ("InfraStack", ["VpcStack"], {"env": {"region": "us-east-1"}})
+
+
+def test_unknown_stack_is_rejected():
+    with pytest.raises(ValueError):
+        _registry().resolve(["NoSuchStack"])
+
+
+def test_selected_stacks_from_context():
+    assert selected_stacks(None) is None
+    assert selected_stacks("VpcStack, InfraStack") == ["VpcStack", "InfraStack"]
+    assert selected_stacks(["AppStack"]) == ["AppStack"]
+
+
+def test_default_registry_does_not_import_stack_modules():
+    REGISTRY.resolve(REGISTRY.names())
+    assert "app.customised_vpc_stack" not in sys.modules
@@ -0,0 +1,54 @@
+from app.utility.synth_profiler import SynthProfiler, profiling_enabled
+
+
+class FakeNode:
+    def __init__(self, path):
+        self.path = path
+
+
+class FakeConstruct:
+    def __init__(self, path):
+        self.node = FakeNode(path)
+
+
+class FakeKernel:
+    def create(self, klass, obj, args=None):
+        return obj
+
+    def invoke(self, obj, method, args=None):
+        return method
+
+    def sinvoke(self, klass, method, args=None):
+        return method
+
+
+def prepare_environment(kernel, stack):
+    for name in ("a", "b", "c"):
+        kernel.sinvoke("StringParameter", "valueFromLookup", [stack, name])
+
+
+def test_profiler_attributes_calls_to_paths_and_callers():
+    profiler = SynthProfiler()
+    profiler.source_root = __file__.rsplit("/", 1)[0]
+    profiler.install(FakeKernel)
+    try:
+        kernel = FakeKernel()
+        stack = FakeConstruct("AppStack")
+        with profiler.track("AppStack"):
+            kernel.create("Secret", object(), [stack, "MySecretUsername"])
+            prepare_environment(kernel, stack)
+    finally:
+        profiler.uninstall()
+
+    report = profiler.report()
+    paths = {row["path"]: row["calls"] for row in report["construct_paths"]}
+    callers = {row["caller"]: row["calls"] for row in report["callers"]}
+    assert paths == {"AppStack/MySecretUsername": 1, "AppStack": 3}
+    assert callers["test_synth_profiler.py:prepare_environment"] == 3
+    assert report["stacks"]["AppStack"]["calls"] == 4
+    assert FakeKernel.create.__name__ == "create" and not hasattr(FakeKernel.create, "__wrapped__")
+
+
+def test_profiling_enabled():
+    assert profiling_enabled("true") and profiling_enabled(True)
+    assert not profiling_enabled(None) and not profiling_enabled("false")
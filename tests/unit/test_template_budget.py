@@ -0,0 +1,56 @@
+import json
+import os
+
+from app.utility.template_budget import analyze_assembly, construct_path
+
+
+def _secret(key):
+    return {"Type": "AWS::SecretsManager::Secret", "Properties": {"Name": f"MyAppSecret-{key}"},
+            "Metadata": {"aws:cdk:path": f"AppStack/MySecret{key.capitalize()}/Resource"}}
+
+
+def _assembly(outdir):
+    ingress = [{"IpProtocol": "tcp", "FromPort": port, "ToPort": port, "CidrIp": "0.0.0.0/0"}
+               for port in (80, 443, 8080, 8443)]
+    resources = {f"MySecret{key.capitalize()}": _secret(key) for key in ("username", "password", "host", "port")}
+    resources["Sg"] = {"Type": "AWS::EC2::SecurityGroup", "Properties": {"SecurityGroupIngress": ingress},
+                       "Metadata": {"aws:cdk:path": "AppStack/InstanceSG/Resource"}}
+    template = {
+        "Resources": resources,
+        "Outputs": {"ClusterName": {"Value": "c", "Export": {"Name": "AppStack:ClusterName"}}, "Url": {"Value": "u"}},
+        "Parameters": {"BootstrapVersion": {"Type": "AWS::SSM::Parameter::Value<String>"}},
+    }
+    os.makedirs(outdir, exist_ok=True)
+    with open(os.path.join(outdir, "AppStack.template.json"), "w") as f:
+        json.dump(template, f, indent=1)
+    with open(os.path.join(outdir, "manifest.json"), "w") as f:
+        json.dump({"artifacts": {
+            "AppStack": {"type": "aws:cloudformation:stack", "properties": {"templateFile": "AppStack.template.json"}},
+            "Tree": {"type": "cdk:tree", "properties": {"file": "tree.json"}},
+        }}, f)
+
+
+def test_construct_path_drops_default_child():
+    assert construct_path("X", {"Metadata": {"aws:cdk:path": "AppStack/Sg/Resource"}}) == "AppStack/Sg"
+    assert construct_path("X", {}) == "X"
+
+
+def test_metrics_against_stack_budget(tmp_path):
+    _assembly(str(tmp_path))
+    report = analyze_assembly(str(tmp_path), {"stacks": {"AppStack": {"resources": 4}}, "warn_ratio": 0.8})
+    stack, = report["stacks"]
+    assert stack["metrics"]["resources"] == {"value": 5, "limit": 4, "status": "over"}
+    assert stack["metrics"]["outputs"]["value"] == 2
+    assert stack["metrics"]["exports"]["value"] == 1
+    assert stack["exports"] == ["ClusterName"]
+    assert stack["resource_types"] == {"AWS::SecretsManager::Secret": 4, "AWS::EC2::SecurityGroup": 1}
+    assert report["over_budget"] == ["AppStack"]
+
+
+def test_growth_is_attributed_to_constructs(tmp_path):
+    _assembly(str(tmp_path))
+    stack, = analyze_assembly(str(tmp_path), {"repeat_threshold": 4})["stacks"]
+    repeated, = stack["repeated_constructs"]
+    assert (repeated["parent"], repeated["type"], repeated["count"]) == ("AppStack", "AWS::SecretsManager::Secret", 4)
+    assert stack["long_property_lists"] == [{"path": "AppStack/InstanceSG", "property": "SecurityGroupIngress",
+                                             "entries": 4}]